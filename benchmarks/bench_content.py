@@ -0,0 +1,52 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Compare the old `response.content.strip()` sniffing with the bounded
+classifier across body sizes; the classifier should stay flat.
+
+    python benchmarks/bench_content.py
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+from timeit import repeat
+import os
+import sys
+sys.dont_write_bytecode = True
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from testguess.content import classify_content  # noqa
+
+SIZES = (1 << 10, 1 << 16, 1 << 20, 1 << 24)
+
+
+def strip_sniff(content):
+    content = content.strip()
+    html = content[0:15].lower() == b'<!doctype html>'
+    json_object = content.startswith(b'{') and content.endswith(b'}')
+    json_array = content.startswith(b'[') and content.endswith(b']')
+    return html, json_object or json_array
+
+
+def make_body(size):
+    head = b'  <!doctype html><html><body>'
+    tail = b'</body></html>\n  '
+    return head + b'x' * (size - len(head) - len(tail)) + tail
+
+
+def best_of(func, body, number=200):
+    return min(repeat(lambda: func(body), number=number, repeat=5)) / number
+
+
+def main():
+    print('%12s %14s %14s' % ('bytes', 'strip (us)', 'classify (us)'))
+    for size in SIZES:
+        body = make_body(size)
+        print('%12d %14.2f %14.2f' % (
+            size,
+            best_of(strip_sniff, body) * 1e6,
+            best_of(lambda b: classify_content(b, 'text/html'), body) * 1e6,
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Simulate several worker processes discovering the same set of views, with
+and without the shared SQLite work ledger, and report the total CPU time
+and number of files written.
+
+    python benchmarks/bench_ledger.py [--workers 8] [--views 200]
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from argparse import ArgumentParser
+from hashlib import sha1
+from multiprocessing import Pool
+from random import Random
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+sys.dont_write_bytecode = True
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from testguess.ledger import WorkLedger, make_ledger_key  # noqa
+from testguess.writers import atomic_write  # noqa
+
+
+def render(key, rounds):
+    # stands in for resolving, rendering the fragments and the class.
+    digest = sha1(key.encode('utf-8'))
+    for _ in range(rounds):
+        digest = sha1(digest.digest())
+    return 'class GuessedTestCase(object):\n    # %s\n' % digest.hexdigest()
+
+
+def generate(root, key, rounds):
+    atomic_write(os.path.join(root, key.replace(':', '_') + '.py'),
+                 render(key, rounds))
+
+
+def worker(args):
+    root, mode, seed, views, rounds, batch = args
+    keys = [make_ledger_key('view.%d' % n, '101110011100') for n in range(views)]
+    Random(seed).shuffle(keys)
+    ledger = WorkLedger(path=os.path.join(root, 'ledger.sqlite3'))
+    started = os.times()
+    written = 0
+    if mode == 'unshared':
+        for key in keys:
+            generate(root, key, rounds)
+            written += 1
+    elif mode == 'ledger':
+        for key in keys:
+            if ledger.claim(key):
+                generate(root, key, rounds)
+                ledger.complete(key)
+                written += 1
+    else:
+        for offset in range(0, len(keys), batch):
+            claimed = ledger.claim_many(keys[offset:offset + batch])
+            for key in claimed:
+                generate(root, key, rounds)
+                written += 1
+            ledger.complete_many(claimed)
+    finished = os.times()
+    cpu = (finished[0] - started[0]) + (finished[1] - started[1])
+    return cpu, written
+
+
+def run(mode, options):
+    root = tempfile.mkdtemp(prefix='testguess-ledger-')
+    try:
+        pool = Pool(processes=options.workers)
+        started = time.time()
+        try:
+            results = pool.map(worker, [
+                (root, mode, seed, options.views, options.rounds, options.batch)
+                for seed in range(options.workers)])
+        finally:
+            pool.close()
+            pool.join()
+        return {
+            'wall_s': time.time() - started,
+            'cpu_s': sum(cpu for cpu, written in results),
+            'files_written': sum(written for cpu, written in results),
+        }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--views', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=2000,
+                        help="Work per simulated generation")
+    parser.add_argument('--batch', type=int, default=16)
+    options = parser.parse_args()
+    results = dict((mode, run(mode, options))
+                   for mode in ('unshared', 'ledger', 'ledger_batched'))
+    print(json.dumps(results, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
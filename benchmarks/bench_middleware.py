@@ -0,0 +1,198 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Measure what `testguess.middleware.GuessResponse` costs per request, using
+the bundled `test_settings` and `test_urls` views.
+
+    python benchmarks/bench_middleware.py [--requests N] [--threads N]
+                                          [--duration S] [--output FILE]
+
+Results are written as JSON (to stdout unless --output is given) so that
+runs against different versions can be compared.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from argparse import ArgumentParser
+from threading import Thread
+from wsgiref.util import setup_testing_defaults
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+sys.dont_write_bytecode = True
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "test_settings")
+
+import django  # noqa
+if hasattr(django, 'setup'):
+    django.setup()
+
+from django.conf import settings  # noqa
+from django.core.handlers.wsgi import WSGIHandler  # noqa
+from django.core.urlresolvers import resolve  # noqa
+from django.test import Client  # noqa
+from django.test.utils import override_settings  # noqa
+from testguess.middleware import GuessResponse, TestFileHandler  # noqa
+from testguess.resolving import resolve_cache  # noqa
+from testguess.snapshots import snapshot_request, snapshot_response  # noqa
+from testguess.writers import atomic_write  # noqa
+
+now = getattr(time, 'perf_counter', time.time)
+
+VIEWS = (
+    ('templateresponse', '/1/'),
+    ('jsonresponse', '/2/'),
+    ('render', '/3/'),
+    ('redirect', '/6/'),
+)
+GUESS_MIDDLEWARE = 'testguess.middleware.GuessResponse'
+WITHOUT_GUESSING = tuple(m for m in settings.MIDDLEWARE_CLASSES
+                         if m != GUESS_MIDDLEWARE)
+SCENARIOS = (
+    ('off', {'MIDDLEWARE_CLASSES': WITHOUT_GUESSING}),
+    ('sampled_out', {'TESTGUESS_SAMPLE_RATE': 0}),
+    # the manifest would skip every request after the first for a view.
+    ('generating', {'TESTGUESS_DEDUP': False, 'TESTGUESS_MANIFEST': False,
+                    'TESTGUESS_LEDGER': False}),
+)
+
+
+def noop_start_response(status, headers, exc_info=None):
+    return None
+
+
+def make_environ(path):
+    environ = {'PATH_INFO': path, 'REQUEST_METHOD': 'GET',
+               'SERVER_NAME': 'testserver', 'HTTP_HOST': 'testserver'}
+    setup_testing_defaults(environ)
+    return environ
+
+
+def call(handler, path):
+    response = handler(make_environ(path), noop_start_response)
+    for chunk in response:
+        pass
+    response.close()
+
+
+def per_request(handler, requests):
+    results = {}
+    for name, path in VIEWS:
+        call(handler, path)
+        started = now()
+        for _ in range(requests):
+            call(handler, path)
+        results[name] = (now() - started) / requests * 1e6
+    return results
+
+
+def throughput(handler, threads, duration):
+    counts = [0] * threads
+    deadline = now() + duration
+
+    def load(slot):
+        paths = [path for name, path in VIEWS]
+        while now() < deadline:
+            call(handler, paths[counts[slot] % len(paths)])
+            counts[slot] += 1
+
+    workers = [Thread(target=load, args=(slot,)) for slot in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(counts) / duration
+
+
+def timed(func, requests):
+    started = now()
+    for _ in range(requests):
+        func()
+    return (now() - started) / requests * 1e6
+
+
+def breakdown(requests):
+    # drive each stage of the middleware directly, from a real response,
+    # so each can be timed on its own.
+    middleware = GuessResponse()
+    client = Client()
+    results = {}
+    for name, path in VIEWS:
+        response = client.get(path)
+        request = response.wsgi_request
+        request_snapshot = snapshot_request(request)
+        response_snapshot = snapshot_response(response)
+        config_kwargs = middleware.get_config_kwargs(request, response)
+        config = middleware.config_class(**config_kwargs)
+        guesser = middleware.guesser_class(config=config, request=request_snapshot,
+                                           response=response_snapshot)
+        filer = TestFileHandler(config=config, django_settings=settings)
+        files = filer.prepare(view_name=guesser.resolve().best_name)
+        rendered = guesser.render_test(context=guesser.get_context())
+        target = files.tree[-1].file
+
+        def uncached_resolve():
+            match = resolve(path)
+            return guesser.get_best_viewname(match, default=match.url_name)
+
+        results[name] = {
+            'resolve_uncached_us': timed(uncached_resolve, requests),
+            'resolve_us': timed(guesser.resolve, requests),
+            'config_us': timed(lambda: middleware.config_class(
+                **middleware.get_config_kwargs(request, response)), requests),
+            'snapshot_us': timed(lambda: (snapshot_request(request),
+                                          snapshot_response(response)), requests),
+            'render_us': timed(lambda: guesser.render_test(
+                context=guesser.get_context()), requests),
+            'filesystem_us': timed(lambda: (
+                filer.prepare(view_name=guesser.resolve().best_name),
+                atomic_write(target, rendered)), requests),
+        }
+    return results
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=2.0)
+    parser.add_argument('--output', default=None)
+    options = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='testguess-bench-')
+    results = {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'requests': options.requests,
+        'threads': options.threads,
+        'scenarios': {},
+    }
+    try:
+        with override_settings(TESTGUESS_ROOT=root):
+            for name, overrides in SCENARIOS:
+                with override_settings(**overrides):
+                    resolve_cache.clear()
+                    handler = WSGIHandler()
+                    results['scenarios'][name] = {
+                        'per_request_us': per_request(handler, options.requests),
+                        'throughput_rps': throughput(handler, options.threads,
+                                                     options.duration),
+                    }
+            results['breakdown'] = breakdown(options.requests)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if options.output is None:
+        print(output)
+    else:
+        with open(options.output, 'w') as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
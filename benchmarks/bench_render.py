@@ -0,0 +1,77 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Per-generation render time using `render_to_string` for every fragment
+versus the precompiled `testguess.rendering.renderer`.
+
+    python benchmarks/bench_render.py
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+from timeit import repeat
+import os
+import sys
+sys.dont_write_bytecode = True
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "test_settings")
+
+import django  # noqa
+if hasattr(django, 'setup'):
+    django.setup()
+
+from django.core.urlresolvers import resolve  # noqa
+from django.template.loader import render_to_string  # noqa
+from testguess.rendering import renderer  # noqa
+
+FRAGMENTS = (
+    'testguess/anonymous_user.py',
+    'testguess/status_code.py',
+    'testguess/reverse_url.py',
+    'testguess/headers.py',
+    'testguess/html5.py',
+    'testguess/empty_init.py',
+    'testguess/empty_init.py',
+    'testguess/empty_init.py',
+    'testguess/generated_class.py',
+)
+
+
+def make_context():
+    return {
+        'config': {}.items(),
+        'request': {
+            'method': 'GET',
+            'path': '/1/',
+            'data': {},
+            'resolved': resolve('/1/'),
+        },
+        'response': {
+            'status_code': 200,
+            'headers': [('Content-Type', 'text/html; charset=utf-8')],
+        },
+        'setup': [],
+        'tests': {},
+    }
+
+
+def with_render_to_string(context):
+    for name in FRAGMENTS:
+        render_to_string(template_name=name, context=context)
+
+
+def with_renderer(context):
+    for name in FRAGMENTS:
+        renderer.render(template_name=name, context=context)
+
+
+def main(number=500):
+    context = make_context()
+    renderer.load()
+    for label, func in (('render_to_string', with_render_to_string),
+                        ('renderer', with_renderer)):
+        best = min(repeat(lambda: func(context), number=number, repeat=5))
+        print('%-18s %8.1f us per generation' % (label, best / number * 1e6))
+
+
+if __name__ == "__main__":
+    main()
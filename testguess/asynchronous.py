@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+A `MIDDLEWARE` (new-style) variant of `GuessResponse` which works under both
+WSGI and ASGI. Requires Python 3 and a Django with async middleware support
+for the async path; under WSGI it behaves like `GuessResponse` but renders
+and writes on a thread pool.
+"""
+from __future__ import absolute_import
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+import asyncio
+import atexit
+import logging
+from django.conf import settings
+from .middleware import GuessResponse
+
+try:
+    from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+except ImportError:  # asgiref < 3.6
+    iscoroutinefunction = asyncio.iscoroutinefunction
+
+    def markcoroutinefunction(func):
+        func._is_coroutine = asyncio.coroutines._is_coroutine
+        return func
+try:
+    from asgiref.sync import sync_to_async
+except ImportError:  # pragma: no cover
+    sync_to_async = None
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorQueue(object):
+    """
+    Satisfies the `submit(callable)` queue interface `GuessResponse` uses,
+    running each task on an executor, and refusing new work once
+    `max_pending` tasks are waiting or running so that a burst of novel
+    views can't pile up behind the event loop.
+    """
+    __slots__ = (
+        'executor',
+        'max_pending',
+        'pending',
+        '_lock',
+    )
+
+    def __init__(self, executor, max_pending=32):
+        self.executor = executor
+        self.max_pending = max_pending
+        self.pending = 0
+        self._lock = Lock()
+
+    def submit(self, task):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                return False
+            self.pending += 1
+        try:
+            future = self.executor.submit(task)
+        except RuntimeError:
+            # executor has been shut down.
+            self._done(None)
+            return False
+        future.add_done_callback(self._done)
+        return True
+
+    def _done(self, future):
+        with self._lock:
+            self.pending -= 1
+        if future is not None and future.exception() is not None:
+            logger.error("Background test generation failed",
+                         exc_info=future.exception())
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+
+_executor_queue = None
+_executor_queue_lock = Lock()
+
+
+def get_executor_queue():
+    # one pool for the process, however many times the middleware chain
+    # is built, shut down along with the interpreter.
+    global _executor_queue
+    with _executor_queue_lock:
+        if _executor_queue is None:
+            queue = ExecutorQueue(
+                executor=ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'TESTGUESS_ASYNC_WORKERS', 2)),
+                max_pending=getattr(settings, 'TESTGUESS_ASYNC_MAX_PENDING', 32))
+            atexit.register(queue.shutdown)
+            _executor_queue = queue
+    return _executor_queue
+
+
+class AsyncGuessResponse(object):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.queue = get_executor_queue()
+        self.guesser = GuessResponse(queue=self.queue)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+            # on the event loop the view's time includes waiting on every
+            # other request, its queries may run on whichever thread
+            # `sync_to_async` picks, and traced memory is the whole
+            # process's; none of them would say much about the view.
+            self.guesser.record_queries = False
+            self.guesser.measure_timing = False
+            self.guesser.memory_sample_rate = 0
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        return self.guesser.process_response(request, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        return self.guesser.process_view(request, view_func, view_args,
+                                         view_kwargs)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        # taking the snapshot may touch the lazy `request.user` and so the
+        # database, which isn't allowed on the event loop. It is cheap, and
+        # everything expensive is handed on to `self.queue`.
+        if sync_to_async is None:
+            return self.guesser.process_response(request, response)
+        return await sync_to_async(self.guesser.process_response)(request,
+                                                                  response)
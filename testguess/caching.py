@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+# any of these means a shared cache must not just reuse the response.
+UNCACHEABLE_DIRECTIVES = frozenset(('no-store', 'no-cache', 'private'))
+
+
+def cache_directives(value):
+    """
+    `Cache-Control: max-age=600, Public` -> {'max-age': '600', 'public': None}
+    """
+    directives = {}
+    for part in value.split(','):
+        name, sep, argument = part.strip().partition('=')
+        if not name:
+            continue
+        directives[name.strip().lower()] = argument.strip().strip('"') if sep else None
+    return directives
+
+
+def vary_headers(value):
+    return sorted(set(part.strip().lower() for part in value.split(',')
+                      if part.strip()))
+
+
+def is_cacheable(value):
+    directives = cache_directives(value)
+    if UNCACHEABLE_DIRECTIVES.intersection(directives):
+        return False
+    if 'public' in directives:
+        return True
+    for name in ('s-maxage', 'max-age'):
+        try:
+            if int(directives.get(name) or 0) > 0:
+                return True
+        except ValueError:
+            continue
+    return False
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+CONTENT_HTML5 = 'html5'
+CONTENT_JSON = 'json'
+CONTENT_XML = 'xml'
+CONTENT_TEXT = 'text'
+CONTENT_CSV = 'csv'
+CONTENT_BINARY = 'binary'
+CONTENT_UNKNOWN = 'unknown'
+
+# only this many bytes from either end of a body are ever looked at.
+WINDOW = 64
+
+BINARY_TYPES = (
+    'application/octet-stream',
+    'application/pdf',
+    'application/zip',
+    'application/gzip',
+    'image/',
+    'audio/',
+    'video/',
+    'font/',
+)
+
+
+def content_prefix(view, size=WINDOW):
+    # tobytes() copies at most `size` bytes, never the whole body.
+    return view[0:size].tobytes().lstrip()
+
+
+def content_suffix(view, size=WINDOW):
+    return view[max(0, len(view) - size):].tobytes().rstrip()
+
+
+def classify(prefix, suffix, content_type='', disposition=''):
+    content_type = content_type.split(';', 1)[0].strip().lower()
+    if 'attachment' in disposition.lower():
+        return CONTENT_BINARY
+    if prefix[0:15].lower() == b'<!doctype html>':
+        return CONTENT_HTML5
+    json_object = prefix.startswith(b'{') and suffix.endswith(b'}')
+    json_array = prefix.startswith(b'[') and suffix.endswith(b']')
+    if json_object or json_array:
+        return CONTENT_JSON
+    if prefix.startswith(b'<?xml') or content_type.endswith('xml'):
+        return CONTENT_XML
+    if content_type == 'text/csv':
+        return CONTENT_CSV
+    if content_type.startswith(BINARY_TYPES) or b'\x00' in prefix:
+        return CONTENT_BINARY
+    if content_type == 'text/plain':
+        return CONTENT_TEXT
+    return CONTENT_UNKNOWN
+
+
+def classify_content(content, content_type='', disposition=''):
+    view = memoryview(content)
+    return classify(prefix=content_prefix(view), suffix=content_suffix(view),
+                    content_type=content_type, disposition=disposition)
+
+
+def response_chunks(response):
+    """
+    The pieces a (non-streaming) response's body is held in. Reading
+    `response.content` joins them, copying the whole body, which for a
+    response built up by many `write()` calls is worth avoiding.
+    """
+    container = getattr(response, '_container', None)
+    if isinstance(container, list) and all(isinstance(chunk, bytes)
+                                           for chunk in container):
+        return container
+    return [response.content]
+
+
+def chunks_head(chunks, size):
+    """
+    A memoryview of the first `size` bytes of `chunks`, copying only
+    when they span more than one chunk.
+    """
+    if chunks and len(chunks[0]) >= size:
+        return memoryview(chunks[0])[0:size]
+    head = []
+    taken = 0
+    for chunk in chunks:
+        head.append(chunk[0:size - taken])
+        taken += len(head[-1])
+        if taken >= size:
+            break
+    return memoryview(b''.join(head))
+
+
+def chunks_tail(chunks, size):
+    if chunks and len(chunks[-1]) >= size:
+        last = memoryview(chunks[-1])
+        return last[len(last) - size:]
+    tail = []
+    taken = 0
+    for chunk in reversed(chunks):
+        tail.append(chunk[max(0, len(chunk) - (size - taken)):])
+        taken += len(tail[-1])
+        if taken >= size:
+            break
+    return memoryview(b''.join(reversed(tail)))
+
+
+def classify_response(response):
+    chunks = response_chunks(response)
+    return classify(prefix=content_prefix(chunks_head(chunks, WINDOW)),
+                    suffix=content_suffix(chunks_tail(chunks, WINDOW)),
+                    content_type=response.get('Content-Type', ''),
+                    disposition=response.get('Content-Disposition', ''))
+
+
+def observe_stream(chunks, on_complete, size=WINDOW):
+    """
+    Pass `chunks` through untouched, keeping only a reference to the first
+    and latest chunk, and call `on_complete(prefix, suffix, length)` once
+    the stream has been fully consumed.
+    """
+    first = None
+    last = b''
+    length = 0
+    for chunk in chunks:
+        if first is None:
+            first = chunk
+        last = chunk
+        length += len(chunk)
+        yield chunk
+    view = memoryview(first or b'')
+    on_complete(prefix=content_prefix(view, size=size),
+                suffix=content_suffix(memoryview(last), size=size),
+                length=length)
+
+
+def content_kind_of(config):
+    for kind in (CONTENT_HTML5, CONTENT_JSON, CONTENT_XML, CONTENT_TEXT,
+                 CONTENT_CSV, CONTENT_BINARY):
+        if getattr(config, 'is_%s' % kind, False):
+            return kind
+    return CONTENT_UNKNOWN
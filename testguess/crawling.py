@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from collections import namedtuple
+from importlib import import_module
+from threading import local
+import logging
+import re
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client
+from .content import CONTENT_HTML5, classify_response
+from .queries import QueryRecorder
+
+try:
+    from html.parser import HTMLParser
+    from urllib.parse import urljoin, urlsplit, urlunsplit
+except ImportError:  # pragma: no cover
+    from HTMLParser import HTMLParser
+    from urlparse import urljoin, urlsplit, urlunsplit
+try:
+    from django.urls import NoReverseMatch, get_resolver, reverse
+except ImportError:  # Django < 1.10
+    from django.core.urlresolvers import NoReverseMatch, get_resolver, reverse
+
+logger = logging.getLogger(__name__)
+
+CrawlResult = namedtuple('CrawlResult', 'path username status_code links')
+
+# only this much of an HTML page is searched for links.
+MAX_LINK_BYTES = 262144
+
+
+def iter_url_names(patterns, namespace=None):
+    """
+    Every named pattern in a urlconf, qualified by the namespaces of the
+    includes it sits in; works for both the `Regex*` classes of older
+    Djangos and the `URLResolver`/`URLPattern` of newer ones.
+    """
+    for pattern in patterns:
+        url_patterns = getattr(pattern, 'url_patterns', None)
+        if url_patterns is not None:
+            child = getattr(pattern, 'namespace', None)
+            if child is not None and namespace is not None:
+                child = '%s:%s' % (namespace, child)
+            for name in iter_url_names(url_patterns, namespace=child or namespace):
+                yield name
+            continue
+        name = getattr(pattern, 'name', None)
+        if name is None:
+            continue
+        if namespace is not None:
+            name = '%s:%s' % (namespace, name)
+        yield name
+
+
+def reversible_paths(urlconf=None):
+    """
+    Paths for every named pattern which can be reversed without arguments.
+    """
+    paths = set()
+    for name in iter_url_names(get_resolver(urlconf).url_patterns):
+        try:
+            paths.add(reverse(name, urlconf=urlconf))
+        except NoReverseMatch:
+            continue
+    return sorted(paths)
+
+
+class LinkParser(HTMLParser):
+    def __init__(self):
+        HTMLParser.__init__(self)
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'a':
+            return None
+        for name, value in attrs:
+            if name == 'href' and value:
+                self.links.append(value)
+        return None
+
+
+def local_path(base, href, host):
+    """
+    `href`, as found on the page at `base`, if it points back into this
+    site; otherwise None.
+    """
+    scheme, netloc, path, query, fragment = urlsplit(urljoin(base, href.strip()))
+    if scheme not in ('', 'http', 'https') or netloc not in ('', host):
+        return None
+    return urlunsplit(('', '', path or '/', query, ''))
+
+
+def find_links(response, base, host):
+    if response.streaming or classify_response(response) != CONTENT_HTML5:
+        return ()
+    parser = LinkParser()
+    parser.feed(response.content[0:MAX_LINK_BYTES].decode(
+        response.charset or 'utf-8', 'replace'))
+    links = set(local_path(base, href, host) for href in parser.links)
+    links.discard(None)
+    return links
+
+
+def force_login(client, user):
+    if hasattr(client, 'force_login'):
+        return client.force_login(user)
+    # Django < 1.9; the same thing `Client.login` does once a user has
+    # been authenticated.
+    from django.contrib.auth import login
+    from django.http import HttpRequest
+    engine = import_module(settings.SESSION_ENGINE)
+    request = HttpRequest()
+    request.session = engine.SessionStore()
+    user.backend = settings.AUTHENTICATION_BACKENDS[0]
+    login(request, user)
+    request.session.save()
+    cookie = settings.SESSION_COOKIE_NAME
+    client.cookies[cookie] = request.session.session_key
+    client.cookies[cookie].update({
+        'max-age': None,
+        'path': '/',
+        'domain': settings.SESSION_COOKIE_DOMAIN,
+        'secure': settings.SESSION_COOKIE_SECURE or None,
+        'expires': None,
+    })
+    return None
+
+
+class Crawler(object):
+    """
+    Requests paths through the test client, as each of `usernames` (None
+    being anonymous), handing every response to `guesser.observe`. Each
+    thread has its own clients, and so its own sessions and connections.
+    """
+    __slots__ = (
+        'guesser',
+        'host',
+        'exclude',
+        '_local',
+    )
+
+    def __init__(self, guesser, host='testserver', exclude=()):
+        self.guesser = guesser
+        self.host = host
+        self.exclude = tuple(re.compile(pattern) for pattern in exclude)
+        self._local = local()
+
+    def is_excluded(self, path):
+        return any(pattern.search(path) for pattern in self.exclude)
+
+    def get_client(self, username):
+        clients = getattr(self._local, 'clients', None)
+        if clients is None:
+            clients = self._local.clients = {}
+        if username not in clients:
+            client = Client(HTTP_HOST=self.host)
+            if username is not None:
+                User = get_user_model()
+                user = User._default_manager.get_by_natural_key(username)
+                force_login(client, user)
+            clients[username] = client
+        return clients[username]
+
+    def fetch(self, task):
+        path, username = task
+        client = self.get_client(username)
+        recorder = QueryRecorder().start()
+        try:
+            response = client.get(path)
+        except Exception:
+            recorder.finish()
+            logger.exception("Unable to crawl %s", path)
+            return CrawlResult(path=path, username=username, status_code=None,
+                               links=())
+        queries = recorder.finish(
+            repeat_threshold=self.guesser.query_repeat_threshold)
+        request = getattr(response, 'wsgi_request', None)
+        if request is not None:
+            # the point of a crawl is to seed everything, so the sampler
+            # meant for live traffic doesn't get a say.
+            self.guesser.observe(
+                request, response, use_sampler=False,
+                queries=queries if self.guesser.record_queries else None)
+        if response.streaming:
+            # nothing is known about a stream until it has been read.
+            for chunk in response.streaming_content:
+                pass
+            response.close()
+        links = set(find_links(response, base=path, host=self.host))
+        location = response.get('Location')
+        if location:
+            links.add(local_path(path, location, self.host))
+            links.discard(None)
+        return CrawlResult(path=path, username=username,
+                           status_code=response.status_code,
+                           links=tuple(sorted(link for link in links
+                                              if not self.is_excluded(link))))
+
+    def crawl(self, pool, paths, usernames, depth, max_pages):
+        """
+        Breadth first from `paths`, following links `depth` times.
+        """
+        seen = set()
+        results = []
+        frontier = [(path, username) for path in paths for username in usernames
+                    if not self.is_excluded(path)]
+        for level in range(depth + 1):
+            tasks = []
+            for task in frontier:
+                if task not in seen and len(seen) < max_pages:
+                    seen.add(task)
+                    tasks.append(task)
+            if not tasks:
+                break
+            frontier = []
+            for result in pool.imap_unordered(self.fetch, tasks):
+                results.append(result)
+                frontier.extend((link, result.username) for link in result.links)
+        return results
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from collections import OrderedDict
+from hashlib import sha1
+from threading import Lock
+import errno
+import logging
+import os
+import struct
+
+logger = logging.getLogger(__name__)
+
+SEEN_FILENAME = '.testguess-seen'
+
+
+def make_key(view_name, magic_number, status_code, signature=None):
+    parts = (view_name, magic_number, str(status_code), signature or '')
+    raw = '\x1f'.join(parts).encode('utf-8')
+    # 16 hex characters is plenty to tell apart the views in a project and
+    # keeps the file on disk small.
+    return sha1(raw).hexdigest()[0:16]
+
+
+def response_signature(response):
+    header_names = sorted(name.lower() for name, value in response.headers)
+    parts = ['h:%s' % name for name in header_names]
+    parts.extend('k:%s' % key for key in response.context_keys or ())
+    parts.extend('t:%s:%s.%s' % part
+                 for part in sorted(response.context_types))
+    return sha1('\n'.join(parts).encode('utf-8')).hexdigest()[0:16]
+
+
+class KeyFilter(object):
+    """
+    A Bloom filter: `bits` bits however many keys are added, which can say
+    for certain that a key was never added, and otherwise that it may have
+    been.
+    """
+    __slots__ = (
+        'bits',
+        'array',
+    )
+
+    HASHES = 4
+
+    def __init__(self, bits=1 << 20):
+        self.bits = bits
+        self.array = bytearray((bits + 7) // 8)
+
+    def positions(self, key):
+        digest = sha1(key.encode('utf-8')).digest()
+        return tuple(number % self.bits for number in
+                     struct.unpack('>%dI' % self.HASHES, digest[0:4 * self.HASHES]))
+
+    def add(self, key):
+        for position in self.positions(key):
+            self.array[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.array[position >> 3] & (1 << (position & 7))
+                   for position in self.positions(key))
+
+    def clear(self):
+        self.array = bytearray(len(self.array))
+
+
+class SeenSet(object):
+    """
+    Keys of what has been generated: the most recent `maxsize` in an LRU,
+    and, when there is a `path`, every key ever written to it. A key evicted
+    from the LRU is looked for in the file, rather than generated (and
+    appended) all over again; a fixed-size filter of what the file holds
+    saves reading it for the keys which were never written.
+    """
+    __slots__ = (
+        'maxsize',
+        'path',
+        'entries',
+        'on_disk',
+        'offset',
+        '_lock',
+    )
+
+    def __init__(self, maxsize=1024, path=None, filter_bits=1 << 20):
+        self.maxsize = maxsize
+        self.path = path
+        self.entries = OrderedDict()
+        # everything read from, or written to, the file so far.
+        self.on_disk = KeyFilter(bits=filter_bits)
+        # how far into the on-disk file we have already read.
+        self.offset = 0
+        self._lock = Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            if self._touch(key):
+                return True
+            if self._on_disk(key):
+                self._remember(key)
+                return True
+            # another worker (or a previous run) may have written it.
+            return key in self._read_disk()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _touch(self, key):
+        if key in self.entries:
+            self.entries.pop(key)
+            self.entries[key] = True
+            return True
+        return False
+
+    def _remember(self, key):
+        self.entries.pop(key, None)
+        self.entries[key] = True
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def _on_disk(self, key):
+        if self.path is None or key not in self.on_disk:
+            return False
+        # most likely evicted from the LRU; make sure.
+        try:
+            with open(self.path, 'r') as f:
+                return any(line.strip() == key for line in f)
+        except (IOError, OSError) as e:
+            if e.errno != errno.ENOENT:
+                logger.warning("Unable to read %s", self.path, exc_info=1)
+            return False
+
+    def _read_disk(self):
+        if self.path is None:
+            return ()
+        try:
+            with open(self.path, 'r') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() < self.offset:
+                    # truncated or replaced underneath us, start over.
+                    self.offset = 0
+                    self.on_disk.clear()
+                f.seek(self.offset)
+                lines = f.readlines()
+                self.offset = f.tell()
+        except (IOError, OSError) as e:
+            if e.errno != errno.ENOENT:
+                logger.warning("Unable to read %s", self.path, exc_info=1)
+            return ()
+        keys = frozenset(line.strip() for line in lines) - frozenset(('',))
+        for key in keys:
+            self.on_disk.add(key)
+            self._remember(key)
+        return keys
+
+    def add(self, key):
+        with self._lock:
+            self._remember(key)
+            if self.path is None:
+                return True
+            if self._on_disk(key) or key in self._read_disk():
+                return True
+            self.on_disk.add(key)
+        try:
+            self._append(key)
+        except (IOError, OSError) as e:
+            if e.errno != errno.ENOENT:
+                raise
+            try:
+                os.makedirs(os.path.dirname(self.path))
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+            self._append(key)
+        return True
+
+    def _append(self, key):
+        # a single short write in append mode lands atomically, so several
+        # processes can share the file.
+        with open(self.path, 'a') as f:
+            f.write(key + '\n')
+
+
+_seen_sets = {}
+_seen_sets_lock = Lock()
+
+
+def get_seen_set(path, maxsize=1024):
+    with _seen_sets_lock:
+        if path not in _seen_sets:
+            _seen_sets[path] = SeenSet(maxsize=maxsize, path=path)
+        return _seen_sets[path]
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from hashlib import sha1
+import errno
+import json
+import os
+from .content import CONTENT_HTML5, CONTENT_JSON
+from .writers import atomic_write, release_path, wait_for_claim
+
+try:
+    from html.parser import HTMLParser
+except ImportError:  # pragma: no cover
+    from HTMLParser import HTMLParser
+
+FINGERPRINTS_FILENAME = 'fingerprints.json'
+# bodies bigger than this are not fingerprinted at all (JSON) or only up
+# to this point (HTML).
+MAX_BYTES = 65536
+MAX_DEPTH = 8
+MAX_PATHS = 200
+# how much of an HTML body is handed to the parser at a time.
+CHUNK_SIZE = 8192
+
+
+def json_paths(value, path, depth, paths):
+    if len(paths) >= MAX_PATHS:
+        return paths
+    paths.add('%s:%s' % (path, type(value).__name__))
+    if depth >= MAX_DEPTH:
+        return paths
+    if isinstance(value, dict):
+        for k in sorted(value):
+            json_paths(value[k], '%s.%s' % (path, k), depth + 1, paths)
+    elif isinstance(value, list):
+        # lists are treated as homogenous; only a handful of items are used.
+        for item in value[0:5]:
+            json_paths(item, '%s[]' % path, depth + 1, paths)
+    return paths
+
+
+def json_fingerprint(content, max_bytes=MAX_BYTES):
+    if len(content) > max_bytes:
+        return None
+    try:
+        data = json.loads(content.decode('utf-8'))
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return {'kind': CONTENT_JSON, 'max_bytes': max_bytes,
+            'paths': sorted(json_paths(data, '$', 0, set()))}
+
+
+class SkeletonParser(HTMLParser):
+    """
+    Hashes the sequence of tags and their attribute names (but not values,
+    which tend to hold CSRF tokens, timestamps and so on).
+    """
+    def __init__(self):
+        HTMLParser.__init__(self)
+        self.digest = sha1()
+        self.tags = 0
+
+    def handle_starttag(self, tag, attrs):
+        names = ','.join(sorted(set(name for name, value in attrs)))
+        self.digest.update(('<%s %s>' % (tag, names)).encode('utf-8'))
+        self.tags += 1
+
+    def handle_endtag(self, tag):
+        self.digest.update(('</%s>' % tag).encode('utf-8'))
+
+
+def html_fingerprint(content, max_bytes=MAX_BYTES):
+    parser = SkeletonParser()
+    view = memoryview(content)[0:max_bytes]
+    for offset in range(0, len(view), CHUNK_SIZE):
+        parser.feed(view[offset:offset + CHUNK_SIZE].tobytes().decode(
+            'utf-8', 'replace'))
+    return {'kind': CONTENT_HTML5, 'max_bytes': max_bytes,
+            'skeleton': parser.digest.hexdigest(), 'tags': parser.tags}
+
+
+FINGERPRINTERS = {
+    CONTENT_HTML5: html_fingerprint,
+    CONTENT_JSON: json_fingerprint,
+}
+
+
+def fingerprint_content(content_kind, content, max_bytes=MAX_BYTES):
+    fingerprinter = FINGERPRINTERS.get(content_kind)
+    if fingerprinter is None or not max_bytes:
+        return None
+    return fingerprinter(content, max_bytes=max_bytes)
+
+
+def fingerprints_path(test_file):
+    return os.path.join(os.path.dirname(test_file), FINGERPRINTS_FILENAME)
+
+
+def fingerprint_name(test_file):
+    return os.path.splitext(os.path.basename(test_file))[0]
+
+
+def read_fingerprints(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (IOError, OSError) as e:
+        if e.errno != errno.ENOENT:
+            raise
+    return {}
+
+
+def write_fingerprint(test_file, fingerprint):
+    """
+    Returns the number of bytes written, or None if the sidecar stayed
+    claimed by another writer for too long.
+    """
+    path = fingerprints_path(test_file)
+    # every module for the view shares the sidecar, so the read-modify-write
+    # must not interleave with another one.
+    lock = wait_for_claim(path)
+    if lock is None:
+        return None
+    try:
+        fingerprints = read_fingerprints(path)
+        fingerprints[fingerprint_name(test_file)] = fingerprint
+        return atomic_write(path, json.dumps(fingerprints, sort_keys=True,
+                                             separators=(',', ':')))
+    finally:
+        release_path(lock)
+
+
+def load_fingerprint(test_file):
+    """
+    For use by generated tests: `load_fingerprint(__file__)`
+    """
+    path = fingerprints_path(test_file)
+    return read_fingerprints(path).get(fingerprint_name(test_file))
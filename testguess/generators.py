@@ -1,18 +1,34 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import
 from functools import partial
-from django.template.loader import render_to_string
-
-TEST_HEADERS_TEMPLATE = partial(render_to_string, template_name='testguess/headers.py')
-TEST_STATUS_CODE_TEMPLATE = partial(render_to_string, template_name='testguess/status_code.py')
-TEST_REVERSE_TEMPLATE = partial(render_to_string, template_name='testguess/reverse_url.py')
-TEST_CUSTOM_USER_TEMPLATE = partial(render_to_string, template_name='testguess/custom_user.py')
-TEST_USER_TEMPLATE = partial(render_to_string, template_name='testguess/user.py')
-TEST_ANONYMOUS_USER_TEMPLATE = partial(render_to_string, template_name='testguess/anonymous_user.py')
-TEST_HTML5_OUTPUT_TEMPLATE = partial(render_to_string, template_name='testguess/html5.py')
-TEST_JSON_OUTPUT_TEMPLATE = partial(render_to_string, template_name='testguess/json.py')
-TEST_CONTEXT_DATA_TEMPLATE = partial(render_to_string, template_name='testguess/context_data.py')
+from django.conf import settings
+from .caching import cache_directives, vary_headers
+from .content import content_kind_of
+from .metrics import timed
+from .rendering import renderer
 
+TEST_HEADERS_TEMPLATE = partial(renderer.render, template_name='testguess/headers.py')
+TEST_STATUS_CODE_TEMPLATE = partial(renderer.render, template_name='testguess/status_code.py')
+TEST_REVERSE_TEMPLATE = partial(renderer.render, template_name='testguess/reverse_url.py')
+TEST_CUSTOM_USER_TEMPLATE = partial(renderer.render, template_name='testguess/custom_user.py')
+TEST_USER_TEMPLATE = partial(renderer.render, template_name='testguess/user.py')
+TEST_ANONYMOUS_USER_TEMPLATE = partial(renderer.render, template_name='testguess/anonymous_user.py')
+TEST_HTML5_OUTPUT_TEMPLATE = partial(renderer.render, template_name='testguess/html5.py')
+TEST_JSON_OUTPUT_TEMPLATE = partial(renderer.render, template_name='testguess/json.py')
+TEST_CONTEXT_DATA_TEMPLATE = partial(renderer.render, template_name='testguess/context_data.py')
+TEST_STREAMING_TEMPLATE = partial(renderer.render, template_name='testguess/streaming.py')
+TEST_QUERIES_TEMPLATE = partial(renderer.render, template_name='testguess/queries.py')
+TEST_BUDGET_TEMPLATE = partial(renderer.render, template_name='testguess/budget.py')
+TEST_MEMORY_TEMPLATE = partial(renderer.render, template_name='testguess/memory.py')
+TEST_CACHE_TEMPLATE = partial(renderer.render, template_name='testguess/cache.py')
+
+# what a JSON body must decode to, going by its first character.
+JSON_TYPES = {b'{': 'dict', b'[': 'list'}
+# answers conditional requests for any view which sets a validator.
+CONDITIONAL_GET_MIDDLEWARE = 'django.middleware.http.ConditionalGetMiddleware'
+
+
+@timed('generators.generate_user_for_setup')
 def generate_user_for_setup(config, context, **kwargs):
     if not config.is_authenticated:
         return TEST_ANONYMOUS_USER_TEMPLATE(context=context)
@@ -22,48 +38,138 @@ def generate_user_for_setup(config, context, **kwargs):
         return TEST_USER_TEMPLATE(context=context)
 
 
-def generate_content_parsing_test(config, context, **kwargs):
+@timed('generators.generate_content_parsing_test')
+def generate_content_parsing_test(config, context, response, **kwargs):
+    if getattr(config, 'is_streaming', False):
+        return None
+    # the fingerprint itself lives in a sidecar file next to the module.
+    context2 = context.copy()
+    context2['response'] = dict(
+        context['response'],
+        has_fingerprint=getattr(response, 'fingerprint', None) is not None,
+        json_type=JSON_TYPES.get(response.content_prefix.lstrip()[0:1]))
     if config.is_html5 and config.supports_html5lib:
-        return TEST_HTML5_OUTPUT_TEMPLATE(context=context)
+        return TEST_HTML5_OUTPUT_TEMPLATE(context=context2)
     elif config.is_json:
-        return TEST_JSON_OUTPUT_TEMPLATE(context=context)
+        return TEST_JSON_OUTPUT_TEMPLATE(context=context2)
     return None
 
 
+@timed('generators.generate_context_data_test')
 def generate_context_data_test(config, context, response, **kwargs):
-    if config.has_context_data:
-        context2 = context.copy()
-        context2['response']['context_keys'] = sorted(set(
-            response.context_data.keys()
-        ))
-        context_types = tuple(
-            (k, type(v)) for k, v in response.context_data.items()
-        )
-        context_imports_parts = tuple(
-            (k, t.__module__, t.__name__)
-            for k, t in context_types
-            if hasattr(t, '__module__') and hasattr(t, '__name__')
-            and t.__name__ not in ('__proxy__',)
-        )
-        context_imports = sorted(
+    if config.has_context_data and response.context_keys is not None:
+        context_imports_parts = response.context_types
+        context_imports = sorted(set(
             (mod, name) for k, mod, name in context_imports_parts
-            if mod != '__builtin__' and name != 'type'
-        )
+            if mod not in ('__builtin__', 'builtins') and name != 'type'
+        ))
         context_instances = sorted(
             (k, name) for k, mod, name in context_imports_parts
         )
-        context2['response']['context_value_imports'] = context_imports
-        context2['response']['context_values'] = context_instances
+        context_structure = tuple(
+            (''.join('[%r]' % k for k in nested.path), list(nested.keys),
+             nested.complete)
+            for nested in response.context_structure
+        )
+        # `context` is shared between every generator, so don't modify the
+        # nested dictionaries in place.
+        context2 = context.copy()
+        context2['response'] = dict(
+            context['response'],
+            context_keys=list(response.context_keys),
+            context_value_imports=context_imports,
+            context_values=context_instances,
+            context_structure=context_structure,
+        )
         return TEST_CONTEXT_DATA_TEMPLATE(context=context2)
     return None
 
 
+@timed('generators.generate_status_code_test')
 def generate_status_code_test(context, **kwargs):
     return TEST_STATUS_CODE_TEMPLATE(context=context)
 
 
+@timed('generators.generate_url_reverse_test')
 def generate_url_reverse_test(context, **kwargs):
     return TEST_REVERSE_TEMPLATE(context=context)
 
+@timed('generators.generate_response_headers_test')
 def generate_response_headers_test(context, **kwargs):
     return TEST_HEADERS_TEMPLATE(context=context)
+
+
+@timed('generators.generate_streaming_test')
+def generate_streaming_test(config, context, response, **kwargs):
+    if getattr(config, 'is_streaming', False) and response.content_length is not None:
+        context2 = context.copy()
+        context2['response'] = dict(context['response'],
+                                    content_kind=content_kind_of(config),
+                                    content_length=response.content_length,
+                                    # sizes of exports drift; allow 10%.
+                                    content_length_delta=max(1, response.content_length // 10))
+        return TEST_STREAMING_TEMPLATE(context=context2)
+    return None
+
+
+@timed('generators.generate_query_count_test')
+def generate_query_count_test(config, context, response, **kwargs):
+    queries = getattr(response, 'queries', None)
+    if getattr(config, 'is_streaming', False) or queries is None:
+        return None
+    context2 = context.copy()
+    context2['response'] = dict(context['response'], queries=queries._asdict())
+    return TEST_QUERIES_TEMPLATE(context=context2)
+
+
+@timed('generators.generate_budget_test')
+def generate_budget_test(config, context, **kwargs):
+    budget = context.get('budget')
+    if getattr(config, 'is_streaming', False) or budget is None:
+        return None
+    context2 = dict(context, budget=budget._asdict())
+    return TEST_BUDGET_TEMPLATE(context=context2)
+
+
+@timed('generators.generate_memory_test')
+def generate_memory_test(config, context, **kwargs):
+    memory = context.get('memory')
+    if getattr(config, 'is_streaming', False) or memory is None:
+        return None
+    context2 = dict(context, memory=memory._asdict())
+    return TEST_MEMORY_TEMPLATE(context=context2)
+
+
+def revalidates():
+    """
+    Whether the middleware answers conditional requests. A view which sets
+    a validator itself only does if it also checks one (say, with
+    `@condition`), which can't be told from its response, so nothing is
+    assumed of it.
+    """
+    middleware = (getattr(settings, 'MIDDLEWARE', None) or
+                  getattr(settings, 'MIDDLEWARE_CLASSES', None) or ())
+    return CONDITIONAL_GET_MIDDLEWARE in middleware
+
+
+@timed('generators.generate_cache_test')
+def generate_cache_test(config, context, response, **kwargs):
+    headers = dict((k.lower(), v) for k, v in response.headers)
+    cache_control = headers.get('cache-control')
+    vary = headers.get('vary')
+    validated = (getattr(config, 'has_etag', False) or
+                 getattr(config, 'has_last_modified', False))
+    # revalidating only means anything for a successful GET.
+    conditional = (validated and config.is_get and
+                   response.status_code == 200 and revalidates())
+    if not validated and cache_control is None and vary is None:
+        return None
+    context2 = context.copy()
+    context2['response'] = dict(
+        context['response'],
+        conditional=conditional,
+        cache_control=(None if cache_control is None
+                       else repr(dict(sorted(cache_directives(cache_control).items())))),
+        vary=None if vary is None else repr(vary_headers(vary)),
+    )
+    return TEST_CACHE_TEMPLATE(context=context2)
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from collections import namedtuple
+from threading import Lock
+
+ContextSummary = namedtuple('ContextSummary', 'keys types structure')
+# `path` is the tuple of keys leading to a nested dict, `keys` are (up to
+# `max_width` of) its keys and `complete` says whether that is all of them.
+NestedKeys = namedtuple('NestedKeys', 'path keys complete')
+
+SIMPLE_KEY_TYPES = (type(u''), type(''), int)
+
+_type_paths = {}
+_type_paths_lock = Lock()
+
+
+def type_path(type_):
+    """
+    Returns `(module, name)` for a type, or None if it can't be imported
+    by name in a generated test.
+    """
+    try:
+        return _type_paths[type_]
+    except KeyError:
+        pass
+    module = getattr(type_, '__module__', None)
+    name = getattr(type_, '__name__', None)
+    path = None
+    if module is not None and name is not None and name not in ('__proxy__',):
+        path = (module, name)
+    with _type_paths_lock:
+        _type_paths[type_] = path
+    return path
+
+
+class ContextIntrospector(object):
+    __slots__ = (
+        'max_depth',
+        'max_width',
+    )
+
+    def __init__(self, max_depth=3, max_width=50):
+        self.max_depth = max_depth
+        self.max_width = max_width
+
+    def describe(self, context_data):
+        # only ever `type()` values: `isinstance` and attribute access go
+        # through `__class__`/`__getattr__`, which makes lazy objects
+        # evaluate themselves, and iterating a QuerySet runs it.
+        items = tuple(context_data.items())
+        types = tuple(
+            (k,) + path for k, path in ((k, type_path(type(v)))
+                                        for k, v in items)
+            if path is not None
+        )
+        structure = []
+        for k, v in items:
+            self.walk(value=v, path=(k,), depth=1, structure=structure)
+        return ContextSummary(keys=tuple(sorted(set(k for k, v in items))),
+                              types=types, structure=tuple(structure))
+
+    def walk(self, value, path, depth, structure):
+        if depth > self.max_depth or not issubclass(type(value), dict):
+            return structure
+        keys = []
+        complete = True
+        for position, k in enumerate(value):
+            if position >= self.max_width:
+                complete = False
+                break
+            if not isinstance(k, SIMPLE_KEY_TYPES):
+                complete = False
+                continue
+            keys.append(k)
+        structure.append(NestedKeys(path=path, keys=tuple(sorted(keys, key=repr)),
+                                    complete=complete))
+        for k in keys:
+            self.walk(value=value[k], path=path + (k,), depth=depth + 1,
+                      structure=structure)
+        return structure
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from threading import Lock, current_thread, local
+import errno
+import os
+import socket
+import sqlite3
+import time
+
+LEDGER_FILENAME = '.testguess-ledger.sqlite3'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS claims (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    claimed_at REAL NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0
+)
+"""
+INSERT_CLAIM = ("INSERT OR IGNORE INTO claims (key, owner, claimed_at, done) "
+                "VALUES (?, ?, ?, 0)")
+# an existing row can be taken over if it is ours already, if its claimant
+# seems to have died, or if the work was finished long enough ago that it
+# is worth looking at again.
+TAKE_CLAIM = ("UPDATE claims SET owner = ?, claimed_at = ?, done = 0 "
+              "WHERE key = ? AND ((done = 0 AND (owner = ? OR claimed_at < ?)) "
+              "OR (done = 1 AND claimed_at < ?))")
+COMPLETE_CLAIM = "UPDATE claims SET done = 1, claimed_at = ? WHERE key = ? AND owner = ?"
+RELEASE_CLAIM = "DELETE FROM claims WHERE key = ? AND owner = ? AND done = 0"
+SELECT_CLAIM = "SELECT owner, claimed_at, done FROM claims WHERE key = ?"
+
+
+def default_owner():
+    return '%s:%d:%d' % (socket.gethostname(), os.getpid(),
+                         current_thread().ident)
+
+
+class WorkLedger(object):
+    """
+    Lets several processes agree on which of them generates a given
+    (view, magic number), via a SQLite database in WAL mode.
+
+    `timeout` is how long to wait for another writer; on the request path it
+    should be short, and a claim which can't be had in time is simply not
+    had (`sqlite3.OperationalError` is raised).
+    """
+    __slots__ = (
+        'path',
+        'stale_after',
+        'done_ttl',
+        'timeout',
+        '_local',
+    )
+
+    def __init__(self, path, stale_after=60, done_ttl=3600, timeout=0.1):
+        self.path = path
+        self.stale_after = stale_after
+        self.done_ttl = done_ttl
+        self.timeout = timeout
+        self._local = local()
+
+    @property
+    def owner(self):
+        # recomputed so that threads and forked children don't share one.
+        return default_owner()
+
+    def connection(self):
+        # sqlite connections must not cross threads or a fork.
+        pid = os.getpid()
+        conn = getattr(self._local, 'connection', None)
+        if conn is not None and self._local.pid == pid:
+            return conn
+        directory = os.path.dirname(self.path)
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        conn = sqlite3.connect(self.path, timeout=self.timeout,
+                               isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(SCHEMA)
+        self._local.connection = conn
+        self._local.pid = pid
+        return conn
+
+    def is_settled(self, key, owner, now):
+        """
+        Whether `key` is done, or being done by someone else, without taking
+        the write lock; most keys are, most of the time.
+        """
+        row = self.connection().execute(SELECT_CLAIM, (key,)).fetchone()
+        if row is None:
+            return False
+        claimed_by, claimed_at, done = row
+        if done:
+            return claimed_at >= now - self.done_ttl
+        return claimed_by != owner and claimed_at >= now - self.stale_after
+
+    def claim(self, key):
+        if self.is_settled(key, owner=self.owner, now=time.time()):
+            return False
+        return key in self.claim_many((key,))
+
+    def claim_many(self, keys):
+        owner = self.owner
+        now = time.time()
+        stale = now - self.stale_after
+        expired = now - self.done_ttl
+        claimed = set()
+        conn = self.connection()
+        # one write transaction for the whole batch.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for key in keys:
+                cursor = conn.execute(INSERT_CLAIM, (key, owner, now))
+                if cursor.rowcount != 1:
+                    cursor = conn.execute(TAKE_CLAIM, (owner, now, key, owner,
+                                                       stale, expired))
+                if cursor.rowcount == 1:
+                    claimed.add(key)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return claimed
+
+    def complete(self, key):
+        return self.complete_many((key,))
+
+    def complete_many(self, keys):
+        owner = self.owner
+        now = time.time()
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            done = sum(conn.execute(COMPLETE_CLAIM, (now, key, owner)).rowcount
+                       for key in keys)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return done
+
+    def release(self, key):
+        conn = self.connection()
+        return conn.execute(RELEASE_CLAIM, (key, self.owner)).rowcount
+
+
+_ledgers = {}
+_ledgers_lock = Lock()
+
+
+def get_ledger(path, stale_after=60, done_ttl=3600, timeout=0.1):
+    # keyed on everything a ledger is built from, so that replay's longer
+    # timeout doesn't get the request path's ledger, or vice versa.
+    key = (path, stale_after, done_ttl, timeout)
+    with _ledgers_lock:
+        if key not in _ledgers:
+            _ledgers[key] = WorkLedger(path=path, stale_after=stale_after,
+                                       done_ttl=done_ttl, timeout=timeout)
+        return _ledgers[key]
+
+
+def make_ledger_key(view_name, magic_number):
+    return '%s:%s' % (view_name, magic_number)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from collections import Counter
+from multiprocessing.pool import ThreadPool
+from django.core.management.base import BaseCommand
+from testguess.crawling import Crawler, reversible_paths
+from testguess.middleware import GuessResponse
+from testguess.workers import get_generation_queue
+
+
+class Command(BaseCommand):
+    help = ("Generate tests by requesting every argument-less named URL, and "
+            "the links found on them, through the test client")
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', metavar='path',
+                            help="Paths to start from, in addition to every "
+                                 "reversible named URL")
+        parser.add_argument('--user', action='append', dest='usernames',
+                            default=[], metavar='USERNAME',
+                            help="Also crawl as this user; may be repeated")
+        parser.add_argument('--no-anonymous', action='store_false',
+                            dest='anonymous', default=True,
+                            help="Don't crawl as an anonymous user")
+        parser.add_argument('--depth', type=int, default=2,
+                            help="How many times to follow links")
+        parser.add_argument('--max-pages', type=int, default=1000,
+                            help="Stop after this many requests")
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--host', default='testserver',
+                            help="Host header to send, which must be in "
+                                 "ALLOWED_HOSTS")
+        parser.add_argument('--exclude', action='append', default=None,
+                            metavar='REGEX',
+                            help="Skip paths matching this; defaults to "
+                                 "anything with 'logout' in it")
+
+    def handle(self, *args, **options):
+        usernames = list(options['usernames'])
+        if options['anonymous']:
+            usernames.insert(0, None)
+        exclude = options['exclude']
+        if exclude is None:
+            exclude = [r'logout']
+        paths = sorted(set(options['paths']) | set(reversible_paths()))
+        crawler = Crawler(guesser=GuessResponse(), host=options['host'],
+                          exclude=exclude)
+        pool = ThreadPool(processes=options['threads'])
+        try:
+            results = crawler.crawl(pool, paths=paths, usernames=usernames,
+                                    depth=options['depth'],
+                                    max_pages=options['max_pages'])
+        finally:
+            pool.close()
+            pool.join()
+        # streamed responses, and everything in background mode, are
+        # finished off on the generation queue.
+        get_generation_queue().flush()
+        statuses = Counter(result.status_code for result in results)
+        self.stdout.write("Crawled %d pages as %d users: %s" % (
+            len(results), len(usernames),
+            ', '.join('%s: %d' % (status or 'error', count)
+                      for status, count in sorted(statuses.items(),
+                                                  key=lambda i: str(i[0])))))
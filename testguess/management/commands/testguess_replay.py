@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from functools import partial
+from multiprocessing import Pool
+import os
+from tempfile import gettempdir
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from testguess.middleware import GuessResponse
+from testguess.observations import ObservationLog, unique_observations
+
+
+def replay_observation(observation, use_ledger=True):
+    # runs in pool workers, which inherit a configured Django when forked.
+    return GuessResponse().replay(observation, use_ledger=use_ledger) or 0
+
+
+class Command(BaseCommand):
+    help = ("Generate tests from observations recorded with "
+            "TESTGUESS_MODE = 'record'")
+
+    def add_arguments(self, parser):
+        parser.add_argument('logs', nargs='*', metavar='log',
+                            help="Observation logs to replay, defaulting to "
+                                 "TESTGUESS_OBSERVATION_LOG")
+        parser.add_argument('--processes', type=int, default=None,
+                            help="Number of worker processes, defaulting to "
+                                 "the number of CPUs")
+        parser.add_argument('--chunksize', type=int, default=16)
+
+    def handle(self, *args, **options):
+        logs = options['logs'] or [getattr(
+            settings, 'TESTGUESS_OBSERVATION_LOG',
+            os.path.join(gettempdir(), 'testguess-observations.jsonl'))]
+        missing = [log for log in logs if not os.path.exists(log)]
+        if missing:
+            raise CommandError("No such observation log: %s" % ', '.join(missing))
+        observations = unique_observations(ObservationLog(path=log)
+                                           for log in logs)
+        total = len(observations)
+        # with a ledger, everything is claimed up front in one transaction,
+        # and the workers needn't touch it at all.
+        ledger, keys = GuessResponse().get_replay_ledger(observations)
+        if ledger is not None:
+            claimed = ledger.claim_many(keys)
+            observations = tuple(o for o, key in zip(observations, keys)
+                                 if key in claimed)
+        replay = partial(replay_observation, use_ledger=ledger is None)
+        try:
+            processes = options['processes']
+            if processes == 1:
+                generated = sum(replay(o) for o in observations)
+            else:
+                pool = Pool(processes=processes)
+                try:
+                    generated = sum(pool.imap_unordered(
+                        replay, observations, chunksize=options['chunksize']))
+                finally:
+                    pool.close()
+                    pool.join()
+        except Exception:
+            if ledger is not None:
+                for key in claimed:
+                    ledger.release(key)
+            raise
+        if ledger is not None:
+            ledger.complete_many(claimed)
+        self.stdout.write("Replayed %d unique observations, generated %d "
+                          "test modules" % (total, generated))
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from threading import Lock
+import errno
+import json
+import logging
+import os
+import time
+from .writers import atomic_write
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = '.testguess-manifest.json'
+
+
+class Manifest(object):
+    """
+    Records, for every generated module, a hash of what was observed when it
+    was written, so that identical observations can skip rendering and
+    leave the file (and its mtime) alone.
+    """
+    __slots__ = (
+        'path',
+        'entries',
+        'flush_interval',
+        'loaded_mtime',
+        'saved_at',
+        'dirty',
+        '_lock',
+    )
+
+    def __init__(self, path, flush_interval=60):
+        self.path = path
+        self.entries = {}
+        self.flush_interval = flush_interval
+        self.loaded_mtime = None
+        self.saved_at = 0
+        self.dirty = False
+        self._lock = Lock()
+
+    def _mtime(self):
+        try:
+            return os.path.getmtime(self.path)
+        except OSError:
+            return None
+
+    def load(self):
+        mtime = self._mtime()
+        if mtime is None or mtime == self.loaded_mtime:
+            return False
+        try:
+            with open(self.path, 'r') as f:
+                entries = json.load(f)
+        except (IOError, OSError, ValueError):
+            logger.warning("Unable to read %s", self.path, exc_info=1)
+            return False
+        with self._lock:
+            # whatever other workers wrote, plus anything we haven't saved.
+            entries.update(self.entries if self.dirty else {})
+            self.entries = entries
+            self.loaded_mtime = mtime
+        return True
+
+    def is_current(self, name, digest):
+        self.load()
+        entry = self.entries.get(name)
+        return entry is not None and entry['hash'] == digest
+
+    def seen(self, name):
+        with self._lock:
+            entry = self.entries.get(name)
+            if entry is None:
+                return False
+            entry['last_seen'] = int(time.time())
+            self.dirty = True
+        if time.time() - self.saved_at >= self.flush_interval:
+            self.save()
+        return True
+
+    def update(self, name, digest, view_name):
+        self.load()
+        with self._lock:
+            self.entries[name] = {'hash': digest, 'view': view_name,
+                                  'last_seen': int(time.time())}
+            self.dirty = True
+        return self.save()
+
+    def save(self):
+        with self._lock:
+            if not self.dirty:
+                return False
+            content = json.dumps(self.entries, indent=1, sort_keys=True)
+            self.dirty = False
+            self.saved_at = time.time()
+        try:
+            atomic_write(self.path, content)
+        except (IOError, OSError) as e:
+            if e.errno != errno.ENOENT:
+                raise
+            logger.warning("Unable to write %s", self.path, exc_info=1)
+            return False
+        self.loaded_mtime = self._mtime()
+        return True
+
+
+_manifests = {}
+_manifests_lock = Lock()
+
+
+def get_manifest(path, flush_interval=60):
+    with _manifests_lock:
+        if path not in _manifests:
+            _manifests[path] = Manifest(path=path, flush_interval=flush_interval)
+        return _manifests[path]
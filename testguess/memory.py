@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Peak traced allocation across a view, via `tracemalloc` (Python 3.4+).
+
+`tracemalloc` sees every thread in the process, so only one request is
+measured at a time, and anything other threads allocate meanwhile is
+counted too; sample rarely, and treat the numbers as an upper bound.
+"""
+from __future__ import absolute_import
+from collections import namedtuple
+from random import random
+from threading import Lock
+import math
+import time
+from .timing import BASELINE_PATH
+from .writers import update_json
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+MemoryBudget = namedtuple('MemoryBudget', 'peak budget')
+
+MEMORY_FILENAME = '.testguess-memory.json'
+
+# peaks are rounded up into buckets growing by GAMMA, so the budget only
+# moves when a view's allocations really have.
+MINIMUM = 1024
+GAMMA = 1.25
+_LOG_GAMMA = math.log(GAMMA)
+# the peak of a whole request through the test client wanders by a few
+# KB from run to run, whatever the view does.
+MINIMUM_BUDGET = 16384
+
+_measuring = Lock()
+
+
+def round_up(size):
+    if size <= MINIMUM:
+        return MINIMUM
+    index = int(math.ceil(math.log(float(size) / MINIMUM) / _LOG_GAMMA - 1e-9))
+    return int(math.ceil(MINIMUM * GAMMA ** index))
+
+
+class Measurement(object):
+    __slots__ = (
+        'started_tracing',
+        'baseline',
+    )
+
+    def __init__(self, started_tracing, baseline):
+        self.started_tracing = started_tracing
+        self.baseline = baseline
+
+
+def start_measuring():
+    if tracemalloc.is_tracing():
+        # someone else is tracing; measure from here without disturbing them.
+        baseline = tracemalloc.get_traced_memory()[0]
+        reset_peak = getattr(tracemalloc, 'reset_peak', None)
+        if reset_peak is not None:
+            reset_peak()
+        return Measurement(started_tracing=False, baseline=baseline)
+    tracemalloc.start()
+    return Measurement(started_tracing=True, baseline=0)
+
+
+def finish_measuring(measurement):
+    peak = tracemalloc.get_traced_memory()[1]
+    if measurement.started_tracing:
+        tracemalloc.stop()
+    return max(0, peak - measurement.baseline)
+
+
+def start_sample(rate):
+    """
+    Returns a `Measurement` for roughly `rate` of calls, provided nothing
+    else is being measured, or None.
+    """
+    if tracemalloc is None or random() >= rate:
+        return None
+    if not _measuring.acquire(False):
+        return None
+    try:
+        return start_measuring()
+    except Exception:
+        _measuring.release()
+        raise
+
+
+def finish_sample(measurement):
+    try:
+        return finish_measuring(measurement)
+    finally:
+        _measuring.release()
+
+
+def peak_allocated(func):
+    """
+    For use by generated tests: the peak traced allocation of calling `func`,
+    after calling it once to fill whatever caches it fills.
+    """
+    func()
+    with _measuring:
+        measurement = start_measuring()
+        try:
+            func()
+        finally:
+            peak = finish_measuring(measurement)
+    return peak
+
+
+def client_overhead(client):
+    """
+    For use by generated tests: the peak traced allocation of a request
+    through `client` which never reaches a view.
+    """
+    return peak_allocated(lambda: client.get(BASELINE_PATH))
+
+
+class MemoryPeaks(object):
+    """
+    The largest peak seen per (view, magic number), which `sync` merges with
+    those other processes have saved to a file.
+    """
+    __slots__ = (
+        'peaks',
+        'unsaved',
+        'synced_at',
+        '_lock',
+    )
+
+    def __init__(self):
+        self.peaks = {}
+        self.unsaved = {}
+        self.synced_at = 0
+        self._lock = Lock()
+
+    def add(self, key, peak):
+        peak = round_up(peak)
+        with self._lock:
+            if peak > self.peaks.get(key, 0):
+                self.peaks[key] = peak
+            if peak > self.unsaved.get(key, 0):
+                self.unsaved[key] = peak
+
+    def sync(self, path):
+        with self._lock:
+            unsaved, self.unsaved = self.unsaved, {}
+
+        def update(data):
+            for key, peak in unsaved.items():
+                data[key] = max(peak, data.get(key, 0))
+
+        data = update_json(path, update)
+        with self._lock:
+            if data is None:
+                for key, peak in unsaved.items():
+                    self.unsaved[key] = max(peak, self.unsaved.get(key, 0))
+                return False
+            for key, peak in data.items():
+                self.peaks[key] = max(peak, self.peaks.get(key, 0))
+            self.synced_at = time.time()
+        return True
+
+    def budget(self, key, factor):
+        with self._lock:
+            peak = self.peaks.get(key)
+        if peak is None:
+            return None
+        return MemoryBudget(peak=peak, budget=round_up(peak * factor))
+
+    def clear(self):
+        with self._lock:
+            self.peaks.clear()
+            self.unsaved.clear()
+
+
+memory_peaks = MemoryPeaks()
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from functools import wraps
+import logging
+import socket
+import time
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+now = getattr(time, 'monotonic', time.time)
+
+TIMING = 'timing'
+COUNTER = 'counter'
+
+# the active sink; None means instrumentation is off and costs a global
+# lookup per instrumented call.
+_sink = None
+# the settings `_sink` was last built from; middleware is constructed once
+# per replayed observation, and rebuilding the sink each time would open a
+# new statsd socket each time.
+_configured_from = None
+
+SETTINGS = (
+    'TESTGUESS_METRICS',
+    'TESTGUESS_STATSD_HOST',
+    'TESTGUESS_STATSD_PORT',
+    'TESTGUESS_STATSD_PREFIX',
+)
+
+
+class LoggingSink(object):
+    __slots__ = ('logger', 'level')
+
+    def __init__(self, logger_name=__name__, level=logging.INFO):
+        self.logger = logging.getLogger(logger_name)
+        self.level = level
+
+    def record(self, name, kind, value):
+        self.logger.log(self.level, "%s %s %s", kind, name, value)
+
+
+class SignalSink(object):
+    __slots__ = ()
+
+    def record(self, name, kind, value):
+        from .signals import metric_recorded
+        metric_recorded.send(sender=self.__class__, name=name, kind=kind,
+                             value=value)
+
+
+class StatsdSink(object):
+    __slots__ = ('address', 'prefix', 'socket')
+
+    def __init__(self, host='127.0.0.1', port=8125, prefix='testguess'):
+        self.address = (host, port)
+        self.prefix = prefix
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def record(self, name, kind, value):
+        if kind == TIMING:
+            line = '%s.%s:%.3f|ms' % (self.prefix, name, value * 1000)
+        else:
+            line = '%s.%s:%d|c' % (self.prefix, name, value)
+        try:
+            self.socket.sendto(line.encode('ascii'), self.address)
+        except socket.error:
+            # metrics must never take the request down with them.
+            logger.debug("Unable to send %s", line, exc_info=1)
+
+
+SINKS = {
+    'logging': LoggingSink,
+    'signal': SignalSink,
+}
+
+
+def configure(sink):
+    global _sink
+    _sink = sink
+    return sink
+
+
+def configure_from_settings():
+    """
+    Builds the sink named by the settings, unless the active one was
+    already built from the same settings.
+    """
+    global _configured_from
+    configured_from = tuple(getattr(settings, name, None) for name in SETTINGS)
+    if configured_from == _configured_from:
+        return _sink
+    _configured_from = configured_from
+    name = getattr(settings, 'TESTGUESS_METRICS', None)
+    if name is None:
+        return configure(None)
+    if name == 'statsd':
+        return configure(StatsdSink(
+            host=getattr(settings, 'TESTGUESS_STATSD_HOST', '127.0.0.1'),
+            port=getattr(settings, 'TESTGUESS_STATSD_PORT', 8125),
+            prefix=getattr(settings, 'TESTGUESS_STATSD_PREFIX', 'testguess'),
+        ))
+    if name in SINKS:
+        return configure(SINKS[name]())
+    return configure(import_string(name)())
+
+
+def increment(name, value=1):
+    sink = _sink
+    if sink is not None:
+        sink.record(name=name, kind=COUNTER, value=value)
+
+
+def timed(name):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            sink = _sink
+            if sink is None:
+                return func(*args, **kwargs)
+            started = now()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                sink.record(name=name, kind=TIMING, value=now() - started)
+        return wrapper
+    return decorator
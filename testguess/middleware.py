@@ -2,19 +2,55 @@
 from __future__ import absolute_import
 from collections import namedtuple, OrderedDict
 from functools import partial
+from hashlib import sha1
 from importlib import import_module
 from tempfile import gettempdir
+from threading import Lock
+import errno
 import logging
-from django.core.urlresolvers import resolve
-from django.utils.datetime_safe import datetime
+try:
+    from django.utils.datetime_safe import datetime
+except ImportError:  # Django >= 5.0
+    from datetime import datetime
 import os
+import sqlite3
+import time
 from django.conf import settings
-from django.template.loader import render_to_string
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from .caching import is_cacheable
+from .content import (chunks_head, classify, classify_response,
+                      observe_stream, response_chunks,
+                      CONTENT_HTML5, CONTENT_JSON, CONTENT_XML, CONTENT_TEXT,
+                      CONTENT_CSV, CONTENT_BINARY)
+from . import metrics
+from .fingerprints import (MAX_BYTES as FINGERPRINT_MAX_BYTES,
+                           fingerprint_content, write_fingerprint)
+from .introspection import ContextIntrospector
+from .memory import MEMORY_FILENAME, finish_sample, memory_peaks, start_sample
+from .ledger import LEDGER_FILENAME, get_ledger, make_ledger_key
+from .manifest import MANIFEST_FILENAME, get_manifest
+from .dedup import SEEN_FILENAME, get_seen_set, make_key, response_signature
+from .observations import (get_observation_log, observation_from_dict,
+                           observation_timings, observation_to_dict)
+from .queries import REPEAT_THRESHOLD, QueryRecorder
+from .timing import TIMINGS_FILENAME, Timing, cpu_now, latency_sketches
+from .rendering import renderer
+from .resolving import resolve_cache
+from .sampling import get_sampler, make_sample_key
+from .snapshots import snapshot_request, snapshot_response, user_is_authenticated
+from .workers import get_generation_queue
+from .writers import atomic_write, claim_path, release_path
 from .generators import (generate_user_for_setup,
                          generate_content_parsing_test,
                          generate_context_data_test,
                          generate_status_code_test, generate_url_reverse_test,
-                         generate_response_headers_test)
+                         generate_response_headers_test,
+                         generate_streaming_test,
+                         generate_query_count_test,
+                         generate_budget_test,
+                         generate_memory_test,
+                         generate_cache_test)
 
 try:
     from django.contrib.auth import get_user_model
@@ -35,10 +71,71 @@ except ImportError:
 logger = logging.getLogger(__name__)
 PathTestFile = namedtuple("PathTestFile", 'directory file')
 PrepareResult = namedtuple("PrepareResult", 'project_root tree')
+ProjectPaths = namedtuple("ProjectPaths", 'root app_root test_root permissions')
+
+
+GUESS_INLINE = 'inline'
+GUESS_BACKGROUND = 'background'
+GUESS_RECORD = 'record'
+
+EMPTY_INIT_TEMPLATE = partial(renderer.render, template_name="testguess/empty_init.py")
+TEST_TEMPLATE = partial(renderer.render, template_name='testguess/generated_class.py')
+
+
+_ensured_directories = set()
+_ensured_lock = Lock()
+
+
+def ensure_directory(directory, perm):
+    try:
+        os.makedirs(directory, perm)
+    except OSError as e:
+        # another process or thread got there first, which is fine.
+        if e.errno != errno.EEXIST or not os.path.isdir(directory):
+            raise
+    return directory
+
 
+def ensure_file(filename, content):
+    try:
+        fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except OSError as e:
+        if e.errno == errno.EEXIST:
+            return False
+        raise
+    rendered = content()
+    with os.fdopen(fd, 'w') as f:
+        f.write(rendered)
+    metrics.increment('bytes_written', len(rendered))
+    return True
 
-EMPTY_INIT_TEMPLATE = partial(render_to_string, template_name="testguess/empty_init.py")
-TEST_TEMPLATE = partial(render_to_string, template_name='testguess/generated_class.py')
+
+def clear_ensured_directories():
+    with _ensured_lock:
+        _ensured_directories.clear()
+
+
+# settings object id -> ProjectPaths; working these out can mean importing
+# the settings module, so it's done once per process (or settings change).
+_project_paths = {}
+_project_paths_lock = Lock()
+
+
+@receiver(setting_changed)
+def clear_project_paths(**kwargs):
+    with _project_paths_lock:
+        _project_paths.clear()
+
+
+def content_config_kwargs(content_kind):
+    return dict(
+        is_html5=content_kind == CONTENT_HTML5,
+        is_json=content_kind == CONTENT_JSON,
+        is_xml=content_kind == CONTENT_XML,
+        is_text=content_kind == CONTENT_TEXT,
+        is_csv=content_kind == CONTENT_CSV,
+        is_binary=content_kind == CONTENT_BINARY,
+    )
 
 
 class TestFileHandler(object):
@@ -49,8 +146,26 @@ class TestFileHandler(object):
         self.config = config
         self.django_settings = django_settings
 
+    def get_project_paths(self):
+        key = id(self.django_settings)
+        try:
+            return _project_paths[key]
+        except KeyError:
+            pass
+        root = self.guess_project_directory(default=gettempdir)
+        app_root = os.path.join(root, 'autoguessed')
+        permissions = getattr(self.django_settings,
+                              'FILE_UPLOAD_DIRECTORY_PERMISSIONS', None)
+        paths = ProjectPaths(root=root, app_root=app_root,
+                             test_root=os.path.join(app_root, 'tests'),
+                             permissions=permissions or 0o750)
+        with _project_paths_lock:
+            _project_paths[key] = paths
+        return paths
+
+    @metrics.timed('TestFileHandler.prepare')
     def prepare(self, view_name):
-        project_root = self.guess_project_directory(default=gettempdir)
+        project_root = self.get_project_paths().root
         filenames = tuple(self.get_filenames(root_directory=project_root,
                                              view_name=view_name))
         if filenames is None:
@@ -59,20 +174,27 @@ class TestFileHandler(object):
         return PrepareResult(project_root=project_root, tree=made_files)
 
     def make_files(self, filenames):
-        settings_obj = self.django_settings
+        leaf = filenames[-1].directory
+        # one stat for the deepest directory tells us whether the chain we
+        # made earlier is still there, or was deleted out from under us.
+        if leaf in _ensured_directories and os.path.isdir(leaf):
+            return filenames
+        perm = self.get_project_paths().permissions
+        init_files = tuple(path.file for path in filenames[0:-1])
+        with _ensured_lock:
+            _ensured_directories.difference_update(p.directory for p in filenames)
         for directory, filename in filenames:
-            if not os.path.exists(directory):
-                perm = settings_obj.FILE_UPLOAD_DIRECTORY_PERMISSIONS or 0o750
-                try:
-                    os.makedirs(directory, perm)
-                except os.error:
-                    logger.error("Unable to create the following "
-                                 "directory, halting preparation "
-                                 "at: %s".format(directory), exc_info=1)
-                    return None
-            if not os.path.exists(filename):
-                with open(filename, 'w') as f:
-                    f.write(EMPTY_INIT_TEMPLATE())
+            try:
+                ensure_directory(directory, perm)
+            except os.error:
+                logger.error("Unable to create the following "
+                             "directory, halting preparation "
+                             "at: %s", directory, exc_info=1)
+                return None
+            if filename in init_files:
+                ensure_file(filename, EMPTY_INIT_TEMPLATE)
+        with _ensured_lock:
+            _ensured_directories.update(p.directory for p in filenames)
         return filenames
 
     def guess_project_directory(self, default=None):
@@ -149,8 +271,11 @@ class TestFileHandler(object):
 #             for result in getallkeys(v, parent=[parent, k]):
 #                 yield result
 
-class GuessConfiguration(object):
-    __slots__ = (
+# Each version of the layout only ever appends flags. `magic_number` uses
+# the shortest layout which covers every set flag, so files generated
+# before a flag existed keep their name for as long as it stays unset.
+FLAG_LAYOUTS = (
+    (
         'is_html5',
         'is_ajax',
         'is_authenticated',
@@ -163,39 +288,112 @@ class GuessConfiguration(object):
         'is_get',
         'is_post',
         'is_json',
+    ),
+    (
+        'is_xml',
+        'is_text',
+        'is_csv',
+        'is_binary',
+        'is_streaming',
+    ),
+    (
+        'has_etag',
+        'has_last_modified',
+        'is_cacheable',
+    ),
+)
+FLAGS = tuple(name for layout in FLAG_LAYOUTS for name in layout)
+FLAG_BITS = OrderedDict((name, 1 << position)
+                        for position, name in enumerate(FLAGS))
+
+
+def make_layout_masks(layouts):
+    # a mask of every flag up to and including each version of the layout.
+    size = 0
+    for layout in layouts:
+        size += len(layout)
+        yield (1 << size) - 1
+
+
+LAYOUT_MASKS = tuple(make_layout_masks(FLAG_LAYOUTS))
+
+
+def make_flag_property(name):
+    bit = FLAG_BITS[name]
+
+    def getter(self):
+        return self.flags & bit != 0
+    getter.__name__ = name
+    return property(getter)
+
+
+class GuessConfiguration(object):
+    __slots__ = (
+        'flags',
+        '_magic_number',
     )
 
     def __init__(self, is_html5, is_ajax, is_authenticated, has_context_data,
-                 has_template_name, has_get_params, is_get, is_post, is_json):
+                 has_template_name, has_get_params, is_get, is_post, is_json,
+                 is_xml=False, is_text=False, is_csv=False, is_binary=False,
+                 is_streaming=False, has_etag=False, has_last_modified=False,
+                 is_cacheable=False):
         assert not all((is_get, is_post)), "Cannot be both GET and POST"
-        assert not all((is_html5, is_json)), "Cannot be both JSON and HTML"
-        self.is_html5 = is_html5
-        self.is_ajax = is_ajax
-        self.is_authenticated = is_authenticated
-        self.has_context_data = has_context_data
-        self.has_template_name = has_template_name
-        self.has_get_params = has_get_params
-        self.supports_model_mommy = CAN_USE_MOMMY
-        self.supports_custom_users = CAN_USE_CUSTOM_USERS
-        self.supports_html5lib = CAN_USE_HTML5LIB
-        self.is_get = is_get
-        self.is_post = is_post
-        self.is_json = is_json
+        content_kinds = (is_html5, is_json, is_xml, is_text, is_csv, is_binary)
+        assert sum(content_kinds) <= 1, "Cannot be more than one kind of content"
+        values = (
+            ('is_html5', is_html5),
+            ('is_ajax', is_ajax),
+            ('is_authenticated', is_authenticated),
+            ('has_context_data', has_context_data),
+            ('has_template_name', has_template_name),
+            ('has_get_params', has_get_params),
+            ('supports_model_mommy', CAN_USE_MOMMY),
+            ('supports_custom_users', CAN_USE_CUSTOM_USERS),
+            ('supports_html5lib', CAN_USE_HTML5LIB),
+            ('is_get', is_get),
+            ('is_post', is_post),
+            ('is_json', is_json),
+            ('is_xml', is_xml),
+            ('is_text', is_text),
+            ('is_csv', is_csv),
+            ('is_binary', is_binary),
+            ('is_streaming', is_streaming),
+            ('has_etag', has_etag),
+            ('has_last_modified', has_last_modified),
+            ('is_cacheable', is_cacheable),
+        )
+        flags = 0
+        for name, value in values:
+            if value:
+                flags |= FLAG_BITS[name]
+        self.flags = flags
+        self._magic_number = None
+
+    def layout_size(self):
+        for mask in LAYOUT_MASKS:
+            if self.flags & ~mask == 0:
+                return mask.bit_length()
+        return len(FLAGS)
 
     def magic_number(self):
-        values = (getattr(self, attr) for attr in self.__slots__)
-        ints = (int(value) for value in values
-                if value is True or value is False)
-        strs = (str(int_) for int_ in ints)
-        bin_ = ''.join(strs)
-        return bin_
+        if self._magic_number is None:
+            flags = self.flags
+            self._magic_number = ''.join(
+                '1' if flags & (1 << position) else '0'
+                for position in range(self.layout_size()))
+        return self._magic_number
 
     def items(self):
-        out = OrderedDict((attr, getattr(self, attr))
-                          for attr in self.__slots__)
+        out = OrderedDict((name, self.flags & bit != 0)
+                          for name, bit in FLAG_BITS.items())
         return out.items()
 
 
+for _flag in FLAGS:
+    setattr(GuessConfiguration, _flag, make_flag_property(_flag))
+
+
 class TestGuesser(object):
     __slots__ = (
         'config',
@@ -210,7 +408,10 @@ class TestGuesser(object):
         self.response = response
 
     def is_valid(self):
-        return self.config.magic_number() > 0
+        flags = getattr(self.config, 'flags', None)
+        if flags is None:
+            flags = int(self.config.magic_number() or '0', 2)
+        return flags > 0
 
     def get_best_viewname(self, obj, default=None):
         has_app_name = getattr(obj, 'app_name', None) is not None
@@ -245,21 +446,22 @@ class TestGuesser(object):
             return '%s.%s' % (module, name)
         return name
 
-    def make_test(self, files):
+    def get_context(self):
         context = {
             'config': self.config,
             'when': datetime.utcnow(),
             'request': {
                 'method': self.request.method,
                 'path': self.request.path,
-                'resolved': resolve(self.request.path),
+                'resolved': self.resolve(),
             },
             'response': {
                 'status_code': self.response.status_code,
-                'headers': [v for k, v in self.response._headers.items()
-                            if v[0] not in ('Last-Modified', 'Expires', 'Location')]
+                'headers': self.get_rendered_headers(),
             },
             'setup': [],
+            'budget': self.get_budget(),
+            'memory': self.get_memory_budget(),
         }
 
         if self.config.is_post and self.config.has_get_params:
@@ -278,13 +480,20 @@ class TestGuesser(object):
         user_for_test = generate_user_for_setup(config=self.config,
                                                 context=context)
         context['setup'].append(user_for_test)
+        return context
 
+    def render_test(self, context):
         tests_to_run = {
             'status_code': generate_status_code_test,
             'reverse': generate_url_reverse_test,
             'headers': generate_response_headers_test,
             'content_parsed': generate_content_parsing_test,
             'context_data': generate_context_data_test,
+            'streaming': generate_streaming_test,
+            'queries': generate_query_count_test,
+            'budget': generate_budget_test,
+            'memory': generate_memory_test,
+            'cache': generate_cache_test,
         }
         tests_context = {}
         for k, v in tests_to_run.items():
@@ -293,20 +502,230 @@ class TestGuesser(object):
             if generated_test is not None:
                 tests_context[k] = generated_test
         context['tests'] = tests_context
-        finalised = TEST_TEMPLATE(context=context)
+        return TEST_TEMPLATE(context=context)
+
+    def get_rendered_headers(self):
+        # caching headers are checked directive by directive, and validators
+        # for their presence, in `generate_cache_test` instead.
+        return [v for v in self.response.headers
+                if v[0] not in ('Last-Modified', 'Expires', 'Location',
+                                'Cache-Control', 'Vary', 'ETag')]
+
+    def get_observation_hash(self):
+        # only what the fragments actually render, so that values which
+        # differ on every request (dates, body lengths, raw timings) don't
+        # make an otherwise identical module look changed; the body itself
+        # is only ever used via the content flags in the magic number, and
+        # the fingerprint.
+        response = self.response
+        headers = dict((k.lower(), v) for k, v in response.headers)
+        parts = (
+            renderer.signature(),
+            self.config.magic_number(),
+            self.request,
+            response.status_code,
+            self.get_rendered_headers(),
+            headers.get('cache-control'),
+            headers.get('vary'),
+            response.context_keys,
+            response.context_types,
+            response.context_structure,
+            response.content_length if self.config.is_streaming else None,
+            response.fingerprint,
+            response.queries,
+            # the budgets only change when a distribution moves a bucket.
+            self.get_budget(),
+            self.get_memory_budget(),
+        )
+        return sha1(repr(parts).encode('utf-8')).hexdigest()
+
+    def get_manifest(self, files):
+        if not getattr(settings, 'TESTGUESS_MANIFEST', True):
+            return None
+        path = os.path.join(files.project_root, 'autoguessed', MANIFEST_FILENAME)
+        return get_manifest(path=path, flush_interval=getattr(
+            settings, 'TESTGUESS_MANIFEST_FLUSH_INTERVAL', 60))
+
+    def make_test(self, files):
         last = files.tree[-1]
         assert last.file.endswith('test_{}.py'.format(self.config.magic_number()))
-        with open(last.file, 'w+') as f:
-            f.write(finalised)
+        manifest = self.get_manifest(files)
+        if manifest is not None:
+            manifest_name = os.path.relpath(last.file, files.project_root)
+            digest = self.get_observation_hash()
+            if manifest.is_current(manifest_name, digest) and os.path.exists(last.file):
+                manifest.seen(manifest_name)
+                metrics.increment('skipped.unchanged')
+                return last, None
+        # if another thread or process is already writing this file, it will
+        # produce the same thing, so don't bother rendering it at all.
+        claim = claim_path(last.file)
+        if claim is None:
+            metrics.increment('skipped.claimed')
+            return last, None
+        try:
+            fingerprint = getattr(self.response, 'fingerprint', None)
+            if fingerprint is not None:
+                written = write_fingerprint(last.file, fingerprint)
+                if written is None:
+                    # without the sidecar entry the test could only error.
+                    logger.warning("Unable to claim the fingerprints for %s",
+                                   last.file)
+                    self.response = self.response._replace(fingerprint=None)
+                else:
+                    metrics.increment('bytes_written', written)
+            finalised = self.render_test(context=self.get_context())
+            metrics.increment('bytes_written', atomic_write(last.file, finalised))
+        finally:
+            release_path(claim)
+        if manifest is not None:
+            manifest.update(manifest_name, digest=digest,
+                            view_name=self.resolve().best_name)
         return last, finalised
 
-    def generate(self):
-        match = resolve(self.request.path)
-        view_name = self.get_best_viewname(match, default=match.url_name)
+    def get_seen_set(self, test_filer):
+        if not getattr(settings, 'TESTGUESS_DEDUP', False):
+            return None
+        path = getattr(settings, 'TESTGUESS_DEDUP_FILE', None)
+        if path is None:
+            path = os.path.join(test_filer.get_project_paths().app_root,
+                                SEEN_FILENAME)
+        return get_seen_set(path=path,
+                            maxsize=getattr(settings, 'TESTGUESS_DEDUP_SIZE', 1024))
+
+    def get_seen_key(self, view_name):
+        signature = None
+        if getattr(settings, 'TESTGUESS_DEDUP_SIGNATURE', False):
+            signature = response_signature(self.response)
+        return make_key(view_name=view_name,
+                        magic_number=self.config.magic_number(),
+                        status_code=self.response.status_code,
+                        signature=signature)
+
+    def get_ledger(self, test_filer, timeout=None):
+        if not getattr(settings, 'TESTGUESS_LEDGER', False):
+            return None
+        if timeout is None:
+            # how long a request may wait on another process's write.
+            timeout = getattr(settings, 'TESTGUESS_LEDGER_TIMEOUT', 0.1)
+        return get_ledger(
+            path=os.path.join(test_filer.get_project_paths().app_root,
+                              LEDGER_FILENAME),
+            stale_after=getattr(settings, 'TESTGUESS_LEDGER_STALE_AFTER', 60),
+            done_ttl=getattr(settings, 'TESTGUESS_LEDGER_DONE_TTL', 3600),
+            timeout=timeout)
+
+    def get_ledger_key(self):
+        return make_ledger_key(self.resolve().best_name,
+                               self.config.magic_number())
+
+    def get_budget_key(self):
+        return self.get_ledger_key()
+
+    def record_samples(self, test_filer, timings=None):
+        """
+        Adds this response's timing and memory peak (or `timings`, for a
+        replay which has gathered several) to the sketches, and now and then
+        merges them with those saved by other processes. Returns True while
+        there are too few timings for a budget.
+        """
+        if timings is None:
+            timing = getattr(self.response, 'timing', None)
+            timings = () if timing is None else (timing,)
+        memory = getattr(self.response, 'memory', None)
+        if not timings and memory is None:
+            return False
+        key = self.get_budget_key()
+        for timing in timings:
+            latency_sketches.add(key, timing)
+        if memory is not None:
+            memory_peaks.add(key, memory)
+        gathering = bool(timings) and self.get_budget() is None
+        interval = getattr(settings, 'TESTGUESS_SKETCH_FLUSH_INTERVAL', 60)
+        sync_timings = gathering or time.time() - latency_sketches.synced_at >= interval
+        sync_memory = (memory is not None and
+                       time.time() - memory_peaks.synced_at >= interval)
+        if sync_timings or sync_memory:
+            paths = test_filer.get_project_paths()
+            # this runs before `prepare`, so on a fresh project nothing has
+            # made the directory the files live in yet.
+            ensure_directory(paths.app_root, paths.permissions)
+            # while gathering, look at once for samples other processes saw.
+            if sync_timings:
+                latency_sketches.sync(os.path.join(paths.app_root,
+                                                   TIMINGS_FILENAME))
+            if sync_memory:
+                memory_peaks.sync(os.path.join(paths.app_root, MEMORY_FILENAME))
+        return bool(timings) and self.get_budget() is None
+
+    def get_budget(self):
+        return latency_sketches.budget(
+            key=self.get_budget_key(),
+            factor=getattr(settings, 'TESTGUESS_TIMING_BUDGET_FACTOR', 3),
+            runs=getattr(settings, 'TESTGUESS_TIMING_RUNS', 5),
+            min_samples=getattr(settings, 'TESTGUESS_TIMING_MIN_SAMPLES', 5))
+
+    def get_memory_budget(self):
+        return memory_peaks.budget(
+            key=self.get_budget_key(),
+            factor=getattr(settings, 'TESTGUESS_MEMORY_BUDGET_FACTOR', 2))
+
+    def resolve(self):
+        return resolve_cache.get(self.request.path, namer=self.get_best_viewname)
+
+    def settle_ledger(self, method, ledger_key):
+        try:
+            return method(ledger_key)
+        except sqlite3.OperationalError:
+            # the claim goes stale and is taken over in time.
+            logger.warning("Unable to update the ledger for %s", ledger_key,
+                           exc_info=1)
+            return None
+
+    @metrics.timed('TestGuesser.generate')
+    def generate(self, timings=None, use_ledger=True):
+        view_name = self.resolve().best_name
         test_filer = TestFileHandler(config=self.config,
                                      django_settings=settings)
-        files = test_filer.prepare(view_name=view_name)
-        test_itself = self.make_test(files)
+        # a module written before its budget exists must be revisited once
+        # it does, so it is neither remembered as seen nor marked done.
+        gathering = self.record_samples(test_filer, timings=timings)
+        seen = self.get_seen_set(test_filer)
+        if seen is not None:
+            seen_key = self.get_seen_key(view_name)
+            if seen_key in seen:
+                metrics.increment('deduped')
+                return 0
+        # only one process across the whole deployment does the work;
+        # `use_ledger` is False when the caller has claimed it already.
+        ledger = self.get_ledger(test_filer) if use_ledger else None
+        if ledger is not None:
+            ledger_key = self.get_ledger_key()
+            try:
+                claimed = ledger.claim(ledger_key)
+            except sqlite3.OperationalError:
+                # another process is holding the write lock; rather than
+                # keep a request waiting, let someone else do it.
+                metrics.increment('skipped.ledger_busy')
+                return 0
+            if not claimed:
+                metrics.increment('skipped.ledger')
+                return 0
+        try:
+            files = test_filer.prepare(view_name=view_name)
+            test_file, test_itself = self.make_test(files)
+        except Exception:
+            if ledger is not None:
+                self.settle_ledger(ledger.release, ledger_key)
+            raise
+        if ledger is not None:
+            self.settle_ledger(ledger.release if gathering else ledger.complete,
+                               ledger_key)
+        if test_itself is None:
+            return 0
+        if seen is not None and not gathering:
+            seen.add(seen_key)
+        metrics.increment('generated')
         return 1
 
 
@@ -314,40 +733,308 @@ class GuessResponse(object):
     __slots__ = (
         'config_class',
         'guesser_class',
+        'queue',
+        'sampler',
+        'observations',
+        'observe_streams',
+        'introspector',
+        'fingerprint_max_bytes',
+        'record_queries',
+        'query_repeat_threshold',
+        'measure_timing',
+        'measure_cpu',
+        'memory_sample_rate',
     )
 
-    def __init__(self, config_class=None, guesser_class=None):
+    def __init__(self, config_class=None, guesser_class=None, queue=None,
+                 sampler=None):
         # a config handler must accept the keyword arguments used in
         # `process_response` and a `magic_number` method
         self.config_class = config_class or GuessConfiguration
         # a test guesser must accept a config instance, request, response
         # and implement `is_valid` and `generate` methods.
         self.guesser_class = guesser_class or TestGuesser
+        # anything with a `submit(callable)` method; when set, generation
+        # happens away from the request/response cycle.
+        mode = getattr(settings, 'TESTGUESS_MODE', GUESS_INLINE)
+        if queue is None and mode == GUESS_BACKGROUND:
+            queue = get_generation_queue()
+        self.queue = queue
+        # when recording, nothing is generated; observations are appended
+        # to a log for the `testguess_replay` command to work through.
+        self.observations = None
+        if mode == GUESS_RECORD:
+            self.observations = get_observation_log(path=getattr(
+                settings, 'TESTGUESS_OBSERVATION_LOG',
+                os.path.join(gettempdir(), 'testguess-observations.jsonl')))
+        # a sampler must implement `allow(key)` and `record(key, generated)`
+        # where key is a `SampleKey`; None means every response is used.
+        self.sampler = sampler or get_sampler()
+        # streamed bodies are only ever peeked at, never buffered.
+        self.observe_streams = getattr(settings, 'TESTGUESS_STREAMING', False)
+        # how far into nested dictionaries in `context_data` to look.
+        self.introspector = ContextIntrospector(
+            max_depth=getattr(settings, 'TESTGUESS_CONTEXT_DEPTH', 3),
+            max_width=getattr(settings, 'TESTGUESS_CONTEXT_WIDTH', 50))
+        # 0 turns body fingerprints off.
+        self.fingerprint_max_bytes = getattr(
+            settings, 'TESTGUESS_FINGERPRINT_MAX_BYTES', FINGERPRINT_MAX_BYTES)
+        # count the queries each sampled request runs, between
+        # `process_view` and `process_response`. Off by default: before
+        # Django 2.0 it means turning the debug cursor on for the request.
+        self.record_queries = getattr(settings, 'TESTGUESS_QUERIES', False)
+        self.query_repeat_threshold = getattr(
+            settings, 'TESTGUESS_QUERIES_REPEAT_THRESHOLD', REPEAT_THRESHOLD)
+        # how long the view took, from `process_view` to `process_response`, and optionally how much CPU it used.
+        self.measure_timing = getattr(settings, 'TESTGUESS_TIMING', True)
+        self.measure_cpu = (getattr(settings, 'TESTGUESS_TIMING_CPU', False) and
+                            cpu_now is not None)
+        # the fraction of requests whose peak allocation is traced; off
+        # by default, as tracing slows everything in the process down.
+        self.memory_sample_rate = getattr(settings, 'TESTGUESS_MEMORY_SAMPLE_RATE', 0)
+        # compile every fragment up front rather than on the first request.
+        renderer.load()
+        metrics.configure_from_settings()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # the sampling decision is made here rather than in `process_request`
+        # because `resolver_match`, which the sample key is built from, has
+        # only just been set. Declined requests get nothing else started.
+        not_in_testsuite = getattr(request, '_dont_enforce_csrf_checks', None) is None
+        if not not_in_testsuite:
+            return None
+        sample_key = None
+        if self.sampler is not None:
+            sample_key = make_sample_key(request)
+            if not self.sampler.allow(sample_key):
+                metrics.increment('skipped.sampled')
+                request._testguess_sample = False
+                return None
+        request._testguess_sample = sample_key
+        if self.record_queries:
+            request._testguess_queries = QueryRecorder().start()
+        if self.memory_sample_rate:
+            measurement = start_sample(self.memory_sample_rate)
+            if measurement is not None:
+                request._testguess_memory = measurement
+        if self.measure_timing:
+            request._testguess_started = self.started()
+        return None
+
+    def started(self):
+        return metrics.now(), cpu_now() if self.measure_cpu else None
 
+    def finished(self, started):
+        wall, cpu = started
+        if cpu is not None:
+            cpu = cpu_now() - cpu
+        return Timing(wall=metrics.now() - wall, cpu=cpu)
+
+    @metrics.timed('GuessResponse.process_response')
     def process_response(self, request, response):
+        # always stop counting, whether or not this response is used.
+        recorder = getattr(request, '_testguess_queries', None)
+        queries = None
+        if recorder is not None:
+            del request._testguess_queries
+            queries = recorder.finish(repeat_threshold=self.query_repeat_threshold)
+        started = getattr(request, '_testguess_started', None)
+        timing = None
+        if started is not None:
+            del request._testguess_started
+            timing = self.finished(started)
+        measurement = getattr(request, '_testguess_memory', None)
+        memory = None
+        if measurement is not None:
+            del request._testguess_memory
+            memory = finish_sample(measurement)
+            # tracing slows the view down, so its timing isn't representative.
+            timing = None
         not_in_testsuite = getattr(request, '_dont_enforce_csrf_checks', None) is None
+        # False when `process_view` has already declined the request; missing
+        # when it never got that far, e.g. a path which doesn't resolve.
+        sample_key = getattr(request, '_testguess_sample', None)
+        if sample_key is False:
+            return response
+        if not_in_testsuite:
+            return self.observe(request, response, queries=queries,
+                                timing=timing, memory=memory,
+                                sample_key=sample_key)
+        return response
+
+    def observe(self, request, response, queries=None, timing=None,
+                memory=None, sample_key=None, use_sampler=True):
+        """
+        Everything `process_response` does once it has decided the request
+        is worth looking at; also used by `testguess_crawl`, whose test
+        client requests the middleware itself would skip. A `sample_key`
+        means the sampler has already allowed the request, and
+        `use_sampler=False` skips it altogether.
+        """
         is_not_streaming = response.streaming is False
+        # async iterators (Django >= 4.2 under ASGI) are left alone.
+        can_observe_stream = (response.streaming and self.observe_streams and
+                              not getattr(response, 'is_async', False))
         is_not_servererror = response.status_code < 500
-        if not_in_testsuite and is_not_streaming and is_not_servererror:
-            config_handler = self.config_class
-            test_guesser = self.guesser_class
-            content = response.content.strip()
-            html = content[0:15].lower() == '<!doctype html>'
-            json_object = content.startswith('{') and content.endswith('}')
-            json_array = content.startswith('[') and content.endswith(']')
-            config = config_handler(
-                is_html5=html,
-                is_json=json_object or json_array,
-                is_ajax=request.is_ajax(),
-                is_authenticated=(hasattr(request, 'user') and
-                                  request.user.is_authenticated()),
-                has_context_data=hasattr(response, 'context_data'),
-                has_template_name=hasattr(response, 'template_name'),
-                has_get_params=len(request.GET) > 0,
-                is_get=request.method == 'GET',
-                is_post=request.method == 'POST',
-            )
-            guesser = test_guesser(config=config, request=request, response=response)
-            if guesser.is_valid():
-                guesser.generate()
+        if (is_not_streaming or can_observe_stream) and is_not_servererror:
+            if sample_key is None and self.sampler is not None and use_sampler:
+                sample_key = make_sample_key(request)
+                if not self.sampler.allow(sample_key):
+                    metrics.increment('skipped.sampled')
+                    return response
+            config_kwargs = self.get_config_kwargs(request, response)
+            request_snapshot = snapshot_request(request)
+            response_snapshot = snapshot_response(
+                response, introspector=self.introspector,
+                # anything run while the body streams out isn't counted.
+                queries=None if response.streaming else queries,
+                timing=None if response.streaming else timing,
+                memory=None if response.streaming else memory)
+            if not response.streaming:
+                content_kind = classify_response(response)
+                config_kwargs.update(content_config_kwargs(content_kind))
+                if self.fingerprint_max_bytes:
+                    # one byte more than is fingerprinted, so that a body
+                    # which is too big can still be told apart.
+                    head = chunks_head(response_chunks(response),
+                                       self.fingerprint_max_bytes + 1)
+                    response_snapshot = response_snapshot._replace(
+                        fingerprint=fingerprint_content(
+                            content_kind, head.tobytes(),
+                            max_bytes=self.fingerprint_max_bytes))
+            elif getattr(response, 'file_to_stream', None) is not None:
+                # replacing `streaming_content` would stop the server using
+                # `wsgi.file_wrapper`/sendfile, so a file is only known by
+                # its headers.
+                length = response.get('Content-Length')
+                self.stream_complete(
+                    config_kwargs=config_kwargs, request=request_snapshot,
+                    response=response_snapshot,
+                    content_type=response.get('Content-Type', ''),
+                    disposition=response.get('Content-Disposition', ''),
+                    sample_key=sample_key, prefix=b'', suffix=b'',
+                    length=int(length) if length and length.isdigit() else None)
+                return response
+            else:
+                # nothing can be known about the body until it has been sent,
+                # so finish off once the server has consumed the stream.
+                on_complete = partial(
+                    self.queue_stream_complete, config_kwargs=config_kwargs,
+                    request=request_snapshot, response=response_snapshot,
+                    content_type=response.get('Content-Type', ''),
+                    disposition=response.get('Content-Disposition', ''),
+                    sample_key=sample_key)
+                response.streaming_content = observe_stream(
+                    response.streaming_content, on_complete=on_complete)
+                return response
+            self.dispatch(config_kwargs=config_kwargs, request=request_snapshot,
+                          response=response_snapshot, sample_key=sample_key)
         return response
+
+    def get_config_kwargs(self, request, response):
+        return dict(
+            is_ajax=request.META.get('HTTP_X_REQUESTED_WITH') == 'XMLHttpRequest',
+            is_authenticated=(hasattr(request, 'user') and
+                              user_is_authenticated(request.user)),
+            has_context_data=hasattr(response, 'context_data'),
+            has_template_name=hasattr(response, 'template_name'),
+            has_get_params=len(request.GET) > 0,
+            is_get=request.method == 'GET',
+            is_post=request.method == 'POST',
+            is_streaming=response.streaming,
+            has_etag=response.has_header('ETag'),
+            has_last_modified=response.has_header('Last-Modified'),
+            is_cacheable=is_cacheable(response.get('Cache-Control', '')),
+        )
+
+    def queue_stream_complete(self, **kwargs):
+        # this runs inside the body iterator, before the server has seen the
+        # end of it; anything done here holds the connection open, so even
+        # inline mode hands the work to a queue.
+        queue = self.queue or get_generation_queue()
+        submitted = queue.submit(partial(self.stream_complete, inline=True,
+                                         **kwargs))
+        if not submitted:
+            metrics.increment('skipped.dropped')
+        return submitted
+
+    def stream_complete(self, config_kwargs, request, response, content_type,
+                        disposition, sample_key, prefix, suffix, length,
+                        inline=False):
+        content_kind = classify(prefix=prefix, suffix=suffix,
+                                content_type=content_type,
+                                disposition=disposition)
+        config_kwargs.update(content_config_kwargs(content_kind))
+        response = response._replace(content_prefix=prefix,
+                                     content_length=length)
+        try:
+            return self.dispatch(config_kwargs=config_kwargs, request=request,
+                                 response=response, sample_key=sample_key,
+                                 inline=inline)
+        except Exception:
+            # the body has already gone out; failing now would only
+            # truncate it as far as the server is concerned.
+            logger.exception("Unable to guess a test for a streamed response")
+            return None
+
+    def dispatch(self, config_kwargs, request, response, sample_key=None,
+                 inline=False):
+        if self.observations is not None:
+            self.observations.append(observation_to_dict(
+                config_kwargs=config_kwargs, request=request,
+                response=response))
+            return None
+        config = self.config_class(**config_kwargs)
+        task = partial(self.guess, config=config, sample_key=sample_key,
+                       request=request, response=response)
+        # `inline` when already running on a queue worker.
+        if self.queue is None or inline:
+            return task()
+        submitted = self.queue.submit(task)
+        if not submitted:
+            metrics.increment('skipped.dropped')
+        return submitted
+
+    def guess(self, config, request, response, sample_key=None, **kwargs):
+        guesser = self.guesser_class(config=config, request=request,
+                                     response=response)
+        generated = None
+        if guesser.is_valid():
+            try:
+                generated = guesser.generate(**kwargs)
+            except Exception:
+                metrics.increment('failed')
+                raise
+        else:
+            metrics.increment('skipped.invalid')
+        if sample_key is not None:
+            self.sampler.record(sample_key, generated=bool(generated))
+        return generated
+
+    def replay(self, observation, use_ledger=True):
+        config_kwargs, request, response = observation_from_dict(observation)
+        config = self.config_class(**config_kwargs)
+        return self.guess(config=config, request=request, response=response,
+                          timings=observation_timings(observation),
+                          use_ledger=use_ledger)
+
+    def get_replay_ledger(self, observations, timeout=10):
+        """
+        The ledger, if there is one, and the ledger key of each of
+        `observations`, so that a replay can claim them all at once.
+        """
+        keys = []
+        ledger = None
+        for observation in observations:
+            config_kwargs, request, response = observation_from_dict(observation)
+            guesser = self.guesser_class(config=self.config_class(**config_kwargs),
+                                         request=request, response=response)
+            if ledger is None:
+                ledger = guesser.get_ledger(
+                    TestFileHandler(config=guesser.config,
+                                    django_settings=settings),
+                    timeout=timeout)
+                if ledger is None:
+                    return None, ()
+            keys.append(guesser.get_ledger_key())
+        return ledger, tuple(keys)
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from base64 import b64decode, b64encode
+from threading import Lock
+import io
+import json
+import logging
+from .introspection import NestedKeys
+from .queries import QueryStats
+from .timing import Timing
+from .snapshots import RequestSnapshot, ResponseSnapshot, UserSnapshot
+
+logger = logging.getLogger(__name__)
+
+OBSERVATION_VERSION = 1
+
+
+def observation_to_dict(config_kwargs, request, response):
+    user = request.user
+    return {
+        'v': OBSERVATION_VERSION,
+        'config': config_kwargs,
+        'request': {
+            'method': request.method,
+            'path': request.path,
+            'full_path': request.full_path,
+            'GET': request.GET,
+            'POST': request.POST,
+            'user': None if user is None else list(user),
+        },
+        'response': {
+            'status_code': response.status_code,
+            'headers': [list(header) for header in response.headers],
+            'content_prefix': b64encode(response.content_prefix).decode('ascii'),
+            'context_keys': (None if response.context_keys is None
+                             else list(response.context_keys)),
+            'context_types': [list(part) for part in response.context_types],
+            'context_structure': [[list(n.path), list(n.keys), n.complete]
+                                  for n in response.context_structure],
+            'streaming': response.streaming,
+            'content_length': response.content_length,
+            'fingerprint': response.fingerprint,
+            'queries': (None if response.queries is None
+                        else list(response.queries)),
+            'timing': (None if response.timing is None
+                       else list(response.timing)),
+            'memory': response.memory,
+        },
+    }
+
+
+def observation_from_dict(data):
+    request = data['request']
+    response = data['response']
+    user = request['user']
+    context_keys = response['context_keys']
+    queries = response.get('queries')
+    timing = response.get('timing')
+    request_snapshot = RequestSnapshot(
+        method=request['method'],
+        path=request['path'],
+        full_path=request['full_path'],
+        GET=request['GET'],
+        POST=request['POST'],
+        user=None if user is None else UserSnapshot(*user),
+    )
+    response_snapshot = ResponseSnapshot(
+        status_code=response['status_code'],
+        headers=tuple(tuple(header) for header in response['headers']),
+        content_prefix=b64decode(response['content_prefix']),
+        context_keys=None if context_keys is None else tuple(context_keys),
+        context_types=tuple(tuple(part) for part in response['context_types']),
+        context_structure=tuple(
+            NestedKeys(path=tuple(path), keys=tuple(keys), complete=complete)
+            for path, keys, complete in response.get('context_structure', ())),
+        streaming=response['streaming'],
+        content_length=response.get('content_length'),
+        fingerprint=response.get('fingerprint'),
+        queries=None if queries is None else QueryStats(*queries),
+        timing=None if timing is None else Timing(*timing),
+        memory=response.get('memory'),
+    )
+    return data['config'], request_snapshot, response_snapshot
+
+
+def observation_key(data):
+    # later observations of the same request shape replace earlier ones,
+    # just as they would overwrite the generated file when done live.
+    return (data['request']['method'], data['request']['path'],
+            data['response']['status_code'],
+            tuple(sorted(data['config'].items())))
+
+
+class ObservationLog(object):
+    __slots__ = (
+        'path',
+        '_lock',
+    )
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = Lock()
+
+    def append(self, data):
+        line = json.dumps(data, separators=(',', ':'), sort_keys=True)
+        # one write per record, in append mode, so that several processes
+        # can share a log without interleaving lines.
+        with self._lock:
+            with io.open(self.path, 'a', encoding='utf-8') as f:
+                f.write(u'%s\n' % line)
+        return len(line)
+
+    def __iter__(self):
+        with io.open(self.path, 'r', encoding='utf-8') as f:
+            for number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    logger.warning("Skipping unreadable observation at "
+                                   "%s:%d", self.path, number)
+
+
+def observation_timings(data):
+    """
+    Every timing gathered for an observation by `unique_observations`, or
+    just its own.
+    """
+    response = data['response']
+    timings = response.get('timings')
+    if timings is None:
+        timing = response.get('timing')
+        timings = () if timing is None else (timing,)
+    return tuple(Timing(*timing) for timing in timings)
+
+
+def unique_observations(logs):
+    seen = {}
+    timings = {}
+    peaks = {}
+    for log in logs:
+        for data in log:
+            key = observation_key(data)
+            seen[key] = data
+            # the latency and memory budgets need every sample, not only
+            # those of the observation which is kept.
+            timing = data['response'].get('timing')
+            if timing is not None:
+                timings.setdefault(key, []).append(timing)
+            memory = data['response'].get('memory')
+            if memory is not None:
+                peaks[key] = max(memory, peaks.get(key, 0))
+    for key, data in seen.items():
+        data['response']['timings'] = timings.get(key, [])
+        data['response']['memory'] = peaks.get(key)
+    return tuple(seen.values())
+
+
+_observation_logs = {}
+_observation_logs_lock = Lock()
+
+
+def get_observation_log(path):
+    with _observation_logs_lock:
+        if path not in _observation_logs:
+            _observation_logs[path] = ObservationLog(path=path)
+        return _observation_logs[path]
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Splits the generated tests between several pytest processes, so that
+the `autoguessed` tree can be run as, e.g.::
+
+    py.test --testguess-shard=0/4 & py.test --testguess-shard=1/4 & ...
+
+Every module for a view lives in the same directory, and all of them go
+to the same shard, keyed on a stable hash of that directory.
+"""
+from __future__ import absolute_import
+import os
+import zlib
+
+
+def parse_shard(value):
+    try:
+        index, total = (int(x) for x in value.split('/', 1))
+    except ValueError:
+        raise ValueError("Expected INDEX/TOTAL, got %r" % value)
+    if total < 1 or not 0 <= index < total:
+        raise ValueError("Shard %r is out of range" % value)
+    return index, total
+
+
+def shard_for(view_directory, total):
+    key = view_directory.replace(os.sep, '/').encode('utf-8')
+    return (zlib.crc32(key) & 0xffffffff) % total
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('testguess')
+    group.addoption('--testguess-shard', action='store', default=None,
+                    metavar='INDEX/TOTAL',
+                    help="Only run generated tests for views in this shard")
+
+
+def pytest_collection_modifyitems(session, config, items):
+    value = config.getoption('testguess_shard')
+    if value is None:
+        return None
+    index, total = parse_shard(value)
+    root = str(config.rootdir)
+    keep = []
+    deselected = []
+    for item in items:
+        path = str(item.fspath)
+        # only the generated modules are sharded; anything else runs
+        # in the first shard.
+        if 'autoguessed' in path.split(os.sep):
+            directory = os.path.relpath(os.path.dirname(path), root)
+            shard = shard_for(directory, total)
+        else:
+            shard = 0
+        if shard == index:
+            keep.append(item)
+        else:
+            deselected.append(item)
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = keep
+    return None
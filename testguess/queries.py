@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from collections import Counter, namedtuple
+import re
+from django.db import connections
+
+QueryStats = namedtuple('QueryStats', 'count duplicates repeated repeated_sql')
+
+# a query running this many times in one request is probably being done
+# per-object in a loop.
+REPEAT_THRESHOLD = 5
+# longest SQL template kept for the N+1 warning comment.
+MAX_SQL_LENGTH = 200
+
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+PLACEHOLDER_LIST_RE = re.compile(r"\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)")
+
+
+def sql_template(sql):
+    """
+    Reduces a statement to its shape, so that `... WHERE id = 1` and
+    `... WHERE id = 2`, or IN clauses of different lengths, look the same.
+    """
+    sql = LITERAL_RE.sub('?', sql)
+    sql = PLACEHOLDER_LIST_RE.sub('(...)', sql)
+    return ' '.join(sql.split())
+
+
+class QueryRecorder(object):
+    """
+    Counts the queries run on this thread's connections between `start`
+    and `finish`. Uses `execute_wrappers` (Django >= 2.0) where available,
+    and otherwise forces the debug cursor on and reads `queries_log`.
+    """
+    __slots__ = (
+        'templates',
+        'log_marks',
+    )
+
+    def __init__(self):
+        self.templates = Counter()
+        self.log_marks = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        self.templates[sql_template(sql)] += 1
+        return execute(sql, params, many, context)
+
+    def start(self):
+        for connection in connections.all():
+            wrappers = getattr(connection, 'execute_wrappers', None)
+            if wrappers is not None:
+                # anything left behind by a request which never finished.
+                wrappers[:] = [w for w in wrappers
+                               if not isinstance(w, QueryRecorder)]
+                wrappers.append(self)
+            else:
+                self.log_marks[connection.alias] = (
+                    len(connection.queries_log), connection.force_debug_cursor)
+                connection.force_debug_cursor = True
+        return self
+
+    def finish(self, repeat_threshold=REPEAT_THRESHOLD):
+        for connection in connections.all():
+            wrappers = getattr(connection, 'execute_wrappers', None)
+            if wrappers is not None:
+                if self in wrappers:
+                    wrappers.remove(self)
+                continue
+            mark = self.log_marks.pop(connection.alias, None)
+            if mark is None:
+                continue
+            position, force_debug_cursor = mark
+            connection.force_debug_cursor = force_debug_cursor
+            for query in list(connection.queries_log)[position:]:
+                self.templates[sql_template(query['sql'])] += 1
+        return self.stats(repeat_threshold=repeat_threshold)
+
+    def stats(self, repeat_threshold=REPEAT_THRESHOLD):
+        count = sum(self.templates.values())
+        repeated = 0
+        repeated_sql = None
+        if self.templates:
+            sql, repeated = self.templates.most_common(1)[0]
+            if repeated >= repeat_threshold:
+                repeated_sql = sql[0:MAX_SQL_LENGTH]
+        return QueryStats(count=count, duplicates=count - len(self.templates),
+                          repeated=repeated, repeated_sql=repeated_sql)
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from hashlib import sha1
+from threading import Lock
+import logging
+import os
+import re
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+try:
+    from django.utils.encoding import force_text
+except ImportError:  # Django >= 4.0
+    from django.utils.encoding import force_str as force_text
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_ROOT = os.path.join(os.path.dirname(__file__), 'templates')
+TEMPLATE_NAMES = (
+    'testguess/anonymous_user.py',
+    'testguess/budget.py',
+    'testguess/cache.py',
+    'testguess/context_data.py',
+    'testguess/custom_user.py',
+    'testguess/empty_init.py',
+    'testguess/generated_class.py',
+    'testguess/headers.py',
+    'testguess/html5.py',
+    'testguess/json.py',
+    'testguess/memory.py',
+    'testguess/queries.py',
+    'testguess/reverse_url.py',
+    'testguess/status_code.py',
+    'testguess/streaming.py',
+    'testguess/user.py',
+)
+# fragments which are nothing but variables, and so can skip the template
+# engine entirely.
+FAST_TEMPLATE_NAMES = (
+    'testguess/empty_init.py',
+    'testguess/reverse_url.py',
+    'testguess/status_code.py',
+)
+RESETTING_SETTINGS = frozenset(('TEMPLATES', 'TEMPLATE_DIRS', 'TEMPLATE_LOADERS',
+                                'INSTALLED_APPS'))
+VARIABLE_RE = re.compile(r'\{\{\s*(.+?)\s*\}\}')
+FAST_FILTERS = frozenset(('lower', 'safe'))
+
+
+class FastPathMiss(Exception):
+    pass
+
+
+def lookup(context, bits):
+    value = context
+    for bit in bits:
+        try:
+            value = value[bit]
+        except (TypeError, AttributeError, KeyError):
+            try:
+                value = getattr(value, bit)
+            except AttributeError:
+                raise FastPathMiss(bit)
+        if callable(value):
+            # the template engine would call it; don't try and copy that.
+            raise FastPathMiss(bit)
+    return value
+
+
+def output(value, filters):
+    if not isinstance(value, (tuple, list, dict) + (type(u''), int, bool)):
+        raise FastPathMiss(value)
+    text = force_text(value)
+    if 'lower' in filters:
+        text = text.lower()
+    if 'safe' in filters:
+        return text
+    return conditional_escape(text)
+
+
+def compile_fast_path(source, name):
+    if '{%' in source or '{#' in source:
+        return None
+    parts = []
+    position = 0
+    for match in VARIABLE_RE.finditer(source):
+        parts.append(repr(source[position:match.start()]))
+        expression = match.group(1).split('|')
+        variable, filters = expression[0].strip(), tuple(f.strip() for f in expression[1:])
+        if not FAST_FILTERS.issuperset(filters):
+            return None
+        parts.append('output(lookup(context, %r), %r)' % (
+            tuple(variable.split('.')), filters))
+        position = match.end()
+    parts.append(repr(source[position:]))
+    # safe, like what `Template.render` returns, so that inserting it into
+    # another template doesn't escape it all over again.
+    code = compile('def render(context):\n'
+                   '    return mark_safe(u"".join((%s,)))\n' % ', '.join(parts),
+                   '<testguess fast path: %s>' % name, 'exec')
+    namespace = {'lookup': lookup, 'output': output, 'mark_safe': mark_safe}
+    exec(code, namespace)
+    return namespace['render']
+
+
+def template_source(template):
+    """
+    The source of a loaded template, which may be a project's override of a
+    bundled one, or None if the template doesn't say.
+    """
+    # backend templates (Django 1.8+) wrap the engine's own.
+    inner = getattr(template, 'template', template)
+    source = getattr(inner, 'source', None)
+    if source is not None:
+        return source
+    origin = getattr(inner, 'origin', None)
+    path = getattr(origin, 'name', None)
+    if path is None or not os.path.isfile(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            return f.read()
+    except (IOError, OSError):
+        return None
+
+
+class TemplateRenderer(object):
+    __slots__ = (
+        'templates',
+        'fast_paths',
+        '_signature',
+        '_lock',
+    )
+
+    def __init__(self):
+        self.templates = {}
+        self.fast_paths = {}
+        self._signature = None
+        self._lock = Lock()
+
+    def load(self, template_names=TEMPLATE_NAMES):
+        loaded = 0
+        for template_name in template_names:
+            try:
+                self.get_template(template_name)
+                loaded += 1
+            except TemplateDoesNotExist:
+                logger.debug("Template %s is not available", template_name)
+        return loaded
+
+    def get_template(self, template_name):
+        try:
+            return self.templates[template_name]
+        except KeyError:
+            pass
+        template = get_template(template_name)
+        with self._lock:
+            self.templates[template_name] = template
+            if template_name in FAST_TEMPLATE_NAMES:
+                self.fast_paths[template_name] = self.get_fast_path(
+                    template_name, template)
+        return template
+
+    def get_fast_path(self, template_name, template):
+        # compiled from whatever the loaders found, so that a project which
+        # overrides the template gets its own version either way.
+        source = template_source(template)
+        if source is None:
+            return None
+        return compile_fast_path(source, name=template_name)
+
+    def render(self, template_name, context=None):
+        template = self.get_template(template_name)
+        fast_path = self.fast_paths.get(template_name)
+        if fast_path is not None:
+            try:
+                return fast_path(context or {})
+            except FastPathMiss:
+                pass
+        return template.render(context)
+
+    def signature(self):
+        # changes whenever the templates do, bundled or overridden, so that
+        # anything keyed on what was rendered can tell output from an older
+        # version apart.
+        if self._signature is None:
+            digest = sha1()
+            for template_name in TEMPLATE_NAMES:
+                try:
+                    source = template_source(self.get_template(template_name))
+                except TemplateDoesNotExist:
+                    continue
+                if source is None:
+                    path = os.path.join(TEMPLATE_ROOT, *template_name.split('/'))
+                    if os.path.exists(path):
+                        with open(path, 'r') as f:
+                            source = f.read()
+                if source is not None:
+                    digest.update(source.encode('utf-8'))
+            self._signature = digest.hexdigest()
+        return self._signature
+
+    def clear(self):
+        with self._lock:
+            self.templates.clear()
+            self.fast_paths.clear()
+            self._signature = None
+
+
+renderer = TemplateRenderer()
+
+
+@receiver(setting_changed)
+def reset_renderer(sender, setting, **kwargs):
+    if setting in RESETTING_SETTINGS:
+        renderer.clear()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from collections import namedtuple, OrderedDict
+from threading import Lock
+try:
+    from django.urls import get_resolver, get_urlconf, resolve
+except ImportError:  # Django < 1.10
+    from django.core.urlresolvers import get_resolver, get_urlconf, resolve
+
+ResolvedView = namedtuple('ResolvedView', 'view_name url_name app_name '
+                                          'args kwargs best_name')
+CacheEntry = namedtuple('CacheEntry', 'resolver resolved')
+
+
+class ResolveCache(object):
+    __slots__ = (
+        'maxsize',
+        'entries',
+        '_lock',
+    )
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, path, namer):
+        urlconf = get_urlconf()
+        # `get_resolver` is itself memoized, and hands back a new object
+        # whenever the url caches are cleared or ROOT_URLCONF changes, so
+        # comparing identity is enough to spot a stale entry.
+        resolver = get_resolver(urlconf)
+        key = (urlconf, path)
+        with self._lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None and entry.resolver is resolver:
+                self.entries[key] = entry
+                return entry.resolved
+        match = resolve(path, urlconf)
+        resolved = ResolvedView(
+            view_name=match.view_name,
+            url_name=match.url_name,
+            app_name=match.app_name,
+            args=match.args,
+            kwargs=match.kwargs,
+            best_name=namer(match, default=match.url_name),
+        )
+        with self._lock:
+            self.entries[key] = CacheEntry(resolver=resolver, resolved=resolved)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return resolved
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+
+resolve_cache = ResolveCache()
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from collections import namedtuple
+from random import random
+from threading import Lock
+import re
+import time
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+SampleKey = namedtuple('SampleKey', 'view path')
+
+
+def make_sample_key(request):
+    # `resolver_match` is set by the handler before the view runs, so this
+    # costs a couple of attribute lookups and no urlconf walking. A request
+    # which didn't resolve has no view; the path won't do instead, as any
+    # number of them might be requested.
+    match = getattr(request, 'resolver_match', None)
+    view = getattr(match, 'view_name', None)
+    return SampleKey(view=view, path=request.path_info)
+
+
+class Sampler(object):
+    __slots__ = ()
+
+    def allow(self, key):
+        raise NotImplementedError("Subclasses must implement `allow`")
+
+    def record(self, key, generated):
+        return None
+
+
+class ProbabilitySampler(Sampler):
+    __slots__ = ('rate',)
+
+    def __init__(self, rate):
+        assert 0 <= rate <= 1, "Rate must be between 0 and 1"
+        self.rate = rate
+
+    def allow(self, key):
+        return random() < self.rate
+
+
+class PerViewQuotaSampler(Sampler):
+    __slots__ = ('limit', 'period', 'windows', '_lock')
+
+    def __init__(self, limit, period=3600):
+        self.limit = limit
+        self.period = period
+        # view -> (window start, count)
+        self.windows = {}
+        self._lock = Lock()
+
+    def allow(self, key):
+        if key.view is None:
+            return False
+        now = time.time()
+        with self._lock:
+            started, count = self.windows.get(key.view, (now, 0))
+            if now - started >= self.period:
+                started, count = now, 0
+            if count >= self.limit:
+                return False
+            self.windows[key.view] = (started, count + 1)
+        return True
+
+
+class TokenBucketSampler(Sampler):
+    __slots__ = ('buckets', 'state', '_lock')
+
+    def __init__(self, buckets):
+        # buckets is an iterable of (url regex, tokens per second, burst);
+        # the first pattern which matches the path is used, and paths which
+        # match nothing are declined.
+        self.buckets = tuple((re.compile(pattern), rate, burst)
+                             for pattern, rate, burst in buckets)
+        # pattern -> (tokens, last refill)
+        self.state = {}
+        self._lock = Lock()
+
+    def allow(self, key):
+        for regex, rate, burst in self.buckets:
+            if regex.search(key.path) is not None:
+                return self._take(regex.pattern, rate, burst)
+        return False
+
+    def _take(self, pattern, rate, burst):
+        now = time.time()
+        with self._lock:
+            tokens, last = self.state.get(pattern, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            if tokens < 1:
+                self.state[pattern] = (tokens, now)
+                return False
+            self.state[pattern] = (tokens - 1, now)
+        return True
+
+
+class UntilFirstSuccessSampler(Sampler):
+    __slots__ = ('succeeded',)
+
+    def __init__(self):
+        self.succeeded = set()
+
+    def allow(self, key):
+        return key.view is not None and key.view not in self.succeeded
+
+    def record(self, key, generated):
+        if generated and key.view is not None:
+            self.succeeded.add(key.view)
+
+
+class AllOfSampler(Sampler):
+    __slots__ = ('samplers',)
+
+    def __init__(self, *samplers):
+        self.samplers = samplers
+
+    def allow(self, key):
+        # cheapest and most selective policies should be listed first.
+        return all(sampler.allow(key) for sampler in self.samplers)
+
+    def record(self, key, generated):
+        for sampler in self.samplers:
+            sampler.record(key, generated)
+
+
+def get_sampler():
+    sampler = getattr(settings, 'TESTGUESS_SAMPLER', None)
+    if sampler is not None:
+        if callable(sampler):
+            return sampler()
+        return import_string(sampler)()
+    rate = getattr(settings, 'TESTGUESS_SAMPLE_RATE', None)
+    if rate is not None:
+        return ProbabilitySampler(rate=rate)
+    return None
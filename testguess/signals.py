@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from django.dispatch import Signal
+
+# sent with `name`, `kind` ('timing' or 'counter') and `value` keyword
+# arguments by `testguess.metrics.SignalSink`.
+metric_recorded = Signal()
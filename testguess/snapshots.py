@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from collections import namedtuple
+from .content import chunks_head, response_chunks
+from .introspection import ContextIntrospector
+
+# how much of a response body is kept around once the response has gone.
+CONTENT_PREFIX_LENGTH = 512
+
+default_introspector = ContextIntrospector()
+
+UserSnapshot = namedtuple('UserSnapshot', 'is_active is_staff is_superuser')
+
+
+class RequestSnapshot(namedtuple('RequestSnapshot',
+                                 'method path full_path GET POST user')):
+    __slots__ = ()
+
+    def get_full_path(self):
+        return self.full_path
+
+
+ResponseSnapshot = namedtuple('ResponseSnapshot', 'status_code headers '
+                                                  'content_prefix '
+                                                  'context_keys context_types '
+                                                  'context_structure '
+                                                  'streaming content_length '
+                                                  'fingerprint queries timing '
+                                                  'memory')
+
+
+def user_is_authenticated(user):
+    # a method before Django 1.10, a property afterwards.
+    is_authenticated = user.is_authenticated
+    if callable(is_authenticated):
+        return is_authenticated()
+    return is_authenticated
+
+
+def response_headers(response):
+    headers = getattr(response, '_headers', None)
+    if headers is not None:
+        return tuple(headers.values())
+    return tuple(response.items())
+
+
+def snapshot_user(request):
+    user = getattr(request, 'user', None)
+    if user is None or not user_is_authenticated(user):
+        return None
+    return UserSnapshot(is_active=user.is_active, is_staff=user.is_staff,
+                        is_superuser=user.is_superuser)
+
+
+def snapshot_request(request):
+    return RequestSnapshot(
+        method=request.method,
+        path=request.path,
+        full_path=request.get_full_path(),
+        GET=dict(request.GET.lists()),
+        POST=dict(request.POST.lists()) if request.method == 'POST' else {},
+        user=snapshot_user(request),
+    )
+
+
+def snapshot_response(response, introspector=default_introspector,
+                      fingerprint=None, queries=None, timing=None,
+                      memory=None):
+    context_data = getattr(response, 'context_data', None)
+    context_keys = None
+    context_types = ()
+    context_structure = ()
+    if context_data is not None:
+        summary = introspector.describe(context_data)
+        context_keys = summary.keys
+        context_types = summary.types
+        context_structure = summary.structure
+    content_length = None
+    if response.streaming:
+        # filled in by whatever observes the stream being consumed.
+        content_prefix = b''
+    else:
+        chunks = response_chunks(response)
+        content_prefix = chunks_head(chunks, CONTENT_PREFIX_LENGTH).tobytes()
+        content_length = sum(len(chunk) for chunk in chunks)
+    return ResponseSnapshot(
+        status_code=response.status_code,
+        headers=response_headers(response),
+        content_prefix=content_prefix,
+        context_keys=context_keys,
+        context_types=context_types,
+        context_structure=context_structure,
+        streaming=response.streaming,
+        content_length=content_length,
+        fingerprint=fingerprint,
+        queries=queries,
+        timing=timing,
+        memory=memory,
+    )
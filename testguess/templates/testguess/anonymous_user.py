@@ -1,3 +1,3 @@
         from django.contrib.auth.models import AnonymousUser
-        self.user = AnonymousUser()
-        self.auth = {}
+        cls.user = AnonymousUser()
+        cls.auth = {}
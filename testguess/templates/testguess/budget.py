@@ -0,0 +1,6 @@
+    def test_response_time_budget(self):
+        # observed median: {{ budget.median }}s{% if budget.cpu_median is not None %}, {{ budget.cpu_median }}s of CPU{% endif %}, in the view alone
+        from testguess.timing import MINIMUM_BUDGET, client_overhead, median_duration
+        overhead = client_overhead(self.client, runs={{ budget.runs }})
+        elapsed = median_duration(lambda: self.client.{{ request.method|lower }}('{{ request.path }}', data={{ request.data|safe }}), runs={{ budget.runs }})
+        self.assertLessEqual(elapsed - overhead, max({{ budget.wall }}, MINIMUM_BUDGET))
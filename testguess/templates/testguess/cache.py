@@ -0,0 +1,29 @@
+{% if response.conditional %}    def test_response_conditional_get(self):
+        response = self.get_response()
+        conditions = {}
+{% if config.has_etag %}        conditions['HTTP_IF_NONE_MATCH'] = response['ETag']
+{% endif %}{% if config.has_last_modified %}        conditions['HTTP_IF_MODIFIED_SINCE'] = response['Last-Modified']
+{% endif %}        revalidated = self.client.{{ request.method|lower }}('{{ request.path }}', data={{ request.data|safe }}, **conditions)
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.content, b'')
+
+{% endif %}{% if config.has_etag %}    def test_response_etag(self):
+        response = self.get_response()
+        # the value usually follows the content, so only its presence is
+        # checked.
+        self.assertTrue(response.has_header('ETag'))
+
+{% endif %}{% if config.has_last_modified %}    def test_response_last_modified(self):
+        response = self.get_response()
+        self.assertTrue(response.has_header('Last-Modified'))
+
+{% endif %}{% if response.cache_control is not None %}    def test_response_cache_control(self):
+        from testguess.caching import cache_directives
+        response = self.get_response()
+        self.assertEqual(cache_directives(response['Cache-Control']), {{ response.cache_control|safe }})
+
+{% endif %}{% if response.vary is not None %}    def test_response_vary(self):
+        from testguess.caching import vary_headers
+        response = self.get_response()
+        self.assertEqual(vary_headers(response['Vary']), {{ response.vary|safe }})
+{% endif %}
@@ -1,5 +1,5 @@
     def test_templateresponse_context_data_contains_expected_keys(self):
-        response = self.client.{{ request.method|lower }}('{{ request.path }}', data={{ request.data|safe }})
+        response = self.get_response()
         expected = set({{ response.context_keys|safe }})
         in_context = set(response.context_data.keys())
         self.assertEqual(expected, in_context)
@@ -7,6 +7,11 @@
     def test_templateresponse_context_data_has_expected_types(self):
         {% for module, name in response.context_value_imports %}from {{ module }} import {{ name }}
         {% endfor %}
-        response = self.client.{{ request.method|lower }}('{{ request.path }}', data={{ request.data|safe }})
+        response = self.get_response()
         {% for k, v in response.context_values %}self.assertIsInstance(response.context_data['{{ k }}'], {{ v }})
         {% endfor %}
+{% if response.context_structure %}
+    def test_templateresponse_context_data_has_expected_structure(self):
+        response = self.get_response()
+        {% for accessor, keys, complete in response.context_structure %}{% if complete %}self.assertEqual(set(response.context_data{{ accessor|safe }}.keys()), set({{ keys|safe }})){% else %}self.assertTrue(set({{ keys|safe }}).issubset(response.context_data{{ accessor|safe }}.keys())){% endif %}
+        {% endfor %}{% endif %}
\ No newline at end of file
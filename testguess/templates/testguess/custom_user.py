@@ -9,6 +9,5 @@
         user.is_superuser = {{ request.user.is_superuser }}
         user.set_password(password)
         user.save()
-        self.user = user
-        self.auth = {'username': username, 'password': password}
-        self.client.login(**self.auth)
+        cls.user = user
+        cls.auth = {'username': username, 'password': password}
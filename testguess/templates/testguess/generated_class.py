@@ -8,13 +8,36 @@ class GuessedTestCase(TestCase):
     Generated: {{ when|date:'c' }}
     {% for config_name, config_value in config.items %}{{ config_name }}: {{ config_value }}
     {% endfor %}"""
-    def setUp(self):
+    # filled in by the first test to need it, and shared by the rest.
+    shared_response = None
+
+    @classmethod
+    def setUpTestData(cls):
 {% for s in setup %}{{ s }}{% endfor %}
         return None
 
+    def setUp(self):
+        if self.auth:
+            force_login = getattr(self.client, 'force_login', None)
+            if force_login is not None:
+                force_login(self.user)
+            else:
+                self.client.login(**self.auth)
+        return None
+
+    def get_response(self):
+        cls = type(self)
+        if cls.shared_response is None:
+            cls.shared_response = self.client.{{ request.method|lower }}('{{ request.path }}', data={{ request.data|safe }})
+        return cls.shared_response
+
 {{ tests.reverse }}
 {{ tests.status_code }}
 {{ tests.headers }}
 {{ tests.content_parsed }}
 {{ tests.context_data }}
-
+{{ tests.streaming }}
+{{ tests.queries }}
+{{ tests.budget }}
+{{ tests.memory }}
+{{ tests.cache }}
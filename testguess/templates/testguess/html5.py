@@ -1,7 +1,13 @@
     def test_response_is_html5(self):
         from html5lib import parse
-        response = self.client.{{ request.method|lower }}('{{ request.path }}', data={{ request.data|safe }})
+        response = self.get_response()
         self.assertFalse(response.streaming)
         # rather than F, this will E
         parse(response.content)
-
+{% if response.has_fingerprint %}
+    def test_response_html_skeleton(self):
+        from testguess.fingerprints import html_fingerprint, load_fingerprint
+        response = self.get_response()
+        expected = load_fingerprint(__file__)
+        self.assertEqual(html_fingerprint(response.content, expected['max_bytes']), expected)
+{% endif %}
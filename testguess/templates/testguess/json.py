@@ -1,9 +1,14 @@
     def test_response_is_json(self):
         from json import loads
-        response = self.client.{{ request.method|lower }}('{{ request.path }}', data={{ request.data|safe }})
+        response = self.get_response()
         self.assertFalse(response.streaming)
         # rather than F, this will E
         content = loads(response.content)
-        expected = {}  # TODO: Fill this in to make the test pass
-        self.assertEqual(content, expected)
-
+{% if response.has_fingerprint %}
+    def test_response_json_structure(self):
+        from testguess.fingerprints import json_fingerprint, load_fingerprint
+        response = self.get_response()
+        expected = load_fingerprint(__file__)
+        self.assertEqual(json_fingerprint(response.content, expected['max_bytes']), expected)
+{% elif response.json_type %}        self.assertIsInstance(content, {{ response.json_type }})
+{% endif %}
@@ -0,0 +1,6 @@
+    def test_response_memory_budget(self):
+        # observed peak: {{ memory.peak }} bytes, in the view alone
+        from testguess.memory import MINIMUM_BUDGET, client_overhead, peak_allocated
+        overhead = client_overhead(self.client)
+        peak = peak_allocated(lambda: self.client.{{ request.method|lower }}('{{ request.path }}', data={{ request.data|safe }}))
+        self.assertLessEqual(peak - overhead, max({{ memory.budget }}, MINIMUM_BUDGET))
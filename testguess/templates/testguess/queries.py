@@ -0,0 +1,6 @@
+    def test_response_num_queries(self):
+{% if response.queries.repeated_sql %}        # Possible N+1: {{ response.queries.duplicates }} of {{ response.queries.count }} queries repeated an
+        # earlier one, and this ran {{ response.queries.repeated }} times:
+        # {{ response.queries.repeated_sql|safe }}
+{% endif %}        with self.assertNumQueries({{ response.queries.count }}):
+            self.client.{{ request.method|lower }}('{{ request.path }}', data={{ request.data|safe }})
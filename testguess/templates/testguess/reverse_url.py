@@ -1,5 +1,8 @@
     def test_url_reversed(self):
-        from django.core.urlresolvers import reverse
+        try:
+            from django.urls import reverse
+        except ImportError:  # Django < 1.10
+            from django.core.urlresolvers import reverse
         url = reverse("{{ request.resolved.view_name }}",
                       args={{ request.resolved.args|safe }},
                       kwargs={{ request.resolved.kwargs|safe }})
@@ -0,0 +1,18 @@
+    def test_response_is_streamed(self):
+        from testguess.content import classify, content_prefix, content_suffix
+        response = self.client.{{ request.method|lower }}('{{ request.path }}', data={{ request.data|safe }})
+        self.assertTrue(response.streaming)
+        first = None
+        last = b''
+        size = 0
+        for chunk in response.streaming_content:
+            if first is None:
+                first = chunk
+            last = chunk
+            size += len(chunk)
+        self.assertAlmostEqual(size, {{ response.content_length }}, delta={{ response.content_length_delta }})
+        kind = classify(prefix=content_prefix(memoryview(first or b'')),
+                        suffix=content_suffix(memoryview(last)),
+                        content_type=response.get('Content-Type', ''),
+                        disposition=response.get('Content-Disposition', ''))
+        self.assertEqual(kind, '{{ response.content_kind }}')
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+import os
+import pytest
+from django.test.utils import override_settings
+from testguess.memory import memory_peaks
+from testguess.middleware import clear_ensured_directories
+from testguess.resolving import resolve_cache
+from testguess.timing import latency_sketches
+
+TEMPLATES = [{
+    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    'DIRS': [os.path.join(os.path.dirname(__file__), 'templates')],
+    'APP_DIRS': True,
+}]
+
+
+@pytest.fixture
+def guessing(tmpdir):
+    """
+    Settings under which the middleware generates into `tmpdir`, rather than
+    next to the project's own settings.
+    """
+    with override_settings(TESTGUESS_ROOT=str(tmpdir),
+                           ROOT_URLCONF='testguess.tests.urls',
+                           TEMPLATES=TEMPLATES,
+                           TESTGUESS_MODE='inline'):
+        yield tmpdir
+    latency_sketches.clear()
+    memory_peaks.clear()
+    resolve_cache.clear()
+    clear_ensured_directories()
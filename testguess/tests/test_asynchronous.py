@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+import asyncio
+import time
+import pytest
+from django.test.utils import override_settings
+from testguess.asynchronous import (AsyncGuessResponse, ExecutorQueue,
+                                    get_executor_queue, iscoroutinefunction)
+from .utils import call_view, generated_modules, make_request
+
+
+def drain(queue, timeout=5):
+    deadline = time.time() + timeout
+    while queue.pending:
+        assert time.time() < deadline, "generation never finished"
+        time.sleep(0.01)
+
+
+def sync_stack():
+    def get_response(request):
+        match = request.resolver_match
+        middleware.process_view(request, match.func, match.args, match.kwargs)
+        return call_view(request)
+    middleware = AsyncGuessResponse(get_response)
+    return middleware
+
+
+def async_stack():
+    async def get_response(request):
+        match = request.resolver_match
+        middleware.process_view(request, match.func, match.args, match.kwargs)
+        return call_view(request)
+    middleware = AsyncGuessResponse(get_response)
+    return middleware
+
+
+@pytest.fixture
+def budgeted(guessing):
+    with override_settings(TESTGUESS_TIMING_MIN_SAMPLES=1):
+        yield guessing
+
+
+def test_sync_path(budgeted):
+    middleware = sync_stack()
+    assert not middleware.is_async
+    response = middleware(make_request('/'))
+    assert response.status_code == 200
+    drain(middleware.queue)
+    source, = generated_modules(budgeted).values()
+    assert 'client_overhead(self.client' in source
+
+
+def test_async_path(budgeted):
+    middleware = async_stack()
+    assert middleware.is_async
+    assert iscoroutinefunction(middleware)
+    request = make_request('/')
+    response = asyncio.run(middleware(request))
+    assert response.status_code == 200
+    assert not hasattr(request, '_testguess_started')
+    drain(middleware.queue)
+    source, = generated_modules(budgeted).values()
+    # the view isn't timed on the event loop.
+    assert 'client_overhead(self.client' not in source
+
+
+def test_one_executor_per_process():
+    assert sync_stack().queue is async_stack().queue is get_executor_queue()
+
+
+def test_executor_queue_drops_beyond_max_pending():
+    release = Event()
+    queue = ExecutorQueue(ThreadPoolExecutor(max_workers=1), max_pending=2)
+    try:
+        assert queue.submit(release.wait)
+        assert queue.submit(release.wait)
+        assert not queue.submit(release.wait)
+        assert queue.pending == 2
+    finally:
+        release.set()
+        queue.shutdown()
+    assert queue.pending == 0
+
+
+def test_executor_queue_after_shutdown():
+    queue = ExecutorQueue(ThreadPoolExecutor(max_workers=1))
+    queue.shutdown()
+    assert not queue.submit(lambda: None)
+    assert queue.pending == 0
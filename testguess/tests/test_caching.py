@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+import pytest
+from django.test.utils import override_settings
+from testguess.caching import cache_directives, is_cacheable, vary_headers
+from testguess.middleware import GuessResponse
+from .utils import generated_modules, run_generated_test, through
+
+
+def test_cache_directives():
+    assert cache_directives('max-age=600, Public') == {'max-age': '600',
+                                                      'public': None}
+    assert cache_directives('private="Set-Cookie", , no-transform') == {
+        'private': 'Set-Cookie', 'no-transform': None}
+    assert cache_directives('') == {}
+
+
+def test_vary_headers():
+    assert vary_headers('Cookie, accept-encoding,cookie, ') == [
+        'accept-encoding', 'cookie']
+
+
+@pytest.mark.parametrize('value,expected', [
+    ('public', True),
+    ('max-age=600', True),
+    ('s-maxage=60, max-age=0', True),
+    ('max-age=0', False),
+    ('max-age=soon', False),
+    ('public, no-store', False),
+    ('max-age=600, private', False),
+    ('no-cache', False),
+    ('', False),
+])
+def test_is_cacheable(value, expected):
+    assert is_cacheable(value) is expected
+
+
+def cache_tests(guessing, path):
+    through(GuessResponse(), path)
+    source, = generated_modules(guessing).values()
+    return source
+
+
+def test_etag_without_conditional_get(guessing):
+    source = cache_tests(guessing, '/etag/')
+    assert 'def test_response_conditional_get' not in source
+    assert 'def test_response_etag' in source
+    # its quotes would be escaped; it is only checked for being there.
+    assert "response['ETag']" not in source
+    run_generated_test(source, 'test_response_etag')
+    run_generated_test(source, 'test_response_headers')
+
+
+def test_etag_with_conditional_get(guessing):
+    middleware = ['django.middleware.http.ConditionalGetMiddleware']
+    with override_settings(MIDDLEWARE=middleware, MIDDLEWARE_CLASSES=middleware):
+        source = cache_tests(guessing, '/etag/')
+        assert 'def test_response_conditional_get' in source
+        run_generated_test(source, 'test_response_conditional_get')
+
+
+def test_cache_control_and_vary(guessing):
+    source = cache_tests(guessing, '/cached/')
+    assert "{'max-age': '600', 'public': None}" in source
+    assert "['cookie']" in source
+    run_generated_test(source, 'test_response_cache_control')
+    run_generated_test(source, 'test_response_vary')
+    run_generated_test(source, 'test_response_headers')
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+import pytest
+from django.http import HttpResponse
+from testguess.content import (CONTENT_BINARY, CONTENT_CSV, CONTENT_HTML5,
+                               CONTENT_JSON, CONTENT_TEXT, CONTENT_UNKNOWN,
+                               CONTENT_XML, chunks_head, chunks_tail, classify,
+                               classify_content, classify_response,
+                               observe_stream, response_chunks)
+from testguess.snapshots import snapshot_response
+
+
+@pytest.mark.parametrize('content,content_type,disposition,expected', [
+    (b'  <!DOCTYPE html><html></html>', 'text/html', '', CONTENT_HTML5),
+    (b'{"a": 1}\n', 'application/json', '', CONTENT_JSON),
+    (b'[1, 2]', 'text/html', '', CONTENT_JSON),
+    (b'[1, 2', 'text/plain', '', CONTENT_TEXT),
+    (b'<?xml version="1.0"?><a/>', '', '', CONTENT_XML),
+    (b'<a/>', 'application/rss+xml; charset=utf-8', '', CONTENT_XML),
+    (b'a,b\n1,2\n', 'text/csv', '', CONTENT_CSV),
+    (b'%PDF-1.4', 'application/pdf', '', CONTENT_BINARY),
+    (b'\x00\x01', '', '', CONTENT_BINARY),
+    (b'{"a": 1}', 'application/json', 'attachment; filename="a.json"',
+     CONTENT_BINARY),
+    (b'<html></html>', 'text/html', '', CONTENT_UNKNOWN),
+])
+def test_classify_content(content, content_type, disposition, expected):
+    assert classify_content(content, content_type=content_type,
+                            disposition=disposition) == expected
+
+
+def test_classify_only_looks_at_the_ends():
+    assert classify(prefix=b'{"a"', suffix=b'1}') == CONTENT_JSON
+
+
+CHUNKS = [b'abc', b'de', b'', b'fghij']
+
+
+@pytest.mark.parametrize('size', range(0, 12))
+def test_chunks_head_and_tail(size):
+    joined = b''.join(CHUNKS)
+    assert chunks_head(CHUNKS, size).tobytes() == joined[0:size]
+    assert chunks_tail(CHUNKS, size).tobytes() == joined[max(0, len(joined) - size):]
+
+
+def test_chunks_head_doesnt_copy_one_big_chunk():
+    chunk = b'x' * 100
+    assert chunks_head([chunk, b'y'], 10).obj is chunk
+    assert chunks_tail([b'y', chunk], 10).obj is chunk
+
+
+def test_observe_stream():
+    completed = []
+    stream = observe_stream(iter([b' {"a": ', b'1, "b": 2', b'}  ']),
+                            on_complete=lambda **kwargs: completed.append(kwargs),
+                            size=4)
+    assert b''.join(stream) == b' {"a": 1, "b": 2}  '
+    assert completed == [{'prefix': b'{"a', 'suffix': b'}', 'length': 19}]
+
+
+def test_observe_stream_only_completes_when_consumed():
+    completed = []
+    stream = observe_stream(iter([b'a', b'b']),
+                            on_complete=lambda **kwargs: completed.append(kwargs))
+    next(stream)
+    assert completed == []
+
+
+def test_classify_response_built_by_writes():
+    response = HttpResponse(content_type='application/json')
+    response.write(b'[')
+    for number in range(1000):
+        response.write(b'%d, ' % number)
+    response.write(b'0]')
+    assert classify_response(response) == CONTENT_JSON
+    chunks = response_chunks(response)
+    # kept as written, not joined.
+    assert len(chunks) > 1000
+    assert sum(len(chunk) for chunk in chunks) == len(response.content)
+
+
+def test_snapshot_doesnt_join_the_body():
+    response = HttpResponse(b'<!doctype html>')
+    response.write(b'x' * 10000)
+    snapshot = snapshot_response(response)
+    assert snapshot.content_prefix == (b'<!doctype html>' + b'x' * 10000)[0:512]
+    assert snapshot.content_length == 10015
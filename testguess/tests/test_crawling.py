@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from multiprocessing.pool import ThreadPool
+import io
+import pytest
+from django.core.management import call_command
+from django.test.utils import override_settings
+from testguess.crawling import Crawler, local_path, reversible_paths
+from testguess.middleware import GuessResponse
+from .utils import generated_modules
+
+
+@pytest.fixture
+def crawl(guessing):
+    pool = ThreadPool(processes=2)
+
+    def crawl(paths, depth=2, max_pages=100, exclude=()):
+        with override_settings(TESTGUESS_TIMING=False):
+            crawler = Crawler(guesser=GuessResponse(), exclude=exclude)
+            results = crawler.crawl(pool, paths=paths, usernames=[None],
+                                    depth=depth, max_pages=max_pages)
+        return dict((result.path, result) for result in results)
+
+    yield crawl
+    pool.close()
+    pool.join()
+
+
+@pytest.mark.parametrize('href,expected', [
+    ('/json/', '/json/'),
+    ('json/', '/page/json/'),
+    ('../', '/'),
+    ('?page=2#top', '/page/?page=2'),
+    ('http://testserver/json/', '/json/'),
+    ('https://elsewhere/json/', None),
+    ('mailto:someone@example.com', None),
+    ('javascript:void(0)', None),
+])
+def test_local_path(href, expected):
+    assert local_path('/page/', href, 'testserver') == expected
+
+
+def test_reversible_paths(guessing):
+    paths = reversible_paths()
+    assert '/' in paths
+    assert '/json/' in paths
+    assert paths == sorted(paths)
+
+
+def test_links_are_followed(crawl, guessing):
+    results = crawl(['/'], depth=1)
+    assert sorted(results) == ['/', '/json/', '/template/']
+    assert results['/'].links == ('/json/', '/template/')
+    assert results['/json/'].links == ()
+    assert len(generated_modules(guessing)) == 3
+
+
+def test_depth(crawl):
+    assert sorted(crawl(['/'], depth=0)) == ['/']
+
+
+def test_redirects_are_followed(crawl):
+    results = crawl(['/redirect/'], depth=1)
+    assert results['/redirect/'].status_code == 302
+    assert results['/redirect/'].links == ('/',)
+    assert '/' in results
+
+
+def test_exclude(crawl):
+    results = crawl(['/', '/stream/'], exclude=[r'^/json/', r'stream'])
+    assert sorted(results) == ['/', '/template/']
+
+
+def test_max_pages(crawl):
+    assert len(crawl(['/'], max_pages=2)) == 2
+
+
+def test_crawl_command(guessing):
+    out = io.StringIO()
+    with override_settings(TESTGUESS_TIMING=False):
+        call_command('testguess_crawl', '--depth=0', '--threads=1',
+                     '--exclude=queries', '--exclude=download', stdout=out)
+    assert out.getvalue().strip() == (
+        "Crawled 8 pages as 1 users: 200: 6, 302: 1, 500: 1")
+    # neither the failure nor the stream, which isn't observed by default.
+    assert len(generated_modules(guessing)) == 6
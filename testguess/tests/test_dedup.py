@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+import os
+from django.test.utils import override_settings
+from testguess.dedup import KeyFilter, SeenSet, make_key
+from testguess.middleware import GuessResponse
+from .utils import generated_modules, through
+
+
+def test_make_key():
+    key = make_key('app:view', '101000011100', 200)
+    assert len(key) == 16
+    assert key == make_key('app:view', '101000011100', '200')
+    assert key != make_key('app:view', '101000011100', 404)
+    assert key != make_key('app:view', '101000011100', 200, signature='x')
+
+
+def test_lru_evicts():
+    seen = SeenSet(maxsize=2)
+    for key in ('a', 'b', 'c'):
+        seen.add(key)
+    assert 'a' not in seen
+    assert 'b' in seen
+    assert 'c' in seen
+    assert len(seen) == 2
+
+
+def test_evicted_keys_are_found_on_disk(tmpdir):
+    path = str(tmpdir.join('sub', 'seen'))
+    seen = SeenSet(maxsize=1, path=path)
+    for key in ('a', 'b', 'c'):
+        seen.add(key)
+    assert 'a' in seen
+    # and don't get written out again.
+    seen.add('b')
+    with open(path) as f:
+        assert f.read() == 'a\nb\nc\n'
+
+
+def test_other_writers_are_seen(tmpdir):
+    path = str(tmpdir.join('seen'))
+    first = SeenSet(path=path)
+    second = SeenSet(path=path)
+    first.add('a')
+    assert 'a' in second
+    assert 'b' not in second
+
+
+def test_truncated_file_is_read_again(tmpdir):
+    path = tmpdir.join('seen')
+    seen = SeenSet(maxsize=1, path=str(path))
+    for key in ('a', 'b', 'c'):
+        seen.add(key)
+    path.write('d\n')
+    assert 'd' in seen
+    assert 'a' not in seen
+
+
+def test_memory_is_bounded(tmpdir):
+    seen = SeenSet(maxsize=10, path=str(tmpdir.join('seen')), filter_bits=1024)
+    for number in range(2000):
+        seen.add('%016x' % number)
+    assert len(seen) == 10
+    assert len(seen.on_disk.array) == 128
+    assert '%016x' % 0 in seen
+    assert '%016x' % 2000 not in seen
+
+
+def test_saturated_filter_still_tells_keys_apart(tmpdir):
+    seen = SeenSet(maxsize=1, path=str(tmpdir.join('seen')), filter_bits=8)
+    for key in ('a', 'b', 'c', 'd'):
+        seen.add(key)
+    assert 'a' in seen
+    assert 'e' not in seen
+    seen.add('e')
+    assert 'e' in seen
+    with open(str(tmpdir.join('seen'))) as f:
+        assert f.read() == 'a\nb\nc\nd\ne\n'
+
+
+def test_key_filter():
+    keys = KeyFilter(bits=1 << 16)
+    keys.add('a')
+    assert 'a' in keys
+    assert 'b' not in keys
+    keys.clear()
+    assert 'a' not in keys
+
+
+def test_seen_responses_arent_generated_again(guessing):
+    with override_settings(TESTGUESS_DEDUP=True, TESTGUESS_MANIFEST=False,
+                           TESTGUESS_TIMING=False):
+        middleware = GuessResponse()
+        through(middleware, '/json/')
+        name, = generated_modules(guessing)
+        os.unlink(str(guessing.join(name)))
+        through(middleware, '/json/')
+        assert generated_modules(guessing) == {}
+        # one which differs is still generated.
+        through(middleware, '/')
+        assert len(generated_modules(guessing)) == 1
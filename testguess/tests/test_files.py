@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+import shutil
+import pytest
+from django.conf import settings
+from django.test.utils import override_settings
+from testguess import middleware
+from testguess.middleware import TestFileHandler, clear_ensured_directories
+
+
+class Config(object):
+
+    def magic_number(self):
+        return '101'
+
+
+@pytest.fixture
+def handler(guessing):
+    return TestFileHandler(config=Config(), django_settings=settings)
+
+
+@pytest.fixture
+def made(monkeypatch):
+    made = []
+
+    def ensure_directory(directory, perm):
+        made.append(directory)
+        return original(directory, perm)
+
+    original = middleware.ensure_directory
+    monkeypatch.setattr(middleware, 'ensure_directory', ensure_directory)
+    return made
+
+
+def test_prepare(guessing, handler):
+    result = handler.prepare('app.views.page')
+    assert result.project_root == str(guessing)
+    tests = guessing.join('autoguessed', 'tests')
+    for directory in (guessing.join('autoguessed'), tests, tests.join('app'),
+                      tests.join('app', 'views'),
+                      tests.join('app', 'views', 'page')):
+        assert directory.join('__init__.py').check(file=1)
+    assert result.tree[-1].file == str(tests.join('app', 'views', 'page',
+                                                  'test_101.py'))
+    assert not tests.join('app', 'views', 'page', 'test_101.py').check()
+
+
+def test_directories_are_made_once(handler, made):
+    handler.prepare('app.views.page')
+    first = list(made)
+    assert first[-1].endswith('page')
+    handler.prepare('app.views.page')
+    assert made == first
+    # a sibling's leaf hasn't been made, so its whole chain is walked.
+    handler.prepare('app.views.other')
+    assert made[len(first):][-1].endswith('other')
+
+
+def test_deleted_directories_are_made_again(guessing, handler, made):
+    handler.prepare('app.views.page')
+    first = list(made)
+    shutil.rmtree(str(guessing.join('autoguessed')))
+    handler.prepare('app.views.page')
+    assert made == first * 2
+    assert guessing.join('autoguessed', '__init__.py').check(file=1)
+    assert guessing.join('autoguessed', 'tests', 'app', 'views', 'page').check(dir=1)
+
+
+def test_clear_ensured_directories(handler, made):
+    handler.prepare('app.views.page')
+    first = list(made)
+    clear_ensured_directories()
+    handler.prepare('app.views.page')
+    assert made == first * 2
+
+
+def test_existing_init_files_are_left_alone(guessing, handler):
+    handler.prepare('app.views.page')
+    init = guessing.join('autoguessed', 'tests', 'app', '__init__.py')
+    init.write('# mine\n')
+    clear_ensured_directories()
+    handler.prepare('app.views.page')
+    assert init.read() == '# mine\n'
+
+
+def test_unmakeable_directories(guessing, handler):
+    guessing.join('autoguessed').write('not a directory')
+    assert handler.prepare('app.views.page').tree is None
+
+
+class Settings(object):
+
+    def __init__(self, **values):
+        self.__dict__.update(values)
+
+
+def test_guess_project_directory():
+    def guess(**values):
+        handler = TestFileHandler(config=Config(),
+                                  django_settings=Settings(**values))
+        return handler.guess_project_directory(default=lambda: 'default')
+
+    assert guess(TESTGUESS_ROOT='/root', BASE_DIR='/base') == '/root'
+    assert guess(BASE_DIR='/base', PROJECT_ROOT='/project') == '/base'
+    assert guess(MEDIA_ROOT='/site/media', STATIC_ROOT='/site/static') == '/site'
+    assert guess(MEDIA_ROOT='/media', STATIC_ROOT='/static') == 'default'
+    assert guess() == 'default'
+
+
+def test_project_paths_are_worked_out_once(guessing, handler, monkeypatch):
+    calls = []
+    original = TestFileHandler.guess_project_directory
+
+    def guess_project_directory(self, default=None):
+        calls.append(default)
+        return original(self, default=default)
+
+    monkeypatch.setattr(TestFileHandler, 'guess_project_directory',
+                        guess_project_directory)
+    paths = handler.get_project_paths()
+    assert paths.root == str(guessing)
+    assert paths.app_root == str(guessing.join('autoguessed'))
+    assert paths.test_root == str(guessing.join('autoguessed', 'tests'))
+    assert paths.permissions == 0o750
+    handler.prepare('app.views.page')
+    TestFileHandler(config=Config(), django_settings=settings).prepare('json')
+    assert len(calls) == 1
+
+
+def test_project_paths_follow_settings(guessing, handler, tmpdir_factory):
+    before = handler.get_project_paths()
+    elsewhere = str(tmpdir_factory.mktemp('elsewhere'))
+    with override_settings(TESTGUESS_ROOT=elsewhere,
+                           FILE_UPLOAD_DIRECTORY_PERMISSIONS=0o700):
+        paths = handler.get_project_paths()
+        assert paths.root == elsewhere
+        assert paths.permissions == 0o700
+    assert handler.get_project_paths() == before
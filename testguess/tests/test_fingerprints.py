@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+import json
+import os
+import pytest
+from django.test.utils import override_settings
+from testguess.content import CONTENT_CSV, CONTENT_HTML5, CONTENT_JSON
+from testguess.fingerprints import (FINGERPRINTS_FILENAME, fingerprint_content,
+                                    fingerprints_path, html_fingerprint,
+                                    json_fingerprint, load_fingerprint,
+                                    write_fingerprint)
+from testguess.middleware import GuessResponse
+from .utils import generated_modules, run_generated_test, through
+
+
+def test_json_fingerprint():
+    content = json.dumps({'b': [{'c': 1}, {'c': 2, 'd': None}], 'a': 'x'})
+    fingerprint = json_fingerprint(content.encode('utf-8'))
+    assert fingerprint['kind'] == CONTENT_JSON
+    assert fingerprint['paths'] == [
+        '$.a:%s' % type(u'').__name__,
+        '$.b:list',
+        '$.b[].c:int',
+        '$.b[].d:NoneType',
+        '$.b[]:dict',
+        '$:dict',
+    ]
+
+
+def test_json_fingerprint_ignores_values():
+    first = json_fingerprint(b'{"a": [1, 2, 3], "b": true}')
+    second = json_fingerprint(b'{"b": false, "a": [4]}')
+    assert first == second
+
+
+def test_json_fingerprint_gives_up():
+    assert json_fingerprint(b'{"a": 1}', max_bytes=4) is None
+    assert json_fingerprint(b'{"a": ') is None
+    assert json_fingerprint(b'\xff') is None
+
+
+def test_html_fingerprint_ignores_attribute_values():
+    first = html_fingerprint(b'<p class="a"><input name="csrf" value="1"></p>')
+    second = html_fingerprint(b'<p class="b"><input value="2" name="csrf"></p>')
+    third = html_fingerprint(b'<p><input name="csrf" value="1"></p>')
+    assert first == second
+    assert first != third
+    assert first['kind'] == CONTENT_HTML5
+    assert first['tags'] == 2
+
+
+def test_html_fingerprint_is_bounded():
+    content = b'<p></p>' * 10
+    assert html_fingerprint(content, max_bytes=14) == html_fingerprint(
+        b'<p></p><p></p>', max_bytes=14)
+
+
+def test_fingerprint_content():
+    assert fingerprint_content(CONTENT_CSV, b'a,b') is None
+    assert fingerprint_content(CONTENT_JSON, b'{}', max_bytes=0) is None
+    assert fingerprint_content(CONTENT_JSON, b'{}')['paths'] == ['$:dict']
+
+
+def test_write_and_load(tmpdir):
+    first = str(tmpdir.join('test_001.py'))
+    second = str(tmpdir.join('test_010.py'))
+    assert write_fingerprint(first, {'a': 1})
+    assert write_fingerprint(second, {'b': 2})
+    assert load_fingerprint(first) == {'a': 1}
+    assert load_fingerprint(second) == {'b': 2}
+    assert load_fingerprint(str(tmpdir.join('test_100.py'))) is None
+    assert not os.path.exists(str(tmpdir.join(FINGERPRINTS_FILENAME + '.lock')))
+
+
+def test_write_gives_up_while_claimed(tmpdir, monkeypatch):
+    monkeypatch.setattr('testguess.fingerprints.wait_for_claim',
+                        lambda path: None)
+    assert write_fingerprint(str(tmpdir.join('test_001.py')), {}) is None
+    assert not tmpdir.join(FINGERPRINTS_FILENAME).check()
+
+
+def generated_module(guessing, path):
+    through(GuessResponse(), path)
+    (name, source), = generated_modules(guessing).items()
+    return str(guessing.join(name)), source
+
+
+def test_generated_json_structure(guessing):
+    path, source = generated_module(guessing, '/json/')
+    assert load_fingerprint(path)['kind'] == CONTENT_JSON
+    run_generated_test(source, 'test_response_json_structure', path=path)
+
+
+def test_generated_html_skeleton(guessing):
+    pytest.importorskip('html5lib')
+    path, source = generated_module(guessing, '/template/')
+    assert load_fingerprint(path)['kind'] == CONTENT_HTML5
+    run_generated_test(source, 'test_response_html_skeleton', path=path)
+
+
+def test_generated_json_type_without_fingerprints(guessing):
+    with override_settings(TESTGUESS_FINGERPRINT_MAX_BYTES=0):
+        path, source = generated_module(guessing, '/json/')
+    assert 'self.assertIsInstance(content, dict)' in source
+    assert not os.path.exists(fingerprints_path(path))
+    run_generated_test(source, 'test_response_is_json', path=path)
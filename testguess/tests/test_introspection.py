@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from django.test.utils import override_settings
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy
+from testguess.introspection import ContextIntrospector, NestedKeys, type_path
+from testguess.middleware import GuessResponse
+from .utils import generated_modules, run_generated_test, through
+
+
+class Unevaluated(object):
+    """
+    Fails loudly if anything looks inside it, as a QuerySet would run.
+    """
+
+    def __iter__(self):
+        raise AssertionError("iterated")
+
+    def __len__(self):
+        raise AssertionError("counted")
+
+
+def unevaluated():
+    raise AssertionError("evaluated")
+
+
+def test_type_path():
+    assert type_path(dict) == ('builtins', 'dict')
+    assert type_path(Unevaluated) == (__name__, 'Unevaluated')
+    assert type_path(type(gettext_lazy('lazy'))) is None
+
+
+def test_describe():
+    summary = ContextIntrospector().describe({
+        'b': 1,
+        'a': {'y': {'z': 1}, 'x': []},
+        'c': gettext_lazy('lazy'),
+    })
+    assert summary.keys == ('a', 'b', 'c')
+    assert summary.types == (('b', 'builtins', 'int'),
+                             ('a', 'builtins', 'dict'))
+    assert summary.structure == (
+        NestedKeys(path=('a',), keys=('x', 'y'), complete=True),
+        NestedKeys(path=('a', 'y'), keys=('z',), complete=True),
+    )
+
+
+def test_values_are_never_evaluated():
+    summary = ContextIntrospector().describe({
+        'queryset': Unevaluated(),
+        'user': SimpleLazyObject(unevaluated),
+    })
+    assert summary.keys == ('queryset', 'user')
+    assert summary.types == (
+        ('queryset', __name__, 'Unevaluated'),
+        ('user', 'django.utils.functional', 'SimpleLazyObject'),
+    )
+    assert summary.structure == ()
+
+
+def test_depth_is_capped():
+    context = {'a': {'b': {'c': {'d': {}}}}}
+    structure = ContextIntrospector(max_depth=2).describe(context).structure
+    assert [nested.path for nested in structure] == [('a',), ('a', 'b')]
+
+
+def test_width_is_capped():
+    context = {'wide': dict(('key%03d' % n, n) for n in range(100))}
+    nested, = ContextIntrospector(max_width=10).describe(context).structure
+    assert len(nested.keys) == 10
+    assert not nested.complete
+
+
+def test_unusual_keys_are_skipped():
+    context = {'mixed': {'name': 1, ('tuple',): 2, 3: 3}}
+    nested, = ContextIntrospector().describe(context).structure
+    assert nested.keys == ('name', 3)
+    assert not nested.complete
+
+
+def test_caps_come_from_settings(guessing):
+    with override_settings(TESTGUESS_CONTEXT_DEPTH=1,
+                           TESTGUESS_CONTEXT_WIDTH=7):
+        introspector = GuessResponse().introspector
+    assert introspector.max_depth == 1
+    assert introspector.max_width == 7
+
+
+def test_generated_from_context(guessing):
+    with override_settings(TESTGUESS_TIMING=False,
+                           TESTGUESS_CONTEXT_DEPTH=1):
+        through(GuessResponse(), '/template/')
+    source, = generated_modules(guessing).values()
+    assert "'nested'" in source
+    assert "'deeper'" in source
+    assert "'deepest'" not in source
+    for name in ('test_templateresponse_context_data_contains_expected_keys',
+                 'test_templateresponse_context_data_has_expected_structure',
+                 'test_templateresponse_context_data_has_expected_types'):
+        run_generated_test(source, name)
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+import pytest
+from testguess.ledger import WorkLedger, get_ledger, make_ledger_key
+
+
+@pytest.fixture
+def ledger(tmpdir):
+    return WorkLedger(path=str(tmpdir.join('ledger', 'ledger.sqlite3')))
+
+
+def take_over(ledger, key, owner, ago):
+    ledger.connection().execute(
+        "UPDATE claims SET owner = ?, claimed_at = claimed_at - ? WHERE key = ?",
+        (owner, ago, key))
+
+
+def test_make_ledger_key():
+    assert make_ledger_key('app:view', '101') == 'app:view:101'
+
+
+def test_get_ledger(tmpdir):
+    path = str(tmpdir.join('ledger.sqlite3'))
+    ledger = get_ledger(path)
+    assert get_ledger(path) is ledger
+    patient = get_ledger(path, timeout=5)
+    assert patient is not ledger
+    assert patient.timeout == 5
+    assert get_ledger(path, stale_after=1).stale_after == 1
+    assert get_ledger(path, done_ttl=1).done_ttl == 1
+
+
+def test_claim_complete_and_release(ledger):
+    assert ledger.claim('a')
+    # our own claims can be taken again.
+    assert ledger.claim('a')
+    assert ledger.complete('a') == 1
+    assert not ledger.claim('a')
+    assert ledger.claim('b')
+    assert ledger.release('b') == 1
+    assert ledger.claim('b')
+
+
+def test_someone_elses_claim(ledger):
+    assert ledger.claim('a')
+    take_over(ledger, 'a', 'elsewhere', ago=0)
+    assert not ledger.claim('a')
+    assert ledger.complete('a') == 0
+    assert ledger.release('a') == 0
+
+
+def test_stale_claims_are_taken_over(ledger):
+    assert ledger.claim('a')
+    take_over(ledger, 'a', 'elsewhere', ago=ledger.stale_after + 1)
+    assert ledger.claim('a')
+
+
+def test_done_claims_expire(ledger):
+    assert ledger.claim('a')
+    ledger.complete('a')
+    take_over(ledger, 'a', 'elsewhere', ago=ledger.done_ttl + 1)
+    assert ledger.claim('a')
+
+
+def test_claim_many(ledger):
+    assert ledger.claim('b')
+    take_over(ledger, 'b', 'elsewhere', ago=0)
+    assert ledger.claim_many(('a', 'b', 'c')) == set(('a', 'c'))
+    assert ledger.complete_many(('a', 'b', 'c')) == 2
+
+
+def test_is_settled(ledger):
+    now = 1e10
+    assert not ledger.is_settled('a', owner=ledger.owner, now=now)
+    ledger.claim('a')
+    assert not ledger.is_settled('a', owner=ledger.owner, now=0)
+    assert ledger.is_settled('a', owner='elsewhere', now=0)
+    assert not ledger.is_settled('a', owner='elsewhere', now=now)
+    ledger.complete('a')
+    assert ledger.is_settled('a', owner=ledger.owner, now=0)
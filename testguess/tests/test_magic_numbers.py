@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+import glob
+import os
+import re
+import pytest
+from testguess.middleware import FLAG_BITS, FLAG_LAYOUTS, GuessConfiguration
+
+AUTOGUESSED = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))), 'autoguessed', 'tests')
+DOCSTRING_FLAG = re.compile(r'^\s*(\w+): (True|False)$', re.MULTILINE)
+
+
+def make_config(**values):
+    # the `supports_*` flags depend on what is installed, so the bits are
+    # set directly rather than via `__init__`.
+    config = GuessConfiguration.__new__(GuessConfiguration)
+    config.flags = 0
+    for name, value in values.items():
+        if value:
+            config.flags |= FLAG_BITS[name]
+    config._magic_number = None
+    return config
+
+
+def committed_tests():
+    pattern = os.path.join(AUTOGUESSED, '*', '*', 'test_*.py')
+    return sorted(glob.glob(pattern))
+
+
+def test_there_are_committed_tests():
+    assert len(committed_tests()) > 0
+
+
+@pytest.mark.parametrize('path', committed_tests())
+def test_committed_filenames_match_their_flags(path):
+    with open(path, 'r') as f:
+        source = f.read()
+    flags = dict((name, value == 'True')
+                 for name, value in DOCSTRING_FLAG.findall(source))
+    expected = os.path.splitext(os.path.basename(path))[0][len('test_'):]
+    assert make_config(**flags).magic_number() == expected
+
+
+def test_returns_render_to_response():
+    config = make_config(is_html5=True, is_authenticated=True,
+                         supports_custom_users=True, supports_html5lib=True,
+                         is_get=True)
+    assert config.magic_number() == '101000011100'
+
+
+def test_bits_follow_the_layouts():
+    flags = [name for layout in FLAG_LAYOUTS for name in layout]
+    assert list(FLAG_BITS) == flags
+    assert [FLAG_BITS[name] for name in flags] == [1 << position for position
+                                                   in range(len(flags))]
+
+
+@pytest.mark.parametrize('flag,size', [
+    ('is_json', 12),
+    ('is_streaming', 17),
+    ('is_xml', 17),
+    ('is_cacheable', 20),
+])
+def test_shortest_layout_is_used(flag, size):
+    magic_number = make_config(is_get=True, **{flag: True}).magic_number()
+    assert len(magic_number) == size
+    assert magic_number[9] == '1'
+    assert magic_number[list(FLAG_BITS).index(flag)] == '1'
+
+
+def test_later_flags_only_append():
+    before = make_config(is_json=True, is_get=True).magic_number()
+    after = make_config(is_json=True, is_get=True,
+                        has_etag=True).magic_number()
+    assert after.startswith(before)
+    assert after[len(before):] == '00000100'
+
+
+def test_flag_properties():
+    config = make_config(is_post=True, is_csv=True)
+    assert config.is_post
+    assert config.is_csv
+    assert not config.is_get
+    assert dict(config.items())['is_csv'] is True
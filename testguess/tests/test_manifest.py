@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+import json
+import os
+import pytest
+from django.test.utils import override_settings
+from testguess.manifest import MANIFEST_FILENAME, Manifest
+from testguess.middleware import GuessResponse
+from .utils import through
+
+LONG_AGO = 1000000000
+
+
+@pytest.fixture
+def manifest(tmpdir):
+    return Manifest(path=str(tmpdir.join('manifest.json')), flush_interval=0)
+
+
+def test_update_and_is_current(manifest):
+    assert not manifest.is_current('test_1.py', 'abc')
+    assert manifest.update('test_1.py', digest='abc', view_name='page')
+    assert manifest.is_current('test_1.py', 'abc')
+    assert not manifest.is_current('test_1.py', 'def')
+    with open(manifest.path) as f:
+        assert json.load(f)['test_1.py']['view'] == 'page'
+
+
+def test_seen(manifest):
+    assert not manifest.seen('test_1.py')
+    manifest.update('test_1.py', digest='abc', view_name='page')
+    manifest.entries['test_1.py']['last_seen'] = 0
+    assert manifest.seen('test_1.py')
+    with open(manifest.path) as f:
+        assert json.load(f)['test_1.py']['last_seen'] > 0
+
+
+def test_other_writers_are_merged(manifest):
+    other = Manifest(path=manifest.path)
+    manifest.update('test_1.py', digest='abc', view_name='page')
+    other.update('test_2.py', digest='def', view_name='json')
+    os.utime(other.path, (LONG_AGO, LONG_AGO))
+    assert manifest.is_current('test_2.py', 'def')
+    assert manifest.is_current('test_1.py', 'abc')
+
+
+def test_unreadable(manifest):
+    with open(manifest.path, 'w') as f:
+        f.write('{not json')
+    assert not manifest.load()
+    assert not manifest.is_current('test_1.py', 'abc')
+
+
+def generate(path):
+    with override_settings(TESTGUESS_TIMING=False):
+        through(GuessResponse(), path)
+
+
+def generated_file(root):
+    for directory, dirnames, filenames in os.walk(str(root)):
+        for filename in filenames:
+            if filename.startswith('test_'):
+                return os.path.join(directory, filename)
+
+
+def test_unchanged_modules_are_left_alone(guessing):
+    generate('/json/')
+    path = generated_file(guessing)
+    os.utime(path, (LONG_AGO, LONG_AGO))
+    generate('/json/')
+    assert os.path.getmtime(path) == LONG_AGO
+    assert guessing.join('autoguessed', MANIFEST_FILENAME).check(file=1)
+
+
+def test_changed_observations_are_written(guessing):
+    generate('/json/')
+    path = generated_file(guessing)
+    os.utime(path, (LONG_AGO, LONG_AGO))
+    manifest_path = str(guessing.join('autoguessed', MANIFEST_FILENAME))
+    with open(manifest_path) as f:
+        entries = json.load(f)
+    for entry in entries.values():
+        entry['hash'] = 'something else'
+    with open(manifest_path, 'w') as f:
+        json.dump(entries, f)
+    generate('/json/')
+    assert os.path.getmtime(path) != LONG_AGO
+
+
+def test_deleted_modules_are_written(guessing):
+    generate('/json/')
+    path = generated_file(guessing)
+    os.remove(path)
+    generate('/json/')
+    assert os.path.exists(path)
+
+
+def test_without_a_manifest(guessing):
+    with override_settings(TESTGUESS_MANIFEST=False):
+        generate('/json/')
+        path = generated_file(guessing)
+        os.utime(path, (LONG_AGO, LONG_AGO))
+        generate('/json/')
+    assert os.path.getmtime(path) != LONG_AGO
+    assert not guessing.join('autoguessed', MANIFEST_FILENAME).check()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+import tracemalloc
+from django.test.utils import override_settings
+from testguess.memory import (MINIMUM, MemoryPeaks, finish_sample,
+                              peak_allocated, round_up, start_sample)
+from testguess.middleware import GuessResponse
+from .utils import generated_modules, run_generated_test, through
+
+
+def test_round_up():
+    assert round_up(0) == MINIMUM
+    assert round_up(MINIMUM) == MINIMUM
+    assert MINIMUM < round_up(MINIMUM + 1) <= MINIMUM * 1.25 + 1
+
+
+def test_peak_allocated():
+    assert peak_allocated(lambda: bytearray(1 << 20)) >= 1 << 20
+
+
+def test_sample_rate():
+    assert start_sample(0) is None
+    measurement = start_sample(1)
+    assert measurement is not None
+    finish_sample(measurement)
+
+
+def test_one_sample_at_a_time():
+    measurement = start_sample(1)
+    try:
+        assert start_sample(1) is None
+        assert tracemalloc.is_tracing()
+    finally:
+        finish_sample(measurement)
+    assert not tracemalloc.is_tracing()
+    measurement = start_sample(1)
+    assert measurement is not None
+    finish_sample(measurement)
+
+
+def test_someone_elses_tracing_is_left_alone():
+    tracemalloc.start()
+    try:
+        measurement = start_sample(1)
+        data = bytearray(1 << 20)
+        assert finish_sample(measurement) >= len(data)
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def test_budget_is_the_largest_peak():
+    peaks = MemoryPeaks()
+    assert peaks.budget('key', factor=2) is None
+    peaks.add('key', 5000)
+    peaks.add('key', 2000)
+    budget = peaks.budget('key', factor=2)
+    assert budget.peak == round_up(5000)
+    assert budget.budget == round_up(round_up(5000) * 2)
+
+
+def test_sync_keeps_the_largest_peak(tmpdir):
+    path = str(tmpdir.join('memory.json'))
+    first = MemoryPeaks()
+    second = MemoryPeaks()
+    first.add('key', 5000)
+    second.add('key', 9000)
+    assert first.sync(path)
+    assert second.sync(path)
+    assert first.sync(path)
+    assert first.peaks == second.peaks == {'key': round_up(9000)}
+
+
+def test_generated_memory_budget_holds(guessing):
+    with override_settings(TESTGUESS_MEMORY_SAMPLE_RATE=1):
+        through(GuessResponse(), '/json/')
+    source, = generated_modules(guessing).values()
+    assert 'client_overhead(self.client)' in source
+    run_generated_test(source, 'test_response_memory_budget')
+
+
+def test_traced_requests_arent_timed(guessing):
+    with override_settings(TESTGUESS_MEMORY_SAMPLE_RATE=1,
+                           TESTGUESS_TIMING_MIN_SAMPLES=1):
+        through(GuessResponse(), '/json/')
+    source, = generated_modules(guessing).values()
+    # tracing slows the view down too much for its time to mean anything.
+    assert 'test_response_time_budget' not in source
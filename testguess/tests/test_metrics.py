@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+import logging
+import socket
+import pytest
+from django.test.utils import override_settings
+from testguess import metrics
+from testguess.middleware import GuessResponse
+from testguess.signals import metric_recorded
+from .utils import through
+
+
+class ListSink(object):
+
+    def __init__(self):
+        self.records = []
+
+    def record(self, name, kind, value):
+        self.records.append((name, kind, value))
+
+
+@pytest.fixture(autouse=True)
+def unconfigured():
+    yield
+    metrics.configure(None)
+    metrics._configured_from = None
+
+
+@pytest.fixture
+def udp():
+    listener = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.settimeout(0.2)
+    yield listener
+    listener.close()
+
+
+def test_off_by_default():
+    calls = []
+    timed = metrics.timed('noop')(lambda: calls.append(1))
+    metrics.increment('noop')
+    timed()
+    assert calls == [1]
+
+
+def test_increment_and_timed():
+    sink = metrics.configure(ListSink())
+    metrics.increment('counted', 3)
+    assert metrics.timed('timed')(lambda: 'value')() == 'value'
+    (counted, timed) = sink.records
+    assert counted == ('counted', metrics.COUNTER, 3)
+    assert timed[:2] == ('timed', metrics.TIMING)
+    assert timed[2] >= 0
+
+
+def test_timed_records_failures():
+    sink = metrics.configure(ListSink())
+
+    @metrics.timed('failing')
+    def failing():
+        raise ValueError
+
+    with pytest.raises(ValueError):
+        failing()
+    assert [name for name, kind, value in sink.records] == ['failing']
+
+
+def test_logging_sink(caplog):
+    with caplog.at_level(logging.INFO, logger='testguess.metrics'):
+        metrics.LoggingSink().record('generated', metrics.COUNTER, 1)
+    assert 'counter generated 1' in caplog.text
+
+
+def test_signal_sink():
+    received = []
+
+    def receiver(sender, **kwargs):
+        received.append(kwargs)
+
+    metric_recorded.connect(receiver)
+    try:
+        metrics.SignalSink().record('generated', metrics.COUNTER, 1)
+    finally:
+        metric_recorded.disconnect(receiver)
+    assert received == [{'signal': metric_recorded, 'name': 'generated',
+                         'kind': metrics.COUNTER, 'value': 1}]
+
+
+def test_statsd_sink(udp):
+    sink = metrics.StatsdSink(port=udp.getsockname()[1], prefix='tg')
+    sink.record('generated', metrics.COUNTER, 2)
+    assert udp.recv(512) == b'tg.generated:2|c'
+    sink.record('generate', metrics.TIMING, 0.25)
+    assert udp.recv(512) == b'tg.generate:250.000|ms'
+
+
+def test_statsd_sink_never_raises():
+    sink = metrics.StatsdSink(host='256.0.0.0')
+    sink.record('generated', metrics.COUNTER, 1)
+
+
+def test_configure_from_settings():
+    with override_settings(TESTGUESS_METRICS='logging'):
+        assert isinstance(metrics.configure_from_settings(), metrics.LoggingSink)
+    with override_settings(TESTGUESS_METRICS='signal'):
+        assert isinstance(metrics.configure_from_settings(), metrics.SignalSink)
+    with override_settings(TESTGUESS_METRICS='testguess.tests.test_metrics.ListSink'):
+        assert isinstance(metrics.configure_from_settings(), ListSink)
+    assert metrics.configure_from_settings() is None
+
+
+def test_sink_is_built_once(udp):
+    with override_settings(TESTGUESS_METRICS='statsd',
+                           TESTGUESS_STATSD_PORT=udp.getsockname()[1]):
+        sink = metrics.configure_from_settings()
+        GuessResponse()
+        GuessResponse()
+        assert metrics._sink is sink
+    with override_settings(TESTGUESS_METRICS='statsd',
+                           TESTGUESS_STATSD_PORT=udp.getsockname()[1] + 1):
+        assert metrics.configure_from_settings() is not sink
+
+
+def test_middleware_reports_to_statsd(guessing, udp):
+    with override_settings(TESTGUESS_METRICS='statsd',
+                           TESTGUESS_STATSD_PORT=udp.getsockname()[1]):
+        through(GuessResponse(), '/')
+    lines = set()
+    while True:
+        try:
+            lines.add(udp.recv(512).split(b':')[0])
+        except socket.timeout:
+            break
+    assert b'testguess.generated' in lines
+    assert b'testguess.GuessResponse.process_response' in lines
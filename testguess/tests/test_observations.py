@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+import io
+import re
+import pytest
+from django.core.management import CommandError, call_command
+from django.test.utils import override_settings
+from testguess.middleware import GuessResponse
+from testguess.observations import (ObservationLog, observation_timings,
+                                    unique_observations)
+from .utils import generated_modules, through
+
+GENERATED_RE = re.compile(r'Generated: .*')
+PATHS = ('/', '/json/', '/template/', '/redirect/')
+
+
+@pytest.fixture
+def log(tmpdir_factory):
+    return str(tmpdir_factory.mktemp('log').join('observations.jsonl'))
+
+
+def record(log, *paths):
+    with override_settings(TESTGUESS_MODE='record',
+                           TESTGUESS_OBSERVATION_LOG=log):
+        middleware = GuessResponse()
+        for path in paths:
+            through(middleware, path)
+
+
+def observation(path, timing=None, memory=None, status_code=200):
+    return {
+        'config': {'is_get': True},
+        'request': {'method': 'GET', 'path': path},
+        'response': {'status_code': status_code, 'timing': timing,
+                     'memory': memory},
+    }
+
+
+def undated(modules):
+    return dict((path, GENERATED_RE.sub('', source))
+                for path, source in modules.items())
+
+
+def test_log(log):
+    observations = ObservationLog(path=log)
+    observations.append({'a': 1})
+    with open(log, 'a') as f:
+        f.write('{not json\n\n')
+    observations.append({'b': 2})
+    assert list(observations) == [{'a': 1}, {'b': 2}]
+
+
+def test_unique_observations():
+    first = [observation('/', timing=(0.2, None), memory=10),
+             observation('/json/')]
+    second = [observation('/', timing=(0.1, None), memory=5),
+              observation('/', status_code=404)]
+    unique = unique_observations([first, second])
+    assert len(unique) == 3
+    page = unique[0]
+    # the last one seen is kept, with every sample of them all.
+    assert page is second[0]
+    assert page['response']['memory'] == 10
+    assert [t.wall for t in observation_timings(page)] == [0.2, 0.1]
+    assert observation_timings(unique[1]) == ()
+
+
+def test_recording_generates_nothing(guessing, log):
+    record(log, *PATHS)
+    assert generated_modules(guessing) == {}
+    assert len(list(ObservationLog(path=log))) == len(PATHS)
+
+
+def test_replay_generates_what_inline_would(guessing, log, tmpdir_factory):
+    with override_settings(TESTGUESS_TIMING=False):
+        middleware = GuessResponse()
+        for path in PATHS:
+            through(middleware, path)
+        inline = generated_modules(guessing)
+        assert len(inline) == len(PATHS)
+        replayed = tmpdir_factory.mktemp('replayed')
+        with override_settings(TESTGUESS_ROOT=str(replayed)):
+            record(log, *PATHS)
+            for data in unique_observations([ObservationLog(path=log)]):
+                assert GuessResponse().replay(data) == 1
+            assert undated(generated_modules(replayed)) == undated(inline)
+
+
+def test_replay_command(guessing, log):
+    record(log, *PATHS)
+    record(log, *PATHS)
+    out = io.StringIO()
+    call_command('testguess_replay', log, processes=1, stdout=out)
+    assert out.getvalue().strip() == ("Replayed 4 unique observations, "
+                                      "generated 4 test modules")
+    assert len(generated_modules(guessing)) == len(PATHS)
+
+
+def test_replay_command_missing_log(guessing, log):
+    with pytest.raises(CommandError):
+        call_command('testguess_replay', log, processes=1)
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+import os
+import pytest
+from django.test.utils import override_settings
+from testguess.middleware import GuessResponse
+from testguess.pytest_plugin import (parse_shard, pytest_collection_modifyitems,
+                                     shard_for)
+from .utils import generated_modules, through
+
+ROOT = os.path.join(os.sep, 'project')
+VIEWS = ('app/views/page', 'app/views/json', 'app/views/template', 'other',
+         'other/nested', 'third')
+
+
+class Item(object):
+
+    def __init__(self, *parts):
+        self.fspath = os.path.join(ROOT, *parts)
+
+
+class Hook(object):
+
+    def __init__(self):
+        self.deselected = []
+
+    def pytest_deselected(self, items):
+        self.deselected.extend(items)
+
+
+class Config(object):
+
+    def __init__(self, shard):
+        self.shard = shard
+        self.rootdir = ROOT
+        self.hook = Hook()
+
+    def getoption(self, name):
+        assert name == 'testguess_shard'
+        return self.shard
+
+
+def collect(shard, items):
+    items = list(items)
+    config = Config(shard)
+    pytest_collection_modifyitems(session=None, config=config, items=items)
+    return items, config.hook.deselected
+
+
+def generated_items():
+    for view in VIEWS:
+        directory = ('autoguessed', 'tests') + tuple(view.split('/'))
+        for number in ('1', '2'):
+            path = directory + ('test_%s.py' % number,)
+            yield Item(*path)
+            yield Item(*path)
+
+
+def test_parse_shard():
+    assert parse_shard('0/1') == (0, 1)
+    assert parse_shard('3/4') == (3, 4)
+    for value in ('1', 'a/b', '4/4', '-1/4', '0/0'):
+        with pytest.raises(ValueError):
+            parse_shard(value)
+
+
+def test_shard_for():
+    assert shard_for('autoguessed/tests/app', 1) == 0
+    assert shard_for('autoguessed/tests/app', 4) == shard_for(
+        os.path.join('autoguessed', 'tests', 'app'), 4)
+    assert 0 <= shard_for('autoguessed/tests/app', 4) < 4
+
+
+def test_without_a_shard_everything_runs():
+    items = list(generated_items())
+    kept, deselected = collect(None, items)
+    assert kept == items
+    assert deselected == []
+
+
+def test_shards_split_the_suite_by_view():
+    items = list(generated_items()) + [Item('tests', 'test_own.py')]
+    shards = [collect('%d/3' % index, items) for index in range(3)]
+    kept = [item for shard, deselected in shards for item in shard]
+    # every test runs exactly once.
+    assert sorted(id(item) for item in kept) == sorted(id(item) for item in items)
+    for shard, deselected in shards:
+        assert len(shard) + len(deselected) == len(items)
+        directories = set(os.path.dirname(item.fspath) for item in shard)
+        for item in items:
+            if os.path.dirname(item.fspath) in directories:
+                assert item in shard
+    assert all(shard for shard, deselected in shards)
+    # anything which wasn't generated runs in the first shard.
+    assert items[-1] in shards[0][0]
+
+
+def test_generated_tests_share_one_response(guessing):
+    with override_settings(TESTGUESS_TIMING=False):
+        through(GuessResponse(), '/json/')
+    source, = generated_modules(guessing).values()
+    namespace = {'__file__': '<generated>'}
+    exec(compile(source, '<generated>', 'exec'), namespace)
+    case_class = namespace['GuessedTestCase']
+    from django.test import Client
+    first = case_class('test_response_status_code')
+    first.client = Client()
+    first.test_response_status_code()
+    second = case_class('test_response_headers')
+    # a second request would fail.
+    second.client = None
+    second.test_response_headers()
+    second.test_response_is_json()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+import pytest
+from django.db import connection
+from django.test.utils import override_settings
+from testguess.middleware import GuessResponse
+from testguess.queries import QueryRecorder, QueryStats, sql_template
+from .urls import queries
+from .utils import generated_modules, make_request, run_generated_test, through
+
+
+@pytest.fixture
+def database():
+    """
+    An in-memory database in place of the one in the test settings, which
+    only raw SQL is run against.
+    """
+    name = connection.settings_dict['NAME']
+    connection.close()
+    connection.settings_dict['NAME'] = ':memory:'
+    yield connection
+    connection.close()
+    connection.settings_dict['NAME'] = name
+
+
+@pytest.mark.parametrize('sql,expected', [
+    ("SELECT * FROM t WHERE id = 1", "SELECT * FROM t WHERE id = ?"),
+    ("SELECT * FROM t WHERE name = 'it''s'", "SELECT * FROM t WHERE name = ?"),
+    ("SELECT * FROM t WHERE id IN (%s, %s, %s)", "SELECT * FROM t WHERE id IN (...)"),
+    ("SELECT  *\n FROM t2", "SELECT * FROM t2"),
+])
+def test_sql_template(sql, expected):
+    assert sql_template(sql) == expected
+
+
+def test_recorder(guessing, database):
+    recorder = QueryRecorder().start()
+    queries(make_request('/queries/'))
+    stats = recorder.finish(repeat_threshold=5)
+    assert stats == QueryStats(count=7, duplicates=5, repeated=6,
+                               repeated_sql='SELECT %s')
+    # nothing is counted once finished.
+    queries(make_request('/queries/'))
+    assert recorder.stats().count == 7
+    assert recorder not in database.execute_wrappers
+
+
+def test_below_the_repeat_threshold(guessing, database):
+    recorder = QueryRecorder().start()
+    queries(make_request('/queries/'))
+    stats = recorder.finish(repeat_threshold=7)
+    assert stats.repeated == 6
+    assert stats.repeated_sql is None
+
+
+def test_abandoned_recorders_are_removed(database):
+    abandoned = QueryRecorder().start()
+    recorder = QueryRecorder().start()
+    assert abandoned not in database.execute_wrappers
+    recorder.finish()
+    assert not database.execute_wrappers
+
+
+def test_generated_query_count(guessing, database):
+    with override_settings(TESTGUESS_QUERIES=True, TESTGUESS_TIMING=False):
+        through(GuessResponse(), '/queries/')
+    source, = generated_modules(guessing).values()
+    assert 'self.assertNumQueries(7)' in source
+    assert '# SELECT %s' in source
+    run_generated_test(source, 'test_response_num_queries')
+
+
+def test_queries_arent_counted_by_default(guessing, database):
+    with override_settings(TESTGUESS_TIMING=False):
+        through(GuessResponse(), '/queries/')
+    source, = generated_modules(guessing).values()
+    assert 'assertNumQueries' not in source
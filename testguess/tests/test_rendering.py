@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+import ast
+import pytest
+from django.template import engines
+from django.template.loader import get_template
+from django.utils.safestring import SafeData
+from testguess.middleware import GuessResponse
+from testguess.rendering import FAST_TEMPLATE_NAMES, renderer
+from .utils import generated_modules, through
+
+CONTEXT = {
+    'request': {
+        'path': '/a/"quoted"/<b>/',
+        'method': 'GET',
+        'resolved': {'view_name': 'app:view', 'args': ['x'],
+                     'kwargs': {'y': "it's"}},
+    },
+    'response': {'status_code': 200},
+}
+
+
+@pytest.mark.parametrize('template_name', FAST_TEMPLATE_NAMES)
+def test_fast_path_matches_the_template_engine(guessing, template_name):
+    rendered = renderer.render(template_name, context=CONTEXT)
+    assert renderer.fast_paths[template_name] is not None
+    assert isinstance(rendered, SafeData)
+    assert rendered == get_template(template_name).render(CONTEXT)
+
+
+def test_fast_path_output_isnt_escaped_again(guessing):
+    # the way `generated_class.py` puts every fragment together.
+    fragment = renderer.render('testguess/reverse_url.py', context=CONTEXT)
+    outer = engines['django'].from_string('{{ fragment }}')
+    assert outer.render({'fragment': fragment}) == fragment
+
+
+@pytest.mark.parametrize('path', ['/', '/json/', '/template/', '/etag/',
+                                  '/cached/', '/redirect/'])
+def test_generated_modules_parse(guessing, path):
+    through(GuessResponse(), path)
+    modules = generated_modules(guessing)
+    assert len(modules) == 1
+    for source in modules.values():
+        ast.parse(source)
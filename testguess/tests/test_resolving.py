@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+import pytest
+from django.http import HttpResponse
+from django.test.utils import override_settings
+from testguess.resolving import ResolveCache
+from .urls import url
+try:
+    from django.urls import Resolver404, clear_url_caches
+except ImportError:  # Django < 1.10
+    from django.core.urlresolvers import Resolver404, clear_url_caches
+
+urlpatterns = [
+    url(r'^$', lambda request: HttpResponse(), name='elsewhere'),
+]
+
+
+class Namer(object):
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, match, default=None):
+        self.calls += 1
+        return default
+
+
+@pytest.fixture
+def cache():
+    return ResolveCache(maxsize=2)
+
+
+def test_resolved(guessing, cache):
+    resolved = cache.get('/json/', Namer())
+    assert resolved.url_name == 'json'
+    assert resolved.best_name == 'json'
+    assert resolved.args == ()
+    assert resolved.kwargs == {}
+
+
+def test_resolved_once(guessing, cache):
+    namer = Namer()
+    first = cache.get('/json/', namer)
+    assert cache.get('/json/', namer) is first
+    assert namer.calls == 1
+
+
+def test_urlconf_changes(guessing, cache):
+    namer = Namer()
+    assert cache.get('/', namer).url_name == 'page'
+    with override_settings(ROOT_URLCONF='testguess.tests.test_resolving'):
+        assert cache.get('/', namer).url_name == 'elsewhere'
+    assert cache.get('/', namer).url_name == 'page'
+    assert namer.calls == 3
+
+
+def test_url_caches_cleared(guessing, cache):
+    namer = Namer()
+    cache.get('/', namer)
+    clear_url_caches()
+    cache.get('/', namer)
+    assert namer.calls == 2
+
+
+def test_least_recently_used_are_dropped(guessing, cache):
+    namer = Namer()
+    cache.get('/', namer)
+    cache.get('/json/', namer)
+    cache.get('/', namer)
+    cache.get('/template/', namer)
+    assert namer.calls == 3
+    assert [path for urlconf, path in cache.entries] == ['/', '/template/']
+    cache.clear()
+    assert not cache.entries
+
+
+def test_unresolvable(guessing, cache):
+    with pytest.raises(Resolver404):
+        cache.get('/missing/', Namer())
+    assert not cache.entries
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from django.test.utils import override_settings
+from testguess.middleware import GuessResponse
+from testguess.observations import ObservationLog, unique_observations
+from testguess.timing import TIMINGS_FILENAME
+from .utils import generated_modules, run_generated_test, through
+
+
+def test_fresh_project(guessing):
+    assert not guessing.join('autoguessed').check()
+    through(GuessResponse(), '/')
+    assert len(generated_modules(guessing)) == 1
+    assert guessing.join('autoguessed', TIMINGS_FILENAME).check()
+
+
+def test_replay_onto_fresh_project(guessing, tmpdir_factory):
+    log = str(tmpdir_factory.mktemp('log').join('observations.jsonl'))
+    with override_settings(TESTGUESS_MODE='record',
+                           TESTGUESS_OBSERVATION_LOG=log):
+        through(GuessResponse(), '/')
+    assert generated_modules(guessing) == {}
+    observations = unique_observations([ObservationLog(path=log)])
+    assert GuessResponse().replay(observations[0]) == 1
+    assert len(generated_modules(guessing)) == 1
+
+
+def test_generated_time_budget_holds(guessing):
+    with override_settings(TESTGUESS_TIMING_MIN_SAMPLES=1):
+        through(GuessResponse(), '/redirect/')
+    source, = generated_modules(guessing).values()
+    assert 'client_overhead(self.client' in source
+    run_generated_test(source, 'test_response_time_budget')
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+import pytest
+from django.test.utils import override_settings
+from testguess import sampling
+from testguess.middleware import GuessResponse
+from testguess.sampling import (AllOfSampler, PerViewQuotaSampler,
+                                ProbabilitySampler, SampleKey,
+                                TokenBucketSampler, UntilFirstSuccessSampler,
+                                get_sampler, make_sample_key)
+from .utils import generated_modules, make_request, through
+
+PAGE = SampleKey(view='page', path='/')
+JSON = SampleKey(view='json', path='/json/')
+UNRESOLVED = SampleKey(view=None, path='/missing/')
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sampling, 'time', clock)
+    return clock
+
+
+def test_make_sample_key(guessing):
+    assert make_sample_key(make_request('/json/')) == JSON
+
+
+def test_probability_sampler(monkeypatch):
+    monkeypatch.setattr(sampling, 'random', lambda: 0.5)
+    assert ProbabilitySampler(rate=0.6).allow(PAGE)
+    assert not ProbabilitySampler(rate=0.5).allow(PAGE)
+    assert not ProbabilitySampler(rate=0).allow(PAGE)
+    with pytest.raises(AssertionError):
+        ProbabilitySampler(rate=2)
+
+
+def test_per_view_quota_sampler(clock):
+    sampler = PerViewQuotaSampler(limit=2, period=60)
+    assert sampler.allow(PAGE)
+    assert sampler.allow(PAGE)
+    assert not sampler.allow(PAGE)
+    # each view has a quota of its own.
+    assert sampler.allow(JSON)
+    assert not sampler.allow(UNRESOLVED)
+    clock.now += 60
+    assert sampler.allow(PAGE)
+
+
+def test_token_bucket_sampler(clock):
+    sampler = TokenBucketSampler([(r'^/json/', 1, 2), (r'^/', 0, 1)])
+    assert sampler.allow(JSON)
+    assert sampler.allow(JSON)
+    assert not sampler.allow(JSON)
+    clock.now += 1
+    assert sampler.allow(JSON)
+    assert not sampler.allow(JSON)
+    # the first pattern which matches is used, and this one never refills.
+    assert sampler.allow(PAGE)
+    clock.now += 100
+    assert not sampler.allow(PAGE)
+    assert not TokenBucketSampler([(r'^/json/', 1, 1)]).allow(PAGE)
+
+
+def test_until_first_success_sampler():
+    sampler = UntilFirstSuccessSampler()
+    assert sampler.allow(PAGE)
+    sampler.record(PAGE, generated=False)
+    assert sampler.allow(PAGE)
+    sampler.record(PAGE, generated=True)
+    assert not sampler.allow(PAGE)
+    assert sampler.allow(JSON)
+    assert not sampler.allow(UNRESOLVED)
+
+
+def test_all_of_sampler(clock):
+    quota = PerViewQuotaSampler(limit=2)
+    once = UntilFirstSuccessSampler()
+    sampler = AllOfSampler(once, quota)
+    assert sampler.allow(PAGE)
+    sampler.record(PAGE, generated=True)
+    assert not sampler.allow(PAGE)
+    # declined by the first, so the second request's quota is still there.
+    assert quota.allow(PAGE)
+    assert not quota.allow(PAGE)
+
+
+def test_get_sampler():
+    assert get_sampler() is None
+    with override_settings(TESTGUESS_SAMPLE_RATE=0.25):
+        assert get_sampler().rate == 0.25
+    with override_settings(
+            TESTGUESS_SAMPLER='testguess.sampling.UntilFirstSuccessSampler'):
+        assert isinstance(get_sampler(), UntilFirstSuccessSampler)
+    with override_settings(TESTGUESS_SAMPLER=lambda: PerViewQuotaSampler(3)):
+        assert get_sampler().limit == 3
+
+
+def test_declined_requests_generate_nothing(guessing):
+    middleware = GuessResponse(sampler=PerViewQuotaSampler(limit=0))
+    through(middleware, '/')
+    assert generated_modules(guessing) == {}
+
+
+def test_sampler_hears_what_was_generated(guessing):
+    with override_settings(TESTGUESS_TIMING=False):
+        middleware = GuessResponse(sampler=UntilFirstSuccessSampler())
+    through(middleware, '/')
+    assert middleware.sampler.succeeded == set(['page'])
+    assert len(generated_modules(guessing)) == 1
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+import pytest
+from django.test.utils import override_settings
+from testguess.middleware import GuessResponse
+from testguess.workers import GenerationQueue
+from .utils import generated_modules, run_generated_test, through
+
+
+@pytest.fixture
+def streaming(guessing):
+    queue = GenerationQueue()
+    queue.start()
+    with override_settings(TESTGUESS_STREAMING=True, TESTGUESS_TIMING=False):
+        yield GuessResponse(queue=queue)
+    queue.shutdown(timeout=5)
+
+
+def test_stream_is_observed_once_sent(guessing, streaming):
+    response = through(streaming, '/stream/')
+    streaming.queue.flush()
+    # nothing is known until the server has been through the body.
+    assert generated_modules(guessing) == {}
+    assert b''.join(response.streaming_content) == b'a,b\n1,2\n'
+    streaming.queue.flush()
+    source, = generated_modules(guessing).values()
+    assert 'is_csv: True' in source
+    assert 'is_streaming: True' in source
+    run_generated_test(source, 'test_response_is_streamed')
+
+
+def test_unconsumed_stream_is_never_observed(guessing, streaming):
+    through(streaming, '/stream/')
+    streaming.queue.flush()
+    assert generated_modules(guessing) == {}
+
+
+def test_streams_are_ignored_by_default(guessing):
+    with override_settings(TESTGUESS_TIMING=False):
+        response = through(GuessResponse(), '/stream/')
+    assert b''.join(response.streaming_content) == b'a,b\n1,2\n'
+    assert generated_modules(guessing) == {}
+
+
+def test_files_are_left_to_the_server(guessing, streaming):
+    response = through(streaming, '/download/')
+    # still a file the server can hand to sendfile.
+    assert response.file_to_stream is not None
+    streaming.queue.flush()
+    source, = generated_modules(guessing).values()
+    assert 'is_streaming: True' in source
+    response.close()
+    run_generated_test(source, 'test_response_is_streamed')
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+import pytest
+from testguess.timing import (GAMMA, MINIMUM, LatencySketch, LatencySketches,
+                              Timing, bucket_index, bucket_value, round_up)
+
+
+def test_small_values_share_the_first_bucket():
+    assert bucket_index(0) == 0
+    assert bucket_index(MINIMUM) == 0
+    assert bucket_value(0) == MINIMUM
+
+
+@pytest.mark.parametrize('value', [0.00011, 0.001, 0.0123, 0.5, 1, 3.7, 120])
+def test_round_up(value):
+    rounded = round_up(value)
+    assert value <= rounded * 1.001
+    assert rounded < value * GAMMA * 1.001
+    # a bucket's own value stays in it.
+    assert round_up(rounded) == rounded
+
+
+def test_buckets_grow():
+    values = [bucket_value(index) for index in range(50)]
+    assert values == sorted(set(values))
+
+
+def test_sketch_quantiles():
+    sketch = LatencySketch()
+    assert sketch.quantile(0.5) is None
+    for value in (0.001, 0.002, 0.003, 0.004, 1):
+        sketch.add(value)
+    assert sketch.total == 5
+    assert sketch.quantile(0) == round_up(0.001)
+    assert sketch.quantile(0.5) == round_up(0.003)
+    assert sketch.quantile(1) == round_up(1)
+
+
+def test_sketch_from_counts():
+    sketch = LatencySketch({'3': 2, 5: 1})
+    assert sketch.counts == {3: 2, 5: 1}
+    assert sketch.total == 3
+
+
+def test_budget():
+    sketches = LatencySketches()
+    sketches.add('key', Timing(wall=0.01, cpu=0.005))
+    assert sketches.budget('key', factor=2, runs=3, min_samples=2) is None
+    sketches.add('key', Timing(wall=0.01, cpu=None))
+    budget = sketches.budget('key', factor=2, runs=3, min_samples=2)
+    assert budget.median == round_up(0.01)
+    assert budget.wall == round_up(round_up(0.01) * 2)
+    assert budget.cpu_median == round_up(0.005)
+    assert budget.runs == 3
+
+
+def test_sync_merges_processes(tmpdir):
+    path = str(tmpdir.join('timings.json'))
+    first = LatencySketches()
+    second = LatencySketches()
+    first.add('key', Timing(wall=0.01, cpu=None))
+    second.add('key', Timing(wall=0.02, cpu=None))
+    second.add('other', Timing(wall=0.02, cpu=0.01))
+    assert first.sync(path)
+    assert second.sync(path)
+    assert first.sync(path)
+    assert first.wall['key'].total == second.wall['key'].total == 2
+    assert first.cpu['other'].total == 1
+    assert first.unsaved == second.unsaved == []
+    # nothing new, so syncing again changes nothing.
+    assert second.sync(path)
+    assert second.wall['key'].total == 2
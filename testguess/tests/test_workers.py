@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from threading import Event
+import pytest
+from testguess.middleware import GuessResponse
+from testguess.workers import BLOCK, DROP_OLDEST, GenerationQueue
+from .utils import generated_modules, through
+
+
+@pytest.fixture
+def queue():
+    queue = GenerationQueue(maxsize=2)
+    yield queue
+    queue.shutdown(timeout=5)
+
+
+def blocked(queue):
+    """
+    Starts `queue` with its one worker stuck on a task until the returned
+    event is set, so that whatever is submitted next stays queued.
+    """
+    started, release = Event(), Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    queue.start()
+    queue.submit(block)
+    assert started.wait(5)
+    return release
+
+
+def test_runs_and_flushes():
+    ran = []
+    queue = GenerationQueue(maxsize=2, policy=BLOCK)
+    queue.start()
+    try:
+        for number in range(5):
+            assert queue.submit(lambda number=number: ran.append(number))
+        queue.flush()
+    finally:
+        queue.shutdown(timeout=5)
+    assert ran == [0, 1, 2, 3, 4]
+
+
+def test_start_only_once(queue):
+    assert queue.start()
+    assert not queue.start()
+    assert queue.shutdown(timeout=5) == 1
+    assert queue.shutdown() == 0
+
+
+def test_drop_newest(queue):
+    ran = []
+    release = blocked(queue)
+    assert queue.submit(lambda: ran.append(1))
+    assert queue.submit(lambda: ran.append(2))
+    assert not queue.submit(lambda: ran.append(3))
+    assert queue.dropped == 1
+    release.set()
+    queue.flush()
+    assert ran == [1, 2]
+
+
+def test_drop_oldest():
+    ran = []
+    queue = GenerationQueue(maxsize=2, policy=DROP_OLDEST)
+    try:
+        release = blocked(queue)
+        for number in (1, 2, 3):
+            assert queue.submit(lambda number=number: ran.append(number))
+        assert queue.dropped == 1
+        release.set()
+        queue.flush()
+    finally:
+        queue.shutdown(timeout=5)
+    assert ran == [2, 3]
+
+
+def test_failing_tasks_dont_stop_the_worker(queue):
+    ran = []
+    queue.start()
+    queue.submit(lambda: 1 / 0)
+    queue.submit(lambda: ran.append(1))
+    queue.flush()
+    assert ran == [1]
+
+
+def test_invalid_policy():
+    with pytest.raises(AssertionError):
+        GenerationQueue(policy='drop-everything')
+
+
+def test_middleware_generates_on_the_queue(guessing, queue):
+    release = blocked(queue)
+    through(GuessResponse(queue=queue), '/')
+    # nothing has been written while the request was being served.
+    assert generated_modules(guessing) == {}
+    release.set()
+    queue.flush()
+    assert len(generated_modules(guessing)) == 1
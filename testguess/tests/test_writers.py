@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from threading import Thread
+import os
+from testguess.writers import (_break_claim, claim_path, release_path,
+                               update_json)
+
+
+def test_first_claim_wins(tmpdir):
+    path = str(tmpdir.join('file'))
+    lock = claim_path(path)
+    assert lock is not None
+    assert claim_path(path) is None
+    release_path(lock)
+    assert claim_path(path) is not None
+
+
+def test_one_of_many_breaks_a_stale_claim(tmpdir):
+    path = str(tmpdir.join('file'))
+    os.utime(claim_path(path), (0, 0))
+    claims = []
+    threads = [Thread(target=lambda: claims.append(claim_path(path)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len([lock for lock in claims if lock is not None]) == 1
+    assert os.listdir(str(tmpdir)) == ['file.lock']
+
+
+def test_fresh_claim_is_put_back(tmpdir):
+    path = str(tmpdir.join('file'))
+    lock = claim_path(path)
+    os.utime(lock, (0, 0))
+    stale = os.stat(lock)
+    # someone else broke the stale claim and made their own meanwhile.
+    release_path(lock)
+    assert claim_path(path) == lock
+    assert not _break_claim(lock, stale)
+    assert os.listdir(str(tmpdir)) == ['file.lock']
+
+
+def test_update_json(tmpdir):
+    path = str(tmpdir.join('data.json'))
+
+    def update(data):
+        data['runs'] = data.get('runs', 0) + 1
+
+    assert update_json(path, update) == {'runs': 1}
+    assert update_json(path, update) == {'runs': 2}
+    tmpdir.join('data.json').write('{"ru')
+    assert update_json(path, update) == {'runs': 1}
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+import io
+from django.http import (FileResponse, HttpResponse, JsonResponse,
+                         StreamingHttpResponse)
+from django.db import connection
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+try:
+    from django.urls import re_path as url
+except ImportError:  # Django < 2.0
+    from django.conf.urls import url
+
+
+def page(request):
+    return HttpResponse('<!doctype html><html><body><p>Hi</p>'
+                        '<a href="/json/">JSON</a><a href="/template/">'
+                        'Template</a></body></html>')
+
+
+def json(request):
+    return JsonResponse({'greeting': 'hi', 'numbers': [1, 2]})
+
+
+def template(request):
+    return TemplateResponse(request, 'page.html', context={
+        'greeting': 'hi',
+        'nested': {'deeper': {'deepest': 1}},
+    })
+
+
+def stream(request):
+    return StreamingHttpResponse(iter([b'a,b\n', b'1,2\n']),
+                                 content_type='text/csv')
+
+
+def download(request):
+    return FileResponse(io.BytesIO(b'a,b\n1,2\n'), content_type='text/csv')
+
+
+def etag(request):
+    response = HttpResponse('<!doctype html><p>Tagged</p>')
+    response['ETag'] = '"v1"'
+    return response
+
+
+def cached(request):
+    response = HttpResponse('<!doctype html><p>Cached</p>')
+    response['Cache-Control'] = 'max-age=600, public'
+    response['Vary'] = 'Cookie'
+    return response
+
+
+def queries(request):
+    # one query per object, as a loop over a QuerySet touching a relation
+    # would, and one more.
+    with connection.cursor() as cursor:
+        for number in range(6):
+            cursor.execute('SELECT %s', [number])
+        cursor.execute('SELECT 1 + 1')
+    return HttpResponse('<!doctype html><p>Queried</p>')
+
+
+def failure(request):
+    return HttpResponse('Nope', status=500)
+
+
+urlpatterns = [
+    url(r'^$', page, name='page'),
+    url(r'^json/$', json, name='json'),
+    url(r'^template/$', template, name='template'),
+    url(r'^stream/$', stream, name='stream'),
+    url(r'^download/$', download, name='download'),
+    url(r'^etag/$', etag, name='etag'),
+    url(r'^cached/$', cached, name='cached'),
+    url(r'^redirect/$', lambda request: redirect('/'), name='redirect'),
+    url(r'^queries/$', queries, name='queries'),
+    url(r'^failure/$', failure, name='failure'),
+]
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+import os
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory
+try:
+    from django.urls import resolve
+except ImportError:  # Django < 1.10
+    from django.core.urlresolvers import resolve
+
+
+def make_request(path, method='get', **extra):
+    request = getattr(RequestFactory(), method)(path, **extra)
+    request.user = AnonymousUser()
+    request.resolver_match = resolve(path)
+    return request
+
+
+def call_view(request):
+    match = request.resolver_match
+    response = match.func(request, *match.args, **match.kwargs)
+    if hasattr(response, 'render') and not response.is_rendered:
+        response.render()
+    return response
+
+
+def through(middleware, path, method='get', **extra):
+    """
+    `path` through `middleware` the way the handler would take it; not via
+    the test client, whose requests the middleware deliberately ignores.
+    """
+    request = make_request(path, method=method, **extra)
+    match = request.resolver_match
+    response = middleware.process_view(request, match.func, match.args,
+                                       match.kwargs)
+    if response is None:
+        response = call_view(request)
+    return middleware.process_response(request, response)
+
+
+def generated_modules(root):
+    """
+    Every generated test module under `root`, by path relative to it.
+    """
+    modules = {}
+    for directory, dirnames, filenames in os.walk(str(root)):
+        for filename in filenames:
+            if filename.startswith('test_') and filename.endswith('.py'):
+                path = os.path.join(directory, filename)
+                with open(path, 'r') as f:
+                    modules[os.path.relpath(path, str(root))] = f.read()
+    return modules
+
+
+def run_generated_test(source, name, path='<generated>'):
+    """
+    Runs one method of a generated module's test case against the test
+    client, without the test database a whole `TestCase` would want.
+    """
+    from django.test import Client
+    namespace = {'__file__': path}
+    exec(compile(source, path, 'exec'), namespace)
+    case = namespace['GuessedTestCase'](name)
+    case.client = Client()
+    return getattr(case, name)()
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from collections import namedtuple
+from threading import Lock
+import math
+import time
+from .metrics import now
+from .writers import update_json
+
+# per-thread CPU time where Python has it (3.7+), else nothing.
+cpu_now = getattr(time, 'thread_time', None)
+
+Timing = namedtuple('Timing', 'wall cpu')
+Budget = namedtuple('Budget', 'wall median cpu_median runs')
+
+TIMINGS_FILENAME = '.testguess-timings.json'
+
+# durations are kept as counts in buckets growing by GAMMA from MINIMUM
+# upwards, so a sketch is small, and the numbers which come out of it
+# only move when the distribution really has.
+MINIMUM = 0.0001
+GAMMA = 1.25
+_LOG_GAMMA = math.log(GAMMA)
+
+# budgets are observed from `process_view` to `process_response`, but a
+# generated test can only time a whole request through the test client; a
+# request for this, which resolves to no view, costs everything else.
+BASELINE_PATH = '/__testguess__/baseline/'
+# below this, a budget is at the mercy of the scheduler.
+MINIMUM_BUDGET = 0.001
+
+
+def bucket_index(value):
+    if value <= MINIMUM:
+        return 0
+    # `bucket_value` rounds to 4 significant figures, which can put it a
+    # little past its own boundary; the slack keeps it in its bucket.
+    return int(math.ceil(math.log(value / MINIMUM) / _LOG_GAMMA - 0.01))
+
+
+def bucket_value(index):
+    return float('%.4g' % (MINIMUM * GAMMA ** index))
+
+
+def round_up(value):
+    return bucket_value(bucket_index(value))
+
+
+def median_duration(func, runs):
+    """
+    For use by generated tests: the median wall time of calling `func`.
+    """
+    durations = []
+    for run in range(runs):
+        started = now()
+        func()
+        durations.append(now() - started)
+    durations.sort()
+    middle = len(durations) // 2
+    if len(durations) % 2:
+        return durations[middle]
+    return (durations[middle - 1] + durations[middle]) / 2.0
+
+
+def client_overhead(client, runs):
+    """
+    For use by generated tests: the median wall time of a request through
+    `client` which never reaches a view.
+    """
+    return median_duration(lambda: client.get(BASELINE_PATH), runs)
+
+
+class LatencySketch(object):
+    __slots__ = (
+        'counts',
+        'total',
+    )
+
+    def __init__(self, counts=None):
+        self.counts = {}
+        self.total = 0
+        for index, count in (counts or {}).items():
+            self.add_index(int(index), count)
+
+    def add(self, value):
+        return self.add_index(bucket_index(value))
+
+    def add_index(self, index, count=1):
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total += count
+
+    def quantile(self, q):
+        if not self.total:
+            return None
+        rank = q * (self.total - 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen > rank:
+                return bucket_value(index)
+        return bucket_value(max(self.counts))
+
+
+class LatencySketches(object):
+    """
+    A wall time (and maybe CPU time) sketch per (view, magic number), which
+    `sync` merges with the ones other processes have saved to a file, so
+    that a budget doesn't depend on one process seeing every sample.
+    """
+    __slots__ = (
+        'wall',
+        'cpu',
+        'unsaved',
+        'synced_at',
+        '_lock',
+    )
+
+    def __init__(self):
+        self.wall = {}
+        self.cpu = {}
+        # (key, wall bucket, cpu bucket) added since the last `sync`.
+        self.unsaved = []
+        self.synced_at = 0
+        self._lock = Lock()
+
+    def add(self, key, timing):
+        wall = bucket_index(timing.wall)
+        cpu = None if timing.cpu is None else bucket_index(timing.cpu)
+        with self._lock:
+            self._add(key, wall, cpu)
+            self.unsaved.append((key, wall, cpu))
+
+    def _add(self, key, wall, cpu):
+        self.wall.setdefault(key, LatencySketch()).add_index(wall)
+        if cpu is not None:
+            self.cpu.setdefault(key, LatencySketch()).add_index(cpu)
+
+    def sync(self, path):
+        with self._lock:
+            unsaved, self.unsaved = self.unsaved, []
+
+        def update(data):
+            for key, wall, cpu in unsaved:
+                entry = data.setdefault(key, {})
+                for name, index in (('wall', wall), ('cpu', cpu)):
+                    if index is not None:
+                        counts = entry.setdefault(name, {})
+                        counts[str(index)] = counts.get(str(index), 0) + 1
+
+        data = update_json(path, update)
+        with self._lock:
+            if data is None:
+                # try again next time.
+                self.unsaved[0:0] = unsaved
+                return False
+            # what was saved now includes everything of ours but whatever
+            # arrived while saving.
+            self.wall = dict((key, LatencySketch(entry['wall']))
+                             for key, entry in data.items() if 'wall' in entry)
+            self.cpu = dict((key, LatencySketch(entry['cpu']))
+                            for key, entry in data.items() if 'cpu' in entry)
+            for key, wall, cpu in self.unsaved:
+                self._add(key, wall, cpu)
+            self.synced_at = time.time()
+        return True
+
+    def budget(self, key, factor, runs, min_samples):
+        with self._lock:
+            wall = self.wall.get(key)
+            if wall is None or wall.total < min_samples:
+                return None
+            median = wall.quantile(0.5)
+            cpu = self.cpu.get(key)
+            cpu_median = None if cpu is None else cpu.quantile(0.5)
+        return Budget(wall=round_up(median * factor), median=median,
+                      cpu_median=cpu_median, runs=runs)
+
+    def clear(self):
+        with self._lock:
+            self.wall.clear()
+            self.cpu.clear()
+            del self.unsaved[:]
+
+
+latency_sketches = LatencySketches()
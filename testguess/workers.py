@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from threading import Lock, Thread
+import atexit
+import logging
+from django.conf import settings
+
+try:
+    from queue import Queue, Full, Empty
+except ImportError:  # pragma: no cover
+    from Queue import Queue, Full, Empty
+
+logger = logging.getLogger(__name__)
+
+DROP_NEWEST = 'drop-newest'
+DROP_OLDEST = 'drop-oldest'
+BLOCK = 'block'
+POLICIES = (DROP_NEWEST, DROP_OLDEST, BLOCK)
+
+_STOP = object()
+
+
+class GenerationQueue(object):
+    __slots__ = (
+        'queue',
+        'policy',
+        'worker_count',
+        'threads',
+        'dropped',
+        '_lock',
+    )
+
+    def __init__(self, maxsize=100, policy=DROP_NEWEST, workers=1):
+        assert policy in POLICIES, "Invalid queue policy"
+        assert workers > 0, "Need at least one worker"
+        self.queue = Queue(maxsize=maxsize)
+        self.policy = policy
+        self.worker_count = workers
+        self.threads = ()
+        self.dropped = 0
+        self._lock = Lock()
+
+    def start(self):
+        with self._lock:
+            if self.threads:
+                return False
+            threads = tuple(Thread(target=self._run,
+                                   name='testguess-worker-%d' % number)
+                            for number in range(self.worker_count))
+            for thread in threads:
+                # never keep the interpreter alive just for us; `shutdown`
+                # is responsible for draining what is left.
+                thread.daemon = True
+                thread.start()
+            self.threads = threads
+        return True
+
+    def submit(self, task):
+        if self.policy == BLOCK:
+            self.queue.put(task)
+            return True
+        try:
+            self.queue.put_nowait(task)
+            return True
+        except Full:
+            pass
+        if self.policy == DROP_OLDEST:
+            try:
+                self.queue.get_nowait()
+                self.queue.task_done()
+            except Empty:
+                pass
+            try:
+                self.queue.put_nowait(task)
+                self._dropped()
+                return True
+            except Full:
+                pass
+        self._dropped()
+        return False
+
+    def _dropped(self):
+        with self._lock:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            task = self.queue.get()
+            try:
+                if task is _STOP:
+                    return None
+                task()
+            except Exception:
+                logger.exception("Background test generation failed")
+            finally:
+                self.queue.task_done()
+
+    def flush(self):
+        self.queue.join()
+
+    def shutdown(self, timeout=None):
+        with self._lock:
+            threads = self.threads
+            self.threads = ()
+        for thread in threads:
+            self.queue.put(_STOP)
+        for thread in threads:
+            thread.join(timeout)
+        return len(threads)
+
+
+_generation_queue = None
+_generation_queue_lock = Lock()
+
+
+def get_generation_queue():
+    global _generation_queue
+    with _generation_queue_lock:
+        if _generation_queue is None:
+            queue = GenerationQueue(
+                maxsize=getattr(settings, 'TESTGUESS_QUEUE_SIZE', 100),
+                policy=getattr(settings, 'TESTGUESS_QUEUE_POLICY', DROP_NEWEST),
+                workers=getattr(settings, 'TESTGUESS_QUEUE_WORKERS', 1),
+            )
+            queue.start()
+            atexit.register(queue.shutdown)
+            _generation_queue = queue
+    return _generation_queue
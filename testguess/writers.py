@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from binascii import hexlify
+from tempfile import mkstemp
+import errno
+import json
+import os
+import time
+
+LOCK_SUFFIX = '.lock'
+# a claim older than this is assumed to belong to a process which died
+# part way through writing.
+STALE_CLAIM_SECONDS = 60
+
+replace = getattr(os, 'replace', os.rename)
+
+
+def _create_exclusively(path):
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    with os.fdopen(fd, 'w') as f:
+        f.write(str(os.getpid()))
+    return path
+
+
+def claim_path(path, stale_after=STALE_CLAIM_SECONDS):
+    """
+    First writer wins: returns a lock path which must be passed to
+    `release_path`, or None if someone else is already writing `path`.
+    """
+    lock = path + LOCK_SUFFIX
+    try:
+        return _create_exclusively(lock)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+    try:
+        stale = os.stat(lock)
+    except OSError:
+        # released between our attempt and now; let the winner have it.
+        return None
+    if time.time() - stale.st_mtime < stale_after:
+        return None
+    if not _break_claim(lock, stale):
+        return None
+    try:
+        return _create_exclusively(lock)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+    return None
+
+
+def _break_claim(lock, stale):
+    """
+    Removes `lock` if it is still the file `stale` was taken of. Several
+    processes may decide at once that a claim is stale; renaming it aside
+    means only one gets it, and checking what was renamed means a fresh
+    claim, made by whoever broke the stale one first, is put back.
+    """
+    aside = '%s.%d.%s' % (lock, os.getpid(), hexlify(os.urandom(4)).decode('ascii'))
+    try:
+        os.rename(lock, aside)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+        return False
+    taken = os.stat(aside)
+    if (taken.st_ino, taken.st_mtime) != (stale.st_ino, stale.st_mtime):
+        try:
+            os.link(aside, lock)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        release_path(aside)
+        return False
+    release_path(aside)
+    return True
+
+
+def wait_for_claim(path, timeout=5, interval=0.01):
+    """
+    `claim_path`, retrying for up to `timeout` seconds; for files which
+    several writers must each update, rather than the first one winning.
+    """
+    deadline = time.time() + timeout
+    while True:
+        lock = claim_path(path)
+        if lock is not None or time.time() >= deadline:
+            return lock
+        time.sleep(interval)
+
+
+def release_path(lock):
+    try:
+        os.unlink(lock)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+    return None
+
+
+def atomic_write(path, content, mode=0o644):
+    directory, filename = os.path.split(path)
+    fd, temporary = mkstemp(dir=directory, prefix='.%s.' % filename,
+                            suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        os.chmod(temporary, mode)
+        replace(temporary, path)
+    except Exception:
+        release_path(temporary)
+        raise
+    return len(content)
+
+
+def update_json(path, update, timeout=5):
+    """
+    Read-modify-write the JSON object in `path` while holding a claim on it;
+    `update(data)` changes `data` in place. Returns the new data, or None if
+    the claim couldn't be had within `timeout` seconds.
+    """
+    lock = wait_for_claim(path, timeout=timeout)
+    if lock is None:
+        return None
+    try:
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (IOError, OSError) as e:
+            if e.errno != errno.ENOENT:
+                raise
+            data = {}
+        except ValueError:
+            # a file someone truncated; start again rather than wedge.
+            data = {}
+        update(data)
+        atomic_write(path, json.dumps(data, sort_keys=True,
+                                      separators=(',', ':')))
+    finally:
+        release_path(lock)
+    return data